@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+
+import argparse
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+_BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _BENCH_DIR)
+sys.path.insert(0, os.path.join(_BENCH_DIR, '..', 'opt', 'ssautils'))
+
+import ssacli_gen  # noqa: E402
+from ssalib import ssa  # noqa: E402
+from ssalib.console import SSAConsolePool  # noqa: E402
+from ssalib.ssa import Controller, Controllers  # noqa: E402
+from ssalib.thresholds import load_thresholds  # noqa: E402
+
+_DEF_SIZES = '1x10,1x100,2x250,4x500,8x1000'
+_EXT_CONFIG = (
+    'Smart Array P410:\n'
+    '  Cache Module Maximum Temperature (C): 55\n'
+    '  Capacitor Maximum Temperature (C): 60\n'
+    '  Controller Maximum Temperature (C): 100\n'
+    'Smart Array P420:\n'
+    '  Cache Module Maximum Temperature (C): 55\n'
+    '  Capacitor Maximum Temperature (C): 60\n'
+    '  Controller Maximum Temperature (C): 100\n'
+    'Smart Array P440:\n'
+    '  Cache Module Maximum Temperature (C): 55\n'
+    '  Capacitor Maximum Temperature (C): 60\n'
+    '  Controller Maximum Temperature (C): 100\n')
+
+
+def parse_sizes(sizes):
+    result = []
+    for size in sizes.split(','):
+        controllers, _, drives = size.partition('x')
+        result.append((int(controllers), int(drives)))
+    return result
+
+
+def _best(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _build(thresholds, configs_dict):
+    # Controllers.update_controllers() without the parsing.
+    tree = Controllers(raw_configs=(), thresholds=thresholds)
+    for config_dict in configs_dict[Controllers.__name__]:
+        tree.controllers.append(Controller(
+            config_dict,
+            thresholds.controller(
+                config_dict.get('Smart Array Type', ssa._DEF_VAL))))
+    return tree
+
+
+def _parse_and_build(parser, thresholds, text):
+    # Both stages are timed in the same sample, the tree is built from
+    # configs parsed just before so neither includes the other.
+    start = time.perf_counter()
+    configs_dict = parser._raw_configs_to_dict(io.StringIO(text))
+    parsed = time.perf_counter()
+    tree = _build(thresholds, configs_dict)
+    return parsed - start, time.perf_counter() - parsed, tree
+
+
+def bench_size(controllers, drives, repeat, thresholds, args):
+    config = ssacli_gen.build_config(
+        controllers=controllers, drives=drives,
+        failed=int(drives * args.failed_ratio),
+        rebuilding=int(drives * args.rebuilding_ratio),
+        unassigned=int(drives * args.unassigned_ratio / controllers),
+        seed=args.seed)
+    text = ssacli_gen.render(ssacli_gen.config_detail_lines(config))
+    parser = Controllers(raw_configs=(), thresholds=thresholds)
+
+    samples = [
+        _parse_and_build(parser, thresholds, text) for _ in range(repeat)]
+    parse = min(sample[0] for sample in samples)
+    build = min(sample[1] for sample in samples)
+    tree = samples[-1][2]
+    # health() is memoized, so every sample needs a freshly built tree.
+    evaluate = min(
+        _best(Controllers(
+            thresholds=thresholds, raw_configs=text).health, 1)[0]
+        for _ in range(repeat))
+    is_ok, _ = _best(tree.is_ok, repeat)
+    describe, _ = _best(tree.simple_description, repeat)
+
+    tracemalloc.start()
+    Controllers(thresholds=thresholds, raw_configs=text).is_ok()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'size': f'{controllers}x{drives}',
+        'bytes': len(text),
+        'parse': parse,
+        'build': build,
+        'evaluate': evaluate,
+        'is_ok': is_ok,
+        'describe': describe,
+        'drives_per_s': drives / build if build else 0.0,
+        'mb_per_s': len(text) / parse / 1e6 if parse else 0.0,
+        'peak_kib': peak / 1024}
+
+
+def bench_end_to_end(controllers, drives, repeat, args):
+    os.environ.update({
+        'FAKE_SSACLI_CONTROLLERS': str(controllers),
+        'FAKE_SSACLI_DRIVES': str(drives),
+        'FAKE_SSACLI_LATENCY': str(args.latency),
+        'FAKE_SSACLI_START_LATENCY': str(args.start_latency),
+        'FAKE_SSACLI_SEED': str(args.seed)})
+    ssa._HP_SSA_CMD = os.path.join(_BENCH_DIR, 'fake-ssacli')
+    process, _ = _best(Controllers, repeat)
+    pool = SSAConsolePool(size=1)
+    previous = ssa.set_executor(pool)
+    try:
+        Controllers()
+        console, _ = _best(Controllers, repeat)
+    finally:
+        ssa.set_executor(previous)
+        pool.close()
+    return f'{controllers}x{drives}', process, console
+
+
+def report(results, stream=sys.stdout):
+    header = (
+        f"{'size':>8} {'input':>9} {'parse ms':>9} {'build ms':>9} "
+        f"{'eval ms':>8} {'is_ok ms':>9} {'desc ms':>8} {'drives/s':>10} "
+        f"{'MB/s':>7} {'peak KiB':>9}")
+    stream.write(header + '\n')
+    for r in results:
+        stream.write(
+            f"{r['size']:>8} {r['bytes']:>9} {r['parse'] * 1e3:>9.2f} "
+            f"{r['build'] * 1e3:>9.2f} {r['evaluate'] * 1e3:>8.2f} "
+            f"{r['is_ok'] * 1e3:>9.2f} {r['describe'] * 1e3:>8.2f} "
+            f"{r['drives_per_s']:>10.0f} {r['mb_per_s']:>7.1f} "
+            f"{r['peak_kib']:>9.0f}\n")
+
+
+def parse_cmd_args(argv):
+    parser = argparse.ArgumentParser(
+        description=(
+            'Benchmark ssalib parsing and health evaluation against '
+            'synthetic ssacli output'))
+    parser.add_argument(
+        '-s', '--sizes', type=str, default=_DEF_SIZES,
+        metavar='<controllers>x<drives>,...',
+        help=f'Sizes to benchmark (default {_DEF_SIZES})')
+    parser.add_argument(
+        '-r', '--repeat', type=int, default=5, metavar='<count>',
+        help='Repetitions per measurement, the best is reported (default 5)')
+    parser.add_argument(
+        '--failed-ratio', type=float, default=0.01, metavar='<ratio>',
+        help='Fraction of assigned drives that are failed (default 0.01)')
+    parser.add_argument(
+        '--rebuilding-ratio', type=float, default=0.01, metavar='<ratio>',
+        help='Fraction of assigned drives that are rebuilding (default 0.01)')
+    parser.add_argument(
+        '--unassigned-ratio', type=float, default=0.05, metavar='<ratio>',
+        help='Fraction of drives left unassigned (default 0.05)')
+    parser.add_argument(
+        '--seed', type=int, default=0, metavar='<int>',
+        help='Random seed for the generated configuration (default 0)')
+    parser.add_argument(
+        '-e', '--end-to-end', action='store_true',
+        help=('Also time a full Controllers() collection through the fake '
+              'ssacli, per process and through a warm console session'))
+    parser.add_argument(
+        '--latency', type=float, default=0.0, metavar='<seconds>',
+        help='Fake ssacli delay per command (default 0)')
+    parser.add_argument(
+        '--start-latency', type=float, default=0.0, metavar='<seconds>',
+        help='Fake ssacli delay at start up (default 0)')
+    return parser.parse_args(argv[1:])
+
+
+def main(argv):
+    args = parse_cmd_args(argv)
+    logging.disable(logging.WARNING)
+    with tempfile.NamedTemporaryFile('w', suffix='.yml') as config_file:
+        config_file.write(_EXT_CONFIG)
+        config_file.flush()
+        # Loaded once so the YAML parsing isn't part of any measurement.
+        thresholds = load_thresholds(config_file.name)
+    results = [
+        bench_size(controllers, drives, args.repeat, thresholds, args)
+        for controllers, drives in parse_sizes(args.sizes)]
+    report(results)
+    if args.end_to_end:
+        sys.stdout.write(
+            f"\n{'size':>8} {'process ms':>11} {'console ms':>11}\n")
+        for controllers, drives in parse_sizes(args.sizes):
+            size, process, console = bench_end_to_end(
+                controllers, drives, args.repeat, args)
+            sys.stdout.write(
+                f'{size:>8} {process * 1e3:>11.1f} {console * 1e3:>11.1f}\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,353 @@
+import io
+import random
+import zipfile
+from xml.sax.saxutils import quoteattr
+
+_MODELS = ('Smart Array P410', 'Smart Array P420', 'Smart Array P440')
+_DRIVE_MODELS = (
+    ('ATA     WDC WD20EFRX-68E', 'SATA', '2 TB', 41),
+    ('HP      EG0600FBVFP', 'SAS', '600 GB', 60),
+    ('ATA     MK000480GWCEV', 'Solid State SATA', '480 GB', 70))
+_DRIVES_PER_BOX = 12
+
+
+def build_config(
+        controllers=1, drives=8, failed=0, rebuilding=0, unassigned=0,
+        drives_per_array=8, progress=37, seed=0):
+    rnd = random.Random(seed)
+    config = []
+    per_controller = [
+        drives // controllers + (1 if i < drives % controllers else 0)
+        for i in range(controllers)]
+    for index, count in enumerate(per_controller):
+        pds = []
+        for number in range(count):
+            model, interface, size, max_temp = rnd.choice(_DRIVE_MODELS)
+            box, bay = divmod(number, _DRIVES_PER_BOX)
+            pds.append({
+                'port': f'{1 + box % 2}I', 'box': box + 1, 'bay': bay + 1,
+                'model': model, 'interface': interface, 'size': size,
+                'serial': f'SN{index:02d}{number:05d}',
+                'temp': rnd.randint(max_temp - 20, max_temp - 2),
+                'max_temp': max_temp, 'status': 'OK'})
+        spare = min(unassigned, len(pds))
+        assigned, spares = pds[:len(pds) - spare], pds[len(pds) - spare:]
+        arrays = [
+            assigned[i:i + drives_per_array]
+            for i in range(0, len(assigned), drives_per_array)]
+        config.append({
+            'type': _MODELS[index % len(_MODELS)], 'slot': index + 1,
+            'serial': f'PACCR{index:07d}', 'arrays': arrays,
+            'unassigned': spares, 'progress': progress})
+
+    all_assigned = [
+        pd for controller in config
+        for array in controller['arrays'] for pd in array]
+    chosen = rnd.sample(
+        all_assigned, min(len(all_assigned), failed + rebuilding))
+    for pd in chosen[:failed]:
+        pd['status'] = 'Failed'
+    for pd in chosen[failed:]:
+        pd['status'] = 'Rebuilding'
+    return config
+
+
+def _array_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord('A') + rem) + letters
+    return letters
+
+
+def _ld_status(array, progress=37):
+    statuses = {pd['status'] for pd in array}
+    if 'Failed' in statuses:
+        return 'Interim Recovery Mode'
+    if 'Rebuilding' in statuses:
+        return f'Recovering, {progress}% complete'
+    return 'OK'
+
+
+def _array_status(array):
+    if any(pd['status'] == 'Failed' for pd in array):
+        return 'Failed Physical Drive'
+    return 'OK'
+
+
+def _pd_lines(pd, indent):
+    yield ''
+    yield f"{indent}physicaldrive {pd['port']}:{pd['box']}:{pd['bay']}"
+    indent += '   '
+    yield f"{indent}Port: {pd['port']}"
+    yield f"{indent}Box: {pd['box']}"
+    yield f"{indent}Bay: {pd['bay']}"
+    yield f"{indent}Status: {pd['status']}"
+    yield f'{indent}Drive Type: Data Drive'
+    yield f"{indent}Interface Type: {pd['interface']}"
+    yield f"{indent}Size: {pd['size']}"
+    yield f'{indent}Drive exposed to OS: False'
+    yield f'{indent}Logical/Physical Block Size: 512/4096'
+    yield f'{indent}Rotational Speed: 5400'
+    yield f'{indent}Firmware Revision: 82.00A82'
+    yield f"{indent}Serial Number: {pd['serial']}"
+    yield f"{indent}Model: {pd['model']}"
+    yield f'{indent}SATA NCQ Capable: True'
+    yield f"{indent}Current Temperature (C): {pd['temp']}"
+    yield f"{indent}Maximum Temperature (C): {pd['max_temp']}"
+    yield f'{indent}PHY Count: 1'
+    yield f'{indent}PHY Transfer Rate: 6.0Gbps'
+    yield f'{indent}Sanitize Erase Supported: False'
+    yield f'{indent}Shingled Magnetic Recording Support: None'
+
+
+def _array_lines(index, array):
+    yield ''
+    yield ''
+    yield f'   Array: {_array_letter(index)}'
+    yield f"      Interface Type: {array[0]['interface']}"
+    yield '      Unused Space: 0  MB (0.00%)'
+    yield '      Used Space: 10.92 TB (100.00%)'
+    yield f'      Status: {_array_status(array)}'
+    yield '      Array Type: Data'
+
+
+def _ld_lines(index, array, progress=37):
+    letter = _array_letter(index)
+    yield ''
+    yield ''
+    yield f'      Logical Drive: {index + 1}'
+    yield '         Size: 10.92 TB'
+    yield f"         Fault Tolerance: {5 if len(array) > 2 else 0}"
+    yield '         Heads: 255'
+    yield '         Sectors Per Track: 32'
+    yield '         Strip Size: 256 KB'
+    yield f'         Status: {_ld_status(array, progress)}'
+    yield '         Caching:  Enabled'
+    yield f'         Unique Identifier: 600508B1001C{index:020d}'
+    yield f'         Disk Name: /dev/sd{letter.lower()}'
+    yield '         Mount Points: None'
+    yield '         Disk Partition Information'
+    yield '            Partition Number: 1'
+    yield '            Partition Length: 10.92 TB'
+    yield f'         Logical Drive Label: {letter}0123456789'
+    yield '         Drive Type: Data'
+    yield '         LD Acceleration Method: Controller Cache'
+
+
+def config_detail_lines(config, slot=None):
+    for controller in config:
+        if slot is not None and str(controller['slot']) != str(slot):
+            continue
+        yield ''
+        yield f"{controller['type']} in Slot {controller['slot']}"
+        yield '   Bus Interface: PCI'
+        yield f"   Slot: {controller['slot']}"
+        yield f"   Serial Number: {controller['serial']}"
+        yield f"   Cache Serial Number: PBKUC0{controller['serial']}"
+        yield '   Controller Status: OK'
+        yield '   Hardware Revision: B'
+        yield '   Firmware Version: 8.32'
+        yield '   Rebuild Priority: Medium'
+        yield '   Expand Priority: Medium'
+        yield '   Cache Board Present: True'
+        yield '   Cache Status: OK'
+        yield '   Total Cache Size: 1.0'
+        yield '   Total Cache Memory Available: 0.8'
+        yield '   Cache Backup Power Source: Capacitors'
+        yield '   Battery/Capacitor Count: 1'
+        yield '   Battery/Capacitor Status: OK'
+        yield '   Controller Temperature (C): 58'
+        yield '   Cache Module Temperature (C): 37'
+        yield '   Capacitor Temperature  (C): 25'
+        yield f"   Host Serial Number: CZ{controller['serial']}"
+        for port in ('1I', '2I'):
+            yield f'   Port Name: {port}'
+            yield f'         Port ID: {int(port[0]) - 1}'
+            yield '         Port Connection Number: 0'
+            yield '         SAS Address: 50014380209BDC40'
+            yield '         Port Location: Internal'
+
+        for index, array in enumerate(controller['arrays']):
+            yield from _array_lines(index, array)
+            yield from _ld_lines(index, array, controller['progress'])
+            for pd in array:
+                yield from _pd_lines(pd, '      ')
+
+        if controller['unassigned']:
+            yield ''
+            yield '   Unassigned'
+            for pd in controller['unassigned']:
+                yield from _pd_lines(pd, '      ')
+
+        yield ''
+        yield '   SEP (Vendor ID PMCSIERA, Model  SRC 8x6G) 250'
+        yield '      Device Number: 250'
+        yield '      Firmware Version: RevC'
+        yield '      WWID: 5001438020A1B2C3'
+        yield '      Vendor ID: PMCSIERA'
+        yield '      Model:  SRC 8x6G'
+        yield ''
+
+
+def _location(pd):
+    return f"{pd['port']}:{pd['box']}:{pd['bay']}"
+
+
+def object_detail_lines(config, slot, array=None, ld=None, pd=None,
+                        children=None):
+    # 'ctrl slot=N array A|ld N|pd P:B:B [ld all|pd all] show detail'
+    controller = next(
+        (c for c in config if str(c['slot']) == str(slot)), None)
+    if controller is None:
+        return
+    yield ''
+    yield f"{controller['type']} in Slot {controller['slot']}"
+    for index, drives in enumerate(controller['arrays']):
+        letter = _array_letter(index)
+        if array is not None and array != letter:
+            continue
+        if ld is not None and str(ld) != str(index + 1):
+            continue
+        selected = [
+            drive for drive in drives if pd is None or _location(drive) == pd]
+        if pd is not None and not selected:
+            continue
+        if array is not None and children is None:
+            yield from _array_lines(index, drives)
+            continue
+        yield ''
+        yield f'   Array {letter}'
+        if ld is not None or children == 'ld':
+            yield from _ld_lines(index, drives, controller['progress'])
+        if pd is not None or children == 'pd':
+            for drive in selected:
+                yield from _pd_lines(drive, '      ')
+    if pd is not None:
+        unassigned = [
+            drive for drive in controller['unassigned']
+            if _location(drive) == pd]
+        if unassigned:
+            yield ''
+            yield '   Unassigned'
+            for drive in unassigned:
+                yield from _pd_lines(drive, '      ')
+    yield ''
+
+
+def show_lines(config, slot=None):
+    yield ''
+    for controller in config:
+        if slot is not None and str(controller['slot']) != str(slot):
+            continue
+        yield (f"{controller['type']} in Slot {controller['slot']}"
+               f"                (sn: {controller['serial']})")
+    yield ''
+
+
+def status_lines(config, slot=None):
+    for controller in config:
+        if slot is not None and str(controller['slot']) != str(slot):
+            continue
+        yield ''
+        yield f"{controller['type']} in Slot {controller['slot']}"
+        yield '   Controller Status: OK'
+        yield '   Cache Status: OK'
+        yield '   Battery/Capacitor Status: OK'
+    yield ''
+
+
+def config_lines(config, slot=None):
+    for controller in config:
+        if slot is not None and str(controller['slot']) != str(slot):
+            continue
+        yield ''
+        yield (f"{controller['type']} in Slot {controller['slot']}"
+               f"                (sn: {controller['serial']})")
+        for index, array in enumerate(controller['arrays']):
+            yield ''
+            yield (f'   Array {_array_letter(index)} '
+                   f"({array[0]['interface']}, Unused Space: 0  MB)")
+            yield ''
+            status = _ld_status(array, controller['progress'])
+            yield (f'      logicaldrive {index + 1} (10.92 TB, RAID '
+                   f"{5 if len(array) > 2 else 0}, {status})")
+            yield ''
+            for pd in array:
+                yield (f"      physicaldrive {pd['port']}:{pd['box']}:"
+                       f"{pd['bay']} (port {pd['port']}:box {pd['box']}:"
+                       f"bay {pd['bay']}, {pd['interface']}, {pd['size']}, "
+                       f"{pd['status']})")
+        if controller['unassigned']:
+            yield ''
+            yield '   Unassigned'
+            yield ''
+            for pd in controller['unassigned']:
+                yield (f"      physicaldrive {pd['port']}:{pd['box']}:"
+                       f"{pd['bay']} (port {pd['port']}:box {pd['box']}:"
+                       f"bay {pd['bay']}, {pd['interface']}, {pd['size']}, "
+                       f"{pd['status']})")
+    yield ''
+
+
+def _diag_attribute(name, value, indent):
+    return (f'{indent}<Attribute id={quoteattr(name)} '
+            f'value="0x{value:08X}"/>')
+
+
+def diag_xml_lines(config, slot, media_errors=0, seed=0):
+    # An ADU style report, the same attribute ids as 'ssacli diag'.
+    rnd = random.Random(seed)
+    yield '<?xml version="1.0" encoding="UTF-8"?>'
+    yield '<ADUReport>'
+    for controller in config:
+        if str(controller['slot']) != str(slot):
+            continue
+        yield (f'  <Device deviceType="ArrayController" '
+               f'id="AC:{controller["slot"]}" marketingName='
+               f'"{controller["type"]} in Slot {controller["slot"]}">')
+        yield (f'    <MetaProperty id="Serial Number" '
+               f'value="{controller["serial"]}"/>')
+        yield '    <MetaStructure id="Cache Statistics">'
+        yield _diag_attribute('Cache Hits', rnd.randint(8000, 9900), '      ')
+        yield _diag_attribute('Cache Misses', rnd.randint(100, 2000), '      ')
+        yield '    </MetaStructure>'
+        drives = [pd for array in controller['arrays'] for pd in array]
+        drives.extend(controller['unassigned'])
+        for index, pd in enumerate(drives):
+            location = _location(pd)
+            yield (f'    <Device deviceType="PhysicalDrive" '
+                   f'id="PD:{location}" '
+                   f'marketingName="Physical Drive {location}">')
+            yield (f'      <MetaProperty id="Serial Number" '
+                   f'value="{pd["serial"]}"/>')
+            yield ('      <MetaStructure id="Physical Drive Monitor and '
+                   'Performance Statistics">')
+            yield _diag_attribute(
+                'Media Errors', 3 if index < media_errors else 0, '        ')
+            yield _diag_attribute('Hard Read Errors', 0, '        ')
+            yield _diag_attribute(
+                'Recovered Read Errors', rnd.randint(0, 50), '        ')
+            yield _diag_attribute('Hard Write Errors', 0, '        ')
+            yield _diag_attribute(
+                'Recovered Write Errors', rnd.randint(0, 5), '        ')
+            yield _diag_attribute(
+                'Sectors Reallocated', rnd.randint(0, 2), '        ')
+            yield '      </MetaStructure>'
+            yield '    </Device>'
+        yield '  </Device>'
+    yield '</ADUReport>'
+
+
+def diag_zip(config, slot, media_errors=0, seed=0):
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('ADUReport.xml', render(
+            diag_xml_lines(config, slot, media_errors, seed)))
+        archive.writestr('ADUReport.htm', '<html></html>\n')
+    return data.getvalue()
+
+
+def render(lines):
+    return ''.join(f'{line}\n' for line in lines)
@@ -0,0 +1,161 @@
+import logging
+import time
+
+from ssalib.ssa import _DEF_VAL, _OK, _STATUSES, _WARNING, render_report
+
+
+_NEW = 'New Problem'
+_ESCALATED = 'Escalated'
+_IMPROVED = 'Improved'
+_RECOVERED = 'Recovered'
+MISSING = 'Missing'
+_PROBLEMS = (_NEW, _ESCALATED, MISSING)
+
+
+logger = logging.getLogger(__name__)
+
+
+def controller_key(controller):
+    if controller.serial != _DEF_VAL:
+        return f'controller:{controller.serial}'
+    return f'controller:slot={controller.slot}'
+
+
+def drive_key(drive):
+    if drive.serial != _DEF_VAL:
+        return f'pd:{drive.serial}'
+    return f'pd:{drive.location}'
+
+
+def walk(controller):
+    key = controller_key(controller)
+    yield key, controller
+    for drive in controller.unassigned_physical_drives:
+        yield drive_key(drive), drive
+    for array in controller.arrays:
+        yield from _walk_array(f'{key}/array:{array.name}', array)
+
+
+def _walk_array(array_key, array):
+    yield array_key, array
+    for drive in array.logical_drives:
+        yield f'{array_key}/ld:{drive.number}', drive
+    for drive in array.physical_drives:
+        yield drive_key(drive), drive
+
+
+def changed_report(controller, keys):
+    # The controller with its components, but only the arrays and
+    # unassigned drives that hold a changed node.
+    owner_key = controller_key(controller)
+    node = controller.report_dict()
+    node['unassigned'] = [
+        drive.report() for drive in controller.unassigned_physical_drives
+        if drive_key(drive) in keys]
+    node['arrays'] = [
+        array.report() for array in controller.arrays
+        if any(key in keys for key, _ in _walk_array(
+            f'{owner_key}/array:{array.name}', array))]
+    return node
+
+
+def classify(old, new):
+    if old is None:
+        return _NEW if new != _OK else None
+    if new == old:
+        return None
+    if new == _OK:
+        return _RECOVERED
+    if old == _OK:
+        return _NEW
+    return _ESCALATED if new > old else _IMPROVED
+
+
+class Alert():
+    def __init__(self, subject, body, status, transitions=()):
+        self.subject = subject
+        self.body = body
+        self.status = status
+        self.transitions = list(transitions)
+
+
+class AlertTracker():
+    def __init__(self, remind=0):
+        self._remind = remind
+        self._nodes = {}
+        self._last_alert = None
+
+    def _diff(self, controllers):
+        nodes = {}
+        owners = {}
+        transitions = []
+        for controller in controllers.controllers:
+            owner_key = controller_key(controller)
+            for key, node in walk(controller):
+                status = node.check()
+                nodes[key] = (status, node, owner_key)
+                owners.setdefault(owner_key, controller)
+                previous = self._nodes.get(key)
+                kind = classify(previous and previous[0], status)
+                if kind:
+                    transitions.append(
+                        (kind, key, previous and previous[0], status, node,
+                         owner_key))
+        for key, (status, node, owner_key) in self._nodes.items():
+            if key in nodes:
+                continue
+            owner = owners.get(owner_key)
+            # Children of a controller that is gone or could not be collected
+            # are unknown rather than missing, the controller reports that.
+            if key != owner_key and (
+                    owner is None or not (
+                        owner.arrays or owner.unassigned_physical_drives)):
+                continue
+            transitions.append(
+                (MISSING, key, status, _WARNING, node, owner_key))
+        return nodes, owners, transitions
+
+    def _changes_body(self, controllers, owners, transitions):
+        lines = []
+        for kind, _, old, new, node, _ in transitions:
+            was = f' (was {_STATUSES[old]})' if old is not None else ''
+            lines.append(
+                f'{kind}: {_STATUSES[new]}{was} - {node.summary().strip()}')
+        body = 'Changes:\n\n' + '\n'.join(lines)
+        changed = {owner_key for *_, owner_key in transitions}
+        keys = {key for _, key, *_ in transitions}
+        descriptions = [
+            render_report(changed_report(owner, keys))
+            for key, owner in owners.items() if key in changed]
+        if descriptions:
+            body += (
+                '\n\nSmart Array(s) Description:\n\n' +
+                '\n\n'.join(descriptions))
+        return f'{body}\n\n{controllers._format_config_time()}'
+
+    def update(self, controllers, now=None):
+        now = time.monotonic() if now is None else now
+        status = controllers.health()
+        nodes, owners, transitions = self._diff(controllers)
+        self._nodes = nodes
+        if transitions:
+            self._last_alert = now
+            if any(kind in _PROBLEMS for kind, *_ in transitions):
+                subject = 'Problem Detected'
+            elif status == _OK:
+                subject = 'Recovered'
+            else:
+                subject = 'Status Changed'
+            return Alert(
+                f'HPE Smart Array(s) {subject}: {_STATUSES[status]}',
+                self._changes_body(controllers, owners, transitions),
+                status, transitions)
+        if (status != _OK and self._remind and self._last_alert is not None
+                and now - self._last_alert >= self._remind):
+            self._last_alert = now
+            logger.debug('Sending problem reminder')
+            _, description = controllers.is_ok()
+            return Alert(
+                f'HPE Smart Array(s) Problem Reminder: {_STATUSES[status]}',
+                f'Smart Array(s) Description:\n\n{description}', status)
+        return None
@@ -0,0 +1,158 @@
+import logging
+import os
+import select
+import subprocess
+import time
+from queue import Queue
+from threading import Lock
+
+from ssalib import ssa
+from ssalib.ssa import SSACmdError, SSACmdOutput
+
+
+_PROMPT = b'=> '
+_READ_SIZE = 65536
+_START_TIMEOUT = 120
+
+
+logger = logging.getLogger(__name__)
+
+
+class SSAConsole():
+    def __init__(self, cmd=None, prompt=_PROMPT, start_timeout=_START_TIMEOUT):
+        self._cmd = cmd
+        self._prompt = prompt
+        self._start_timeout = start_timeout
+        self._lock = Lock()
+        self._obj = None
+
+    def is_alive(self):
+        return self._obj is not None and self._obj.poll() is None
+
+    def _start(self):
+        cmd = [self._cmd or ssa._HP_SSA_CMD, 'console']
+        logger.debug(f'SSAConsole start: {cmd}')
+        try:
+            self._obj = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=ssa._ssa_env(),
+                start_new_session=True)
+        except Exception as exc:
+            raise SSACmdError(error=exc)
+        # Discard the banner and controller detection up to the first prompt.
+        try:
+            for _ in self._read_lines(time.monotonic()+self._start_timeout):
+                pass
+            self._read_stderr()
+        except SSACmdError:
+            self._stop()
+            raise
+
+    def _stop(self):
+        obj, self._obj = self._obj, None
+        if obj is None:
+            return
+        if obj.poll() is None:
+            ssa._kill_process_group(obj)
+        obj.wait()
+        obj.stdin.close()
+        obj.stdout.close()
+        obj.stderr.close()
+
+    def close(self):
+        with self._lock:
+            self._stop()
+
+    def _read_stderr(self, timeout=0):
+        # Warnings go to stderr, keep them apart from the parsed output.
+        fd = self._obj.stderr.fileno()
+        chunks = []
+        while select.select([fd], [], [], timeout)[0]:
+            chunk = os.read(fd, _READ_SIZE)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+    def _read_lines(self, deadline, errors=None):
+        fd = self._obj.stdout.fileno()
+        err_fd = self._obj.stderr.fileno()
+        fds = [fd, err_fd]
+        partial = b''
+        while partial != self._prompt:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise SSACmdError(error='ssacli console timed out')
+            ready, _, _ = select.select(fds, [], [], remaining)
+            if err_fd in ready:
+                chunk = os.read(err_fd, _READ_SIZE)
+                if not chunk:
+                    fds.remove(err_fd)
+                elif errors is not None:
+                    errors.append(chunk)
+            if fd not in ready:
+                continue
+            chunk = os.read(fd, _READ_SIZE)
+            if not chunk:
+                raise SSACmdError(error='ssacli console exited unexpectedly')
+            *lines, partial = (partial + chunk).split(b'\n')
+            for line in lines:
+                yield line.decode('utf-8', 'replace').rstrip()
+
+    def _run_lines(self, args, timeout, output):
+        command = ' '.join(args)
+        errors = []
+        stderr = []
+        with self._lock:
+            if not self.is_alive():
+                self._start()
+            logger.debug(f'SSAConsole: {command}')
+            try:
+                self._obj.stdin.write(command.encode('utf-8')+b'\n')
+                self._obj.stdin.flush()
+                for line in self._read_lines(
+                        time.monotonic()+(timeout or ssa._SSA_CMD_TIMEOUT),
+                        stderr):
+                    if line.startswith('Error:'):
+                        errors.append(line)
+                    yield line
+                stderr.append(self._read_stderr())
+            except BaseException:
+                # The session is somewhere mid-command and can't be reused.
+                self._stop()
+                raise
+        output.stderr = b''.join(stderr).decode('utf-8', 'replace').strip()
+        if errors:
+            raise SSACmdError(error='\n'.join(errors))
+
+    def run(self, args, timeout=None):
+        output = SSACmdOutput()
+        output.lines = self._run_lines(args, timeout, output)
+        return output
+
+
+class SSAConsolePool():
+    def __init__(self, size=1, **kwargs):
+        self._sessions = Queue()
+        self._all_sessions = [SSAConsole(**kwargs) for _ in range(size)]
+        for session in self._all_sessions:
+            self._sessions.put(session)
+
+    def _run_lines(self, args, timeout, output):
+        session = self._sessions.get()
+        try:
+            yield from session._run_lines(args, timeout, output)
+        finally:
+            self._sessions.put(session)
+
+    def run(self, args, timeout=None):
+        output = SSACmdOutput()
+        output.lines = self._run_lines(args, timeout, output)
+        return output
+
+    def close(self):
+        for session in self._all_sessions:
+            session.close()
@@ -0,0 +1,250 @@
+import logging
+import os
+import re
+import tempfile
+import zipfile
+from threading import Event, Lock, Thread
+from xml.etree.ElementTree import ParseError, iterparse
+
+from ssalib.alerts import walk
+from ssalib.ssa import (
+    _DEF_VAL, _SLOT_RE, _SSA_CMD_TIMEOUT, Controller, PhysicalDrive,
+    SSAException, _ssa_cmd)
+from ssalib.timing import timed
+
+
+DIAG_PERIOD = 86400
+_DIAG_DELAY = 300
+# Writing the report of a large controller takes far longer than a query.
+DIAG_TIMEOUT = 1800
+_LOCATION_RE = re.compile(r'\b(\d+[A-Z]+:\d+:\d+)\b')
+_SERIAL_KEYS = ('serialnumber', 'serialno')
+# Normalized ADU attribute names of each counter, the report wording varies
+# between firmware and ssacli versions.
+_ALIASES = {
+    'Media Errors': ('mediaerrors', 'mediafailures'),
+    'Hard Read Errors': ('hardreaderrors', 'readerrorshard'),
+    'Recovered Read Errors': (
+        'recoveredreaderrors', 'readerrorsrecovered', 'softreaderrors'),
+    'Hard Write Errors': ('hardwriteerrors', 'writeerrorshard'),
+    'Recovered Write Errors': (
+        'recoveredwriteerrors', 'writeerrorsrecovered', 'softwriteerrors'),
+    'Reallocated Sectors': (
+        'reallocatedsectors', 'sectorsreallocated', 'reallocatedsectorcount',
+        'remappedsectors'),
+    'Cache Hits': ('cachehits', 'readcachehits'),
+    'Cache Misses': ('cachemisses', 'readcachemisses')}
+_COUNTER_NAMES = {
+    alias: counter
+    for counter, aliases in _ALIASES.items() for alias in aliases}
+
+
+logger = logging.getLogger(__name__)
+
+
+class DiagError(SSAException):
+    message = "Diagnostic report error: %(error)s"
+
+
+def _normalize(name):
+    return re.sub(r'[^a-z0-9]', '', name.lower())
+
+
+def _to_number(value):
+    value = value.strip()
+    try:
+        return int(value, 0)
+    except ValueError:
+        pass
+    try:
+        return float(value.rstrip('%'))
+    except ValueError:
+        return None
+
+
+def _device_kind(device_type):
+    device_type = _normalize(device_type)
+    if 'physicaldrive' in device_type:
+        return 'drive'
+    if 'controller' in device_type:
+        return 'controller'
+    return None
+
+
+def _controller_counters(counters):
+    hits = counters.pop('Cache Hits', None)
+    misses = counters.pop('Cache Misses', None)
+    if hits is not None and misses is not None and hits + misses:
+        counters['Cache Hit Ratio (%)'] = round(
+            100 * hits / (hits + misses), 1)
+    return counters
+
+
+def parse_devices(stream):
+    # Streams the ADU XML, every element is dropped as soon as it ends so
+    # the memory used doesn't depend on the size of the report.
+    devices = []
+    elements = []
+    for event, elem in iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            elements.append(elem)
+            kind = _device_kind(elem.get('deviceType', ''))
+            if kind is not None:
+                devices.append({
+                    'kind': kind, 'counters': {}, 'serial': None,
+                    'location': None,
+                    'names': (elem.get('id', ''),
+                              elem.get('marketingName', ''))})
+            continue
+        elements.pop()
+        if devices and elem.get('deviceType') is None:
+            key = elem.get('id') or elem.get('name')
+            value = elem.get('value')
+            if key is not None and value is not None:
+                name = _normalize(key)
+                device = devices[-1]
+                if name in _SERIAL_KEYS:
+                    device['serial'] = value.strip()
+                elif name in _COUNTER_NAMES:
+                    number = _to_number(value)
+                    if number is not None:
+                        device['counters'][_COUNTER_NAMES[name]] = number
+        elif _device_kind(elem.get('deviceType', '')) is not None:
+            device = devices.pop()
+            for name in device.pop('names'):
+                match = _LOCATION_RE.search(name)
+                if match:
+                    device['location'] = match.group(1)
+                    break
+            yield device
+        elem.clear()
+        if elements:
+            elements[-1].remove(elem)
+
+
+@timed('parse diagnostics')
+def parse_report(path):
+    result = {'controller': {}, 'drives': {}}
+    try:
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.filename.lower().endswith('.xml'):
+                    continue
+                with archive.open(info) as stream:
+                    for device in parse_devices(stream):
+                        if device['kind'] == 'controller':
+                            result['controller'].update(device['counters'])
+                            continue
+                        if not device['counters']:
+                            continue
+                        for key in (device['serial'], device['location']):
+                            if key:
+                                result['drives'][key] = device['counters']
+    except (OSError, zipfile.BadZipFile, ParseError) as exc:
+        raise DiagError(error=f'{path}: {exc}')
+    _controller_counters(result['controller'])
+    return result
+
+
+def _list_slots(timeout):
+    slots = []
+    for line in _ssa_cmd(
+            'ctrl', 'all', 'show', timeout=timeout, session=False):
+        match = _SLOT_RE.search(line)
+        if match:
+            slots.append(match.group(1))
+    return slots
+
+
+class DiagCollector():
+    def __init__(
+            self, period=DIAG_PERIOD, timeout=_SSA_CMD_TIMEOUT,
+            callback=None, directory=None, delay=_DIAG_DELAY,
+            diag_timeout=DIAG_TIMEOUT):
+        self._period = period
+        self._timeout = timeout
+        self._diag_timeout = diag_timeout
+        self._callback = callback
+        self._directory = directory
+        self._delay = delay
+        self._lock = Lock()
+        self._results = {}
+        self._stop = Event()
+        self._thread = None
+
+    def collect_slot(self, slot):
+        with tempfile.TemporaryDirectory(dir=self._directory) as tmp:
+            path = os.path.join(tmp, f'diag-slot-{slot}.zip')
+            output = _ssa_cmd(
+                'ctrl', f'slot={slot}', 'diag', f'file={path}',
+                timeout=self._diag_timeout, session=False)
+            output.read()
+            return parse_report(path)
+
+    def collect(self):
+        results = {}
+        for slot in _list_slots(self._timeout):
+            try:
+                results[slot] = self.collect_slot(slot)
+            except SSAException as exc:
+                logger.warning(f'Slot {slot} diagnostics failed: {exc}')
+                continue
+            # Every drive is keyed by both its serial and its location.
+            drives = {id(counters) for counters in (
+                results[slot]['drives'].values())}
+            logger.info(
+                f'Slot {slot} diagnostics: {len(drives)} drive counter set(s)')
+        with self._lock:
+            self._results = results
+        return results
+
+    def update(self, controllers):
+        with self._lock:
+            results = self._results
+        if not results:
+            return
+        for controller in controllers.controllers:
+            result = results.get(controller.slot)
+            if result is None:
+                continue
+            changed = False
+            for _, node in walk(controller):
+                if isinstance(node, Controller):
+                    counters = result['controller']
+                elif isinstance(node, PhysicalDrive):
+                    counters = result['drives'].get(node.serial) if (
+                        node.serial != _DEF_VAL) else None
+                    counters = counters or result['drives'].get(
+                        node.location)
+                else:
+                    continue
+                if (counters or None) != node.counters:
+                    node.set_counters(counters)
+                    changed = True
+            if changed:
+                # The arrays and controller memoized their children's health.
+                for _, node in walk(controller):
+                    node.invalidate()
+
+    def _run(self):
+        # Let the first full check finish before the slow diagnostics.
+        delay = self._delay
+        while not self._stop.wait(delay):
+            try:
+                self.collect()
+            except SSAException as exc:
+                logger.warning(f'Diagnostics failed: {exc}')
+            else:
+                if self._callback:
+                    self._callback()
+            delay = self._period
+
+    def start(self):
+        self._thread = Thread(target=self._run, name='diag', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread = None
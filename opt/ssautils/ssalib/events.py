@@ -0,0 +1,223 @@
+import errno
+import logging
+import os
+import re
+import socket
+import time
+from threading import Event, Thread
+
+from ssalib.ssa import SSAException
+
+
+_KMSG_PATH = '/dev/kmsg'
+_KMSG_RE = re.compile(r'\b(hpsa|smartpqi)\b')
+_KMSG_HEADER_RE = re.compile(r'^\d+,\d+,\d+,[^;]*;')
+_NETLINK_KOBJECT_UEVENT = 15
+_UDEV_SUBSYSTEMS = ('scsi', 'scsi_device', 'scsi_disk', 'block')
+_UDEV_ACTIONS = ('add', 'remove', 'offline', 'online')
+_UDEV_SCSI_ACTIONS = _UDEV_ACTIONS + ('change',)
+_READ_SIZE = 8192
+_FOLLOW_INTERVAL = 0.5
+DEBOUNCE = 5
+DEF_SOURCES = 'kmsg,udev'
+
+
+logger = logging.getLogger(__name__)
+
+
+class EventSourceError(SSAException):
+    message = "Event source error: %(error)s"
+
+
+class KmsgSource():
+    name = 'kmsg'
+
+    def __init__(self, path=_KMSG_PATH):
+        self._path = path
+        try:
+            self._fd = os.open(self._path, os.O_RDONLY)
+        except OSError as exc:
+            raise EventSourceError(error=f'{path}: {exc}')
+        # Only new messages matter, not the ring buffer since boot.
+        try:
+            os.lseek(self._fd, 0, os.SEEK_END)
+        except OSError:
+            pass
+
+    def lines(self):
+        partial = b''
+        while self._fd is not None:
+            try:
+                chunk = os.read(self._fd, _READ_SIZE)
+            except OSError as exc:
+                if exc.errno == errno.EPIPE:
+                    # /dev/kmsg overwrote records before they were read.
+                    continue
+                if self._fd is None:
+                    return
+                raise
+            if not chunk:
+                # A plain file or FIFO used in place of /dev/kmsg.
+                time.sleep(_FOLLOW_INTERVAL)
+                continue
+            *records, partial = (partial + chunk).split(b'\n')
+            for record in records:
+                line = record.decode('utf-8', 'replace')
+                if line and not line.startswith(' '):
+                    yield _KMSG_HEADER_RE.sub('', line, count=1)
+
+    def matches(self, line):
+        return _KMSG_RE.search(line) is not None
+
+    def close(self):
+        fd, self._fd = self._fd, None
+        if fd is not None:
+            os.close(fd)
+
+
+class UnixSource(KmsgSource):
+    name = 'unix'
+
+    def __init__(self, path):
+        self._path = path
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            if os.path.exists(path):
+                os.unlink(path)
+            self._sock.bind(path)
+        except OSError as exc:
+            self._sock.close()
+            raise EventSourceError(error=f'{path}: {exc}')
+
+    def lines(self):
+        while self._sock is not None:
+            try:
+                data = self._sock.recv(_READ_SIZE)
+            except OSError:
+                if self._sock is None:
+                    return
+                raise
+            for line in data.decode('utf-8', 'replace').splitlines():
+                if line:
+                    yield _KMSG_HEADER_RE.sub('', line, count=1)
+
+    def close(self):
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            sock.close()
+            if os.path.exists(self._path):
+                os.unlink(self._path)
+
+
+class UdevSource():
+    name = 'udev'
+
+    def __init__(self):
+        try:
+            self._sock = socket.socket(
+                socket.AF_NETLINK, socket.SOCK_DGRAM,
+                _NETLINK_KOBJECT_UEVENT)
+            self._sock.bind((os.getpid(), 1))
+        except (OSError, AttributeError) as exc:
+            raise EventSourceError(error=f'udev: {exc}')
+
+    def lines(self):
+        while self._sock is not None:
+            try:
+                data = self._sock.recv(_READ_SIZE)
+            except OSError:
+                if self._sock is None:
+                    return
+                raise
+            fields = data.split(b'\0')
+            env = dict(
+                field.decode('utf-8', 'replace').partition('=')[::2]
+                for field in fields[1:] if b'=' in field)
+            yield (f"{env.get('ACTION', '')} {env.get('SUBSYSTEM', '')} "
+                   f"{env.get('DEVPATH', '')}")
+
+    def matches(self, line):
+        action, _, rest = line.partition(' ')
+        subsystem = rest.partition(' ')[0]
+        if subsystem not in _UDEV_SUBSYSTEMS:
+            return False
+        if subsystem == 'block':
+            return action in _UDEV_ACTIONS
+        return action in _UDEV_SCSI_ACTIONS
+
+    def close(self):
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            sock.close()
+
+
+def create_sources(spec):
+    sources = []
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        kind, _, path = item.partition(':')
+        try:
+            if kind == 'kmsg':
+                sources.append(KmsgSource(path or _KMSG_PATH))
+            elif kind == 'udev':
+                sources.append(UdevSource())
+            elif kind == 'unix' and path:
+                sources.append(UnixSource(path))
+            else:
+                raise EventSourceError(error=f'unknown source: {item}')
+        except EventSourceError as exc:
+            logger.warning(exc)
+    return sources
+
+
+class EventWatcher():
+    def __init__(self, sources, callback, debounce=DEBOUNCE):
+        self._sources = sources
+        self._callback = callback
+        self._debounce = debounce
+        self._pending = Event()
+        self._stop = Event()
+        self._threads = []
+
+    def _watch(self, source):
+        try:
+            for line in source.lines():
+                if source.matches(line):
+                    logger.debug(f'Event from {source.name}: {line}')
+                    self._pending.set()
+        except Exception as exc:
+            if not self._stop.is_set():
+                logger.warning(f'Event source {source.name} failed: {exc}')
+
+    def _dispatch(self):
+        while not self._stop.is_set():
+            self._pending.wait()
+            if self._stop.is_set():
+                break
+            # Let a burst of related messages settle into a single check.
+            self._stop.wait(self._debounce)
+            self._pending.clear()
+            if self._stop.is_set():
+                break
+            logger.info('Controller event detected, checking now')
+            try:
+                self._callback()
+            except Exception as exc:
+                logger.exception(f'Event callback failed: {exc}')
+
+    def start(self):
+        for source in self._sources:
+            thread = Thread(
+                target=self._watch, args=(source,),
+                name=f'event-{source.name}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = Thread(target=self._dispatch, name='events', daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def close(self):
+        self._stop.set()
+        self._pending.set()
+        for source in self._sources:
+            source.close()
+        self._threads = []
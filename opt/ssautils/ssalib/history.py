@@ -0,0 +1,247 @@
+import logging
+import mmap
+import os
+import struct
+import time
+from threading import Lock
+
+from ssalib.alerts import controller_key, drive_key
+from ssalib.ssa import _DEF_VAL, SSAException
+
+
+HISTORY_PATH = '/var/lib/smartarraycheck/history.bin'
+CAPACITY = 2016
+HORIZON = 3600
+_MIN_SAMPLES = 3
+_MAGIC = b'SSAHIST1'
+
+# File header: magic, capacity (samples per sensor), sensor count.
+_HEADER = struct.Struct('<8sII')
+_HEADER_SIZE = 64
+# Sensor header: key, index of the next write, number of stored samples.
+_SENSOR = struct.Struct('<64sII')
+# Sample: timestamp, temperature (C), temperature status.
+_SAMPLE = struct.Struct('<Ihbx')
+
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryError(SSAException):
+    message = "Temperature history error: %(error)s"
+
+
+def sensors(controllers):
+    for controller in controllers.controllers:
+        key = controller_key(controller)
+        yield (f'{key}/controller', controller, 'temperature',
+               'max_temperature', 'temperature_rise',
+               controller.check_controller_temperature)
+        if controller.cache_present:
+            yield (f'{key}/cache', controller, 'cache_temperature',
+                   'max_cache_temperature', 'cache_temperature_rise',
+                   controller.check_cache_temperature)
+            if controller.power_source != _DEF_VAL:
+                yield (f'{key}/{controller.power_source.lower()}',
+                       controller, 'battery_capacitor_temperature',
+                       'max_battery_capacitor_temperature',
+                       'battery_capacitor_temperature_rise',
+                       controller.check_battery_capacitor_temperature)
+        drives = list(controller.unassigned_physical_drives)
+        for array in controller.arrays:
+            drives.extend(array.physical_drives)
+        for drive in drives:
+            yield (drive_key(drive), drive, 'temperature', 'max_temperature',
+                   'temperature_rise', drive.check_temperature)
+
+
+def _subtree(node):
+    yield node
+    for name in ('unassigned_physical_drives', 'arrays', 'physical_drives'):
+        for child in getattr(node, name, ()):
+            yield from _subtree(child)
+
+
+def _slope(samples):
+    # Least squares fit, in degrees per hour.
+    count = len(samples)
+    mean_t = sum(sample[0] for sample in samples) / count
+    mean_v = sum(sample[1] for sample in samples) / count
+    var = sum((sample[0] - mean_t) ** 2 for sample in samples)
+    if not var:
+        return None
+    cov = sum(
+        (sample[0] - mean_t) * (sample[1] - mean_v) for sample in samples)
+    return cov / var * 3600
+
+
+def _sensor_key(key):
+    # The key as stored in the sensor header, longer keys are cut at a
+    # character boundary so they map to the same slot after a restart.
+    return key.encode('utf-8')[:_SENSOR.size - 8].decode('utf-8', 'ignore')
+
+
+class TemperatureHistory():
+    def __init__(
+            self, path=HISTORY_PATH, capacity=CAPACITY, horizon=HORIZON,
+            readonly=False):
+        self._path = path
+        self._horizon = horizon
+        self._readonly = readonly
+        self._lock = Lock()
+        self._index = {}
+        self._file = None
+        self._mm = None
+        try:
+            self._open(capacity)
+        except (OSError, ValueError, struct.error) as exc:
+            self.close()
+            raise HistoryError(error=f'{path}: {exc}')
+
+    def _sensor_size(self):
+        return _SENSOR.size + self._capacity * _SAMPLE.size
+
+    def _sensor_offset(self, slot):
+        return _HEADER_SIZE + slot * self._sensor_size()
+
+    def _open(self, capacity):
+        if self._readonly:
+            self._file = open(self._path, 'rb')
+            self._mm = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._file = os.fdopen(fd, 'r+b')
+            if os.fstat(fd).st_size < _HEADER_SIZE:
+                self._file.truncate(_HEADER_SIZE)
+                self._file.seek(0)
+                self._file.write(_HEADER.pack(_MAGIC, capacity, 0))
+                self._file.flush()
+            self._mm = mmap.mmap(self._file.fileno(), 0)
+        magic, self._capacity, count = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError('not a temperature history file')
+        if not self._readonly and self._capacity != capacity:
+            logger.info(
+                f'Keeping the existing history size of {self._capacity} '
+                f'samples per sensor, remove {self._path} to change it')
+        for slot in range(count):
+            key, _, _ = _SENSOR.unpack_from(
+                self._mm, self._sensor_offset(slot))
+            self._index[key.rstrip(b'\0').decode('utf-8', 'ignore')] = slot
+
+    def _add_sensor(self, key):
+        slot = len(self._index)
+        self._mm.resize(self._sensor_offset(slot + 1))
+        _SENSOR.pack_into(
+            self._mm, self._sensor_offset(slot),
+            key.encode('utf-8'), 0, 0)
+        _HEADER.pack_into(self._mm, 0, _MAGIC, self._capacity, slot + 1)
+        self._index[key] = slot
+        return slot
+
+    def _samples(self, slot, since=None):
+        offset = self._sensor_offset(slot)
+        _, head, size = _SENSOR.unpack_from(self._mm, offset)
+        offset += _SENSOR.size
+        samples = []
+        for step in range(1, size + 1):
+            sample = _SAMPLE.unpack_from(
+                self._mm,
+                offset + (head - step) % self._capacity * _SAMPLE.size)
+            if since is not None and sample[0] < since:
+                break
+            samples.append(sample)
+        samples.reverse()
+        return samples
+
+    def keys(self):
+        with self._lock:
+            return list(self._index)
+
+    def samples(self, key, since=None):
+        with self._lock:
+            slot = self._index.get(_sensor_key(key))
+            if slot is None:
+                return []
+            return self._samples(slot, since)
+
+    def record(self, key, timestamp, temperature, status):
+        key = _sensor_key(key)
+        with self._lock:
+            slot = self._index.get(key)
+            if slot is None:
+                slot = self._add_sensor(key)
+            offset = self._sensor_offset(slot)
+            _, head, size = _SENSOR.unpack_from(self._mm, offset)
+            _SAMPLE.pack_into(
+                self._mm, offset + _SENSOR.size + head * _SAMPLE.size,
+                int(timestamp), temperature, status)
+            _SENSOR.pack_into(
+                self._mm, offset, key.encode('utf-8'),
+                (head + 1) % self._capacity, min(size + 1, self._capacity))
+
+    def stats(self, key, window, now=None):
+        now = time.time() if now is None else now
+        samples = self.samples(key, since=now - window)
+        if not samples:
+            return None
+        values = [sample[1] for sample in samples]
+        return {
+            'min': min(values),
+            'max': max(values),
+            'avg': sum(values) / len(values),
+            'count': len(values),
+            'rate': (
+                _slope(samples) if len(samples) >= _MIN_SAMPLES else None),
+            'latest': values[-1],
+            'latest_time': samples[-1][0]}
+
+    def summary(self, window, now=None):
+        return {key: self.stats(key, window, now) for key in self.keys()}
+
+    def update(self, controllers, refreshed=None, now=None):
+        # Must run before the tree's health is evaluated, the projected
+        # rise feeds into the temperature checks, which are memoized.
+        # A refreshed node only records its own and its children's sensors,
+        # the rest of the tree was recorded by the full check.
+        if now is None:
+            now = controllers.updated or time.time()
+        nodes = None
+        if refreshed is not None:
+            nodes = {id(node) for node in _subtree(refreshed)}
+        horizon = self._horizon
+        for key, node, current, maximum, rise, check in sensors(controllers):
+            if nodes is not None and id(node) not in nodes:
+                continue
+            temperature = getattr(node, current)
+            if temperature is None:
+                continue
+            limit = getattr(node, maximum)
+            if horizon and limit is not None:
+                samples = self.samples(key, since=now - horizon)
+                samples.append((now, temperature))
+                if (len(samples) >= _MIN_SAMPLES and
+                        samples[-1][0] - samples[0][0] >= horizon / 4):
+                    rate = _slope(samples)
+                    if (rate is not None and rate > 0 and
+                            temperature + rate * horizon / 3600 >= limit):
+                        setattr(node, rise, rate)
+            self.record(key, now, temperature, check())
+
+    def flush(self):
+        with self._lock:
+            if self._mm is not None and not self._readonly:
+                self._mm.flush()
+
+    def close(self):
+        with self._lock:
+            if self._mm is not None:
+                if not self._readonly:
+                    self._mm.flush()
+                self._mm.close()
+                self._mm = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
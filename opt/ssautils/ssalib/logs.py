@@ -0,0 +1,81 @@
+import atexit
+import gzip
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import SimpleQueue
+
+
+_MAX_BYTES = 2000000
+_BACKUP_COUNT = 5
+
+
+def _gzip_namer(name):
+    return name + '.gz'
+
+
+def _gzip_rotator(source, dest):
+    with open(source, mode='rb') as s_file:
+        with gzip.open(dest, mode='wb') as d_file:
+            shutil.copyfileobj(s_file, d_file)
+    os.remove(source)
+
+
+class JsonFormatter(logging.Formatter):
+    # One object per line, the keys are the columns of the workbench log.
+    def format(self, record):
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            message = f'{message}\n{record.exc_text}'
+        return json.dumps({
+            'date': datetime.fromtimestamp(record.created).astimezone()
+            .isoformat(timespec='milliseconds'),
+            'threadName': record.threadName,
+            'filename': record.filename,
+            'lineNo': record.lineno,
+            'levelName': record.levelname,
+            'message': message})
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record):
+        # Keep the exception and the caller details for the JSON formatter,
+        # only the arguments are merged before leaving the calling thread.
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_queue_logging(handlers, level=logging.NOTSET):
+    # The handlers, including the file rotation and its compression, run on
+    # the listener thread so logging never blocks the checks.
+    queue = SimpleQueue()
+    r_logger = logging.getLogger()
+    r_logger.setLevel(level)
+    r_logger.propagate = False
+    r_logger.addHandler(_QueueHandler(queue))
+    listener = QueueListener(queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def json_file_handler(
+        filename, max_bytes=_MAX_BYTES, backup_count=_BACKUP_COUNT):
+    handler = RotatingFileHandler(
+        filename=filename, maxBytes=max_bytes, backupCount=backup_count,
+        encoding='utf-8')
+    handler.setFormatter(JsonFormatter())
+    handler.rotator = _gzip_rotator
+    handler.namer = _gzip_namer
+    return handler
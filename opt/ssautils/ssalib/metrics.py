@@ -0,0 +1,293 @@
+import logging
+import os
+import tempfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+from ssalib.timing import _QUANTILES, timings
+
+
+_PREFIX = 'smartarray'
+_STATUS_HELP = '0 - OK, 1 - Warning, 2 - Critical, 3 - Unknown'
+_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+_COUNTERS = ('collection_failures_total', 'stage_calls_total')
+
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(value):
+    return (str(value).replace('\\', '\\\\')
+            .replace('\n', '\\n').replace('"', '\\"'))
+
+
+class _MetricFamilies():
+    def __init__(self):
+        self._families = {}
+
+    def add(self, name, help_text, value, **labels):
+        if value is None:
+            return
+        self._families.setdefault(name, (help_text, []))[1].append(
+            (labels, value))
+
+    def render(self):
+        lines = []
+        for name, (help_text, samples) in self._families.items():
+            lines.append(f'# HELP {_PREFIX}_{name} {help_text}')
+            metric_type = 'counter' if name in _COUNTERS else 'gauge'
+            lines.append(f'# TYPE {_PREFIX}_{name} {metric_type}')
+            for labels, value in samples:
+                label_str = ','.join(
+                    f'{key}="{_escape(label)}"'
+                    for key, label in labels.items())
+                label_str = f'{{{label_str}}}' if label_str else ''
+                lines.append(f'{_PREFIX}_{name}{label_str} {value}')
+        lines.append('')
+        return '\n'.join(lines)
+
+
+def _add_physical_drive(families, drive, slot, array):
+    labels = {
+        'slot': slot, 'array': array, 'drive': drive.location,
+        'serial': drive.serial}
+    families.add(
+        'physical_drive_status', f'Physical drive status ({_STATUS_HELP})',
+        drive.check_status(), **labels)
+    families.add(
+        'physical_drive_temperature_status',
+        f'Physical drive temperature status ({_STATUS_HELP})',
+        drive.check_temperature(), **labels)
+    families.add(
+        'physical_drive_temperature_celsius',
+        'Physical drive current temperature', drive.temperature, **labels)
+    families.add(
+        'physical_drive_temperature_max_celsius',
+        'Physical drive maximum temperature', drive.max_temperature,
+        **labels)
+    _add_counters(
+        families, 'physical_drive', 'Physical drive', drive.counters,
+        **labels)
+
+
+def _add_counters(families, name, help_name, counters, **labels):
+    for counter, value in (counters or {}).items():
+        families.add(
+            f'{name}_diagnostic_counter',
+            f'{help_name} diagnostic report counter', value,
+            counter=counter, **labels)
+
+
+def _add_controller(families, controller):
+    slot = controller.slot
+    families.add(
+        'controller_info', 'Controller model and serial number', 1,
+        slot=slot, model=controller.model, serial=controller.serial)
+    families.add(
+        'controller_health', f'Controller overall health ({_STATUS_HELP})',
+        controller.health(), slot=slot)
+    families.add(
+        'controller_status', f'Controller status ({_STATUS_HELP})',
+        controller.check_controller(), slot=slot)
+    families.add(
+        'controller_temperature_status',
+        f'Controller temperature status ({_STATUS_HELP})',
+        controller.check_controller_temperature(), slot=slot)
+    families.add(
+        'controller_temperature_celsius', 'Controller current temperature',
+        controller.temperature, slot=slot)
+    families.add(
+        'controller_temperature_max_celsius',
+        'Controller configured maximum temperature',
+        controller.max_temperature, slot=slot)
+    _add_counters(
+        families, 'controller', 'Controller', controller.counters, slot=slot)
+    if controller.cache_present:
+        families.add(
+            'cache_status', f'Cache module status ({_STATUS_HELP})',
+            controller.check_cache(), slot=slot)
+        families.add(
+            'cache_temperature_status',
+            f'Cache module temperature status ({_STATUS_HELP})',
+            controller.check_cache_temperature(), slot=slot)
+        families.add(
+            'cache_temperature_celsius', 'Cache module current temperature',
+            controller.cache_temperature, slot=slot)
+        families.add(
+            'cache_temperature_max_celsius',
+            'Cache module configured maximum temperature',
+            controller.max_cache_temperature, slot=slot)
+        source = controller.power_source
+        families.add(
+            'battery_capacitor_status',
+            f'Battery/capacitor status ({_STATUS_HELP})',
+            controller.check_battery_capacitor(), slot=slot, source=source)
+        families.add(
+            'battery_capacitor_temperature_status',
+            f'Battery/capacitor temperature status ({_STATUS_HELP})',
+            controller.check_battery_capacitor_temperature(), slot=slot,
+            source=source)
+        families.add(
+            'battery_capacitor_temperature_celsius',
+            'Battery/capacitor current temperature',
+            controller.battery_capacitor_temperature, slot=slot,
+            source=source)
+        families.add(
+            'battery_capacitor_temperature_max_celsius',
+            'Battery/capacitor configured maximum temperature',
+            controller.max_battery_capacitor_temperature, slot=slot,
+            source=source)
+    for drive in controller.unassigned_physical_drives:
+        _add_physical_drive(families, drive, slot, '')
+    for array in controller.arrays:
+        families.add(
+            'array_status', f'Array status ({_STATUS_HELP})',
+            array.check_status(), slot=slot, array=array.name)
+        for drive in array.logical_drives:
+            families.add(
+                'logical_drive_status',
+                f'Logical drive status ({_STATUS_HELP})',
+                drive.check_status(), slot=slot, array=array.name,
+                logical_drive=drive.number)
+            families.add(
+                'logical_drive_size_bytes', 'Logical drive size',
+                drive.size, slot=slot, array=array.name,
+                logical_drive=drive.number)
+            families.add(
+                'logical_drive_progress_percent',
+                'Progress of a running rebuild or transform',
+                drive.progress, slot=slot, array=array.name,
+                logical_drive=drive.number, operation=drive.operation)
+            families.add(
+                'logical_drive_progress_bytes_per_second',
+                'Throughput of a running rebuild or transform',
+                drive.throughput, slot=slot, array=array.name,
+                logical_drive=drive.number, operation=drive.operation)
+            families.add(
+                'logical_drive_progress_eta_seconds',
+                'Estimated time until a running rebuild or transform ends',
+                drive.eta, slot=slot, array=array.name,
+                logical_drive=drive.number, operation=drive.operation)
+        for drive in array.physical_drives:
+            _add_physical_drive(families, drive, slot, array.name)
+
+
+def _add_stages(families, stages):
+    for stage, stats in stages.items():
+        for quantile in _QUANTILES:
+            families.add(
+                'stage_duration_seconds',
+                'Rolling percentiles of the time spent in each check stage',
+                stats[f'p{int(quantile * 100)}'], stage=stage,
+                quantile=quantile)
+        families.add(
+            'stage_calls_total', 'Times each check stage has run',
+            stats['count'], stage=stage)
+
+
+def render_metrics(
+        controllers=None, duration=None, failures=0, stages=None):
+    families = _MetricFamilies()
+    if controllers is not None:
+        families.add(
+            'status', f'Overall Smart Array status ({_STATUS_HELP})',
+            controllers.health())
+        families.add(
+            'last_success_timestamp_seconds',
+            'Time of the last successful collection', controllers.updated)
+        for controller in controllers.controllers:
+            _add_controller(families, controller)
+    families.add(
+        'collection_duration_seconds',
+        'Time taken by the last successful collection', duration)
+    families.add(
+        'collection_failures_total',
+        'Failed collections since the daemon started', failures)
+    _add_stages(families, stages or {})
+    return families.render()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.server.exporter.text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', _CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f'Metrics: {self.address_string()} {format % args}')
+
+
+class MetricsExporter():
+    def __init__(self, textfile=None, listen=None):
+        self._textfile = textfile
+        self._listen = listen
+        self._lock = Lock()
+        self._controllers = None
+        self._duration = None
+        self._failures = 0
+        self._text = render_metrics()
+        self._server = None
+
+    def text(self):
+        with self._lock:
+            return self._text
+
+    def update(self, controllers, duration=None):
+        with self._lock:
+            self._controllers = controllers
+            if duration is not None:
+                self._duration = duration
+            self._refresh()
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            self._refresh()
+
+    def _refresh(self):
+        self._text = render_metrics(
+            self._controllers, self._duration, self._failures,
+            timings.stats())
+        if self._textfile:
+            self._write_textfile(self._text)
+
+    def _write_textfile(self, text):
+        # node_exporter must never see a partially written file.
+        directory = os.path.dirname(os.path.abspath(self._textfile))
+        tmp_name = None
+        try:
+            fd, tmp_name = tempfile.mkstemp(
+                dir=directory, prefix='.smartarray', suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as stream:
+                stream.write(text)
+            os.chmod(tmp_name, 0o644)
+            os.replace(tmp_name, self._textfile)
+        except OSError as exc:
+            logger.warning(f'Unable to write metrics textfile: {exc}')
+            if tmp_name is not None and os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+
+    def start(self):
+        if not self._listen:
+            return
+        address, _, port = self._listen.rpartition(':')
+        self._server = ThreadingHTTPServer(
+            (address, int(port)), _MetricsHandler)
+        self._server.daemon_threads = True
+        self._server.exporter = self
+        Thread(
+            target=self._server.serve_forever, name='metrics',
+            daemon=True).start()
+        logger.info(f'Serving metrics on: {self._listen}')
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,132 @@
+from ssalib.alerts import walk
+from ssalib.ssa import (
+    _OK, _STATUSES, _UNKNOWN, _WARNING, Array, Controller, LogicalDrive,
+    PhysicalDrive, _counters_description)
+
+
+_SERVICE = 'SMART ARRAY'
+
+
+def _temperature(value):
+    return f'{value}C' if value is not None else 'n/a'
+
+
+def _controller_problems(controller):
+    name = f'Slot {controller.slot}'
+    source = controller.power_source.lower()
+    checks = [
+        ('controller', controller.check_controller(),
+         controller.detail('Controller Status')),
+        ('controller temperature', controller.check_controller_temperature(),
+         _temperature(controller.temperature)),
+        ('diagnostics', controller.check_diagnostics(),
+         _counters_description(controller.counters or {}))]
+    if controller.cache_present:
+        checks.extend((
+            ('cache', controller.check_cache(),
+             controller.detail('Cache Status')),
+            ('cache temperature', controller.check_cache_temperature(),
+             _temperature(controller.cache_temperature)),
+            (source, controller.check_battery_capacitor(),
+             controller.detail('Battery/Capacitor Status')),
+            (f'{source} temperature',
+             controller.check_battery_capacitor_temperature(),
+             _temperature(controller.battery_capacitor_temperature))))
+    return [
+        f'{name} {component} {value}'
+        for component, status, value in checks if status != _OK]
+
+
+def _problems(controller):
+    slot = controller.slot
+    for _, node in walk(controller):
+        if node.check() == _OK:
+            continue
+        if isinstance(node, Controller):
+            yield from _controller_problems(node)
+        elif isinstance(node, Array):
+            yield f"Slot {slot} array {node.name} {node.detail('Status')}"
+        elif isinstance(node, LogicalDrive):
+            yield (f"Slot {slot} LD {node.number} {node.detail('Status')}"
+                   f'{node.progress_description()}')
+        elif isinstance(node, PhysicalDrive):
+            problem = f"Slot {slot} PD {node.location} {node.detail('Status')}"
+            if node.check_temperature() != _OK:
+                problem += f' {_temperature(node.temperature)}'
+            if node.check_diagnostics() != _OK:
+                problem += f' ({_counters_description(node.counters)})'
+            yield problem
+
+
+def _perf(label, value, maximum=None):
+    if value is None:
+        return None
+    if maximum is None:
+        return f"'{label}'={value}"
+    return f"'{label}'={value};{maximum - 1};{maximum}"
+
+
+def _perfdata(controllers):
+    counts = {
+        kind: [0] * len(_STATUSES) for kind in ('array', 'ld', 'pd')}
+    perfdata = []
+    for controller in controllers.controllers:
+        prefix = f'slot{controller.slot}'
+        perfdata.append(_perf(
+            f'{prefix}_temp', controller.temperature,
+            controller.max_temperature))
+        if controller.cache_present:
+            perfdata.append(_perf(
+                f'{prefix}_cache_temp', controller.cache_temperature,
+                controller.max_cache_temperature))
+            perfdata.append(_perf(
+                f'{prefix}_{controller.power_source.lower()}_temp',
+                controller.battery_capacitor_temperature,
+                controller.max_battery_capacitor_temperature))
+        for _, node in walk(controller):
+            if isinstance(node, Array):
+                counts['array'][node.health()] += 1
+            elif isinstance(node, LogicalDrive):
+                counts['ld'][node.health()] += 1
+                perfdata.append(_perf(
+                    f'{prefix}_ld{node.number}_progress',
+                    node.progress if node.progress is None
+                    else f'{node.progress:g}%'))
+            elif isinstance(node, PhysicalDrive):
+                counts['pd'][node.health()] += 1
+                perfdata.append(_perf(
+                    f'{prefix}_pd_{node.location}_temp', node.temperature,
+                    node.max_temperature))
+    for kind, values in counts.items():
+        for status, count in enumerate(values):
+            perfdata.append(
+                _perf(f'{kind}_{_STATUSES[status].lower()}', count))
+    return [item for item in perfdata if item is not None], counts
+
+
+def render_plugin(controllers):
+    status = controllers.health()
+    perfdata, counts = _perfdata(controllers)
+    problems = [
+        problem for controller in controllers.controllers
+        for problem in _problems(controller)]
+    if controllers.status != _OK:
+        problems.append('ssacli reported errors')
+    if not controllers.controllers:
+        status = max(status, _WARNING)
+        problems.append('no controllers found')
+    if problems:
+        summary = ', '.join(problems)
+    else:
+        summary = (
+            f'{len(controllers.controllers)} controller(s), '
+            f"{sum(counts['array'])} array(s), "
+            f"{sum(counts['ld'])} logical drive(s), "
+            f"{sum(counts['pd'])} physical drive(s)")
+    return status, (
+        f'{_SERVICE} {_STATUSES[status].upper()} - {summary} | '
+        f"{' '.join(perfdata)}")
+
+
+def render_unknown(reason):
+    return _UNKNOWN, f'{_SERVICE} UNKNOWN - {reason}'
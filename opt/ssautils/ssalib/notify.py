@@ -0,0 +1,202 @@
+import logging
+import smtplib
+import time
+from email.message import EmailMessage
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+
+from ssalib.timing import timed
+
+
+SMTP_HOST = 'localhost'
+SMTP_PORT = 25
+_SMTP_TIMEOUT = 30
+_QUEUE_SIZE = 100
+_MAX_PENDING = 20
+_WINDOW = 60
+_MIN_BACKOFF = 5
+_MAX_BACKOFF = 600
+_IDLE_TIMEOUT = 60
+
+
+logger = logging.getLogger(__name__)
+
+
+def digest(notifications, dropped=0):
+    if len(notifications) == 1 and not dropped:
+        return notifications[0]
+    subject = notifications[-1][0]
+    earlier = len(notifications) - 1 + dropped
+    subject += f' (+{earlier} earlier)'
+    sections = [
+        f"{'=' * 10} {index}/{len(notifications)}: {n_subject}\n\n{n_body}"
+        for index, (n_subject, n_body) in enumerate(notifications, 1)]
+    if dropped:
+        sections.insert(0, (
+            f'{dropped} older notification(s) were dropped while the mail '
+            'server was unavailable, the latest ones follow.'))
+    return subject, '\n\n'.join(sections)
+
+
+class Notifier():
+    def __init__(
+            self, from_addr, to_addr, host=SMTP_HOST, port=SMTP_PORT,
+            window=_WINDOW, queue_size=_QUEUE_SIZE, min_backoff=_MIN_BACKOFF,
+            max_backoff=_MAX_BACKOFF, idle_timeout=_IDLE_TIMEOUT,
+            max_pending=_MAX_PENDING):
+        self._from_addr = from_addr
+        self._to_addr = to_addr
+        self._host = host
+        self._port = port
+        self._window = window
+        self._min_backoff = min_backoff
+        self._max_backoff = max_backoff
+        self._idle_timeout = idle_timeout
+        self._max_pending = max_pending
+        self._dropped = 0
+        self._queue = Queue(maxsize=queue_size)
+        self._stop = Event()
+        self._smtp = None
+        self._last_sent = None
+        self._thread = None
+
+    def notify(self, subject, body):
+        # Never block the caller, under pressure the oldest entry goes.
+        while True:
+            try:
+                self._queue.put_nowait((subject, body))
+                return
+            except Full:
+                try:
+                    dropped = self._queue.get_nowait()
+                    logger.warning(
+                        f'Notification queue full, dropped: {dropped[0]}')
+                except Empty:
+                    pass
+
+    def _add(self, pending, item):
+        # A long mail outage keeps the newest notifications, the digest
+        # says how many older ones were dropped.
+        pending.append(item)
+        if len(pending) > self._max_pending:
+            dropped = pending.pop(0)
+            self._dropped += 1
+            logger.warning(f'Notification backlog full, dropped: {dropped[0]}')
+
+    def _drain(self, pending):
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except Empty:
+                return pending
+            if item is not None:
+                self._add(pending, item)
+
+    def _collect(self, pending):
+        # The first notification after a quiet period goes out straight away,
+        # anything following it within the window is sent as one digest.
+        if self._last_sent is None:
+            return self._drain(pending)
+        deadline = self._last_sent + self._window
+        while not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except Empty:
+                break
+            if item is None:
+                break
+            self._add(pending, item)
+        return self._drain(pending)
+
+    def _connect(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.noop()
+                return self._smtp
+            except (smtplib.SMTPException, OSError):
+                self._disconnect()
+        logger.debug(f'Connecting to SMTP server {self._host}:{self._port}')
+        self._smtp = smtplib.SMTP(
+            self._host, self._port, timeout=_SMTP_TIMEOUT)
+        return self._smtp
+
+    def _disconnect(self):
+        smtp, self._smtp = self._smtp, None
+        if smtp is None:
+            return
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    @timed('smtp')
+    def _send(self, subject, body):
+        msg = EmailMessage()
+        msg['Subject'] = subject
+        msg.set_content(body)
+        try:
+            self._connect().sendmail(
+                self._from_addr, self._to_addr, msg.as_string())
+        except (smtplib.SMTPException, OSError):
+            self._disconnect()
+            raise
+
+    def _deliver(self, pending):
+        backoff = self._min_backoff
+        while True:
+            subject, body = digest(pending, self._dropped)
+            try:
+                self._send(subject, body)
+                self._last_sent = time.monotonic()
+                self._dropped = 0
+                logger.debug(f'Notification sent: {subject}')
+                return []
+            except (smtplib.SMTPException, OSError) as exc:
+                logger.warning(
+                    f'Notification failed, retry in {backoff}s: {exc}')
+            if self._stop.wait(backoff):
+                return pending
+            backoff = min(backoff * 2, self._max_backoff)
+            self._drain(pending)
+
+    def _run(self):
+        pending = []
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self._idle_timeout)
+            except Empty:
+                self._disconnect()
+                continue
+            if first is None:
+                continue
+            pending = self._deliver(self._collect([first]))
+        self._flush(pending)
+        self._disconnect()
+
+    def _flush(self, pending):
+        # One last attempt on shutdown, without waiting for the window.
+        pending = self._drain(pending)
+        if not pending:
+            return
+        try:
+            self._send(*digest(pending, self._dropped))
+        except (smtplib.SMTPException, OSError) as exc:
+            logger.error(f'Notification not sent on shutdown: {exc}')
+
+    def start(self):
+        self._thread = Thread(target=self._run, name='notify', daemon=True)
+        self._thread.start()
+
+    def close(self, timeout=_SMTP_TIMEOUT):
+        if self._thread is None:
+            return
+        self._stop.set()
+        try:
+            self._queue.put_nowait(None)
+        except Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
@@ -0,0 +1,75 @@
+import logging
+import time
+
+from ssalib.alerts import walk
+from ssalib.ssa import LogicalDrive
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Operation():
+    __slots__ = ('name', 'changes', 'latest')
+
+    def __init__(self, name, now, progress):
+        self.name = name
+        # The first time each new percentage was seen, ssacli only reports
+        # whole percents so the crossings give the most accurate rate.
+        self.changes = [(now, progress)]
+        self.latest = progress
+
+    def add(self, now, progress):
+        if progress != self.latest:
+            self.changes.append((now, progress))
+            self.latest = progress
+
+    def rate(self):
+        if len(self.changes) < 3:
+            # The first crossing may be mid way through a percent.
+            return None
+        (start, first), (end, last) = self.changes[1], self.changes[-1]
+        if end <= start or last <= first:
+            return None
+        return (last - first) / (end - start)
+
+
+class ProgressTracker():
+    def __init__(self):
+        self._operations = {}
+
+    @property
+    def active(self):
+        return bool(self._operations)
+
+    def update(self, controllers, now=None):
+        # Must run before the tree is rendered, it fills in the throughput
+        # and ETA of every logical drive with an operation in progress.
+        now = time.time() if now is None else now
+        operations = {}
+        for controller in controllers.controllers:
+            for key, node in walk(controller):
+                if not isinstance(node, LogicalDrive):
+                    continue
+                if node.progress is None:
+                    continue
+                operation = self._operations.get(key)
+                if (operation is None or operation.name != node.operation or
+                        node.progress < operation.latest):
+                    logger.info(
+                        f'Logical drive {node.number} {node.operation} '
+                        f'at {node.progress}%')
+                    operation = _Operation(node.operation, now, node.progress)
+                else:
+                    operation.add(now, node.progress)
+                operations[key] = operation
+                rate = operation.rate()
+                if rate is None:
+                    continue
+                if node.size is not None:
+                    node.throughput = rate / 100 * node.size
+                last_change = operation.changes[-1][0]
+                node.eta = max(
+                    0, (100 - node.progress) / rate - (now - last_change))
+        for key in self._operations.keys() - operations.keys():
+            logger.info(f'Operation finished: {key}')
+        self._operations = operations
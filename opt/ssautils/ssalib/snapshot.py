@@ -0,0 +1,357 @@
+import copy
+import json
+import logging
+import os
+import socket
+import socketserver
+import time
+from collections import OrderedDict
+from threading import Lock, Thread
+
+from ssalib.nagios import render_plugin
+from ssalib.ssa import _DEF_VAL, _INDENT, _STATUSES, SSAException
+from ssalib.timing import timings
+
+
+SOCKET_PATH = '/run/smartarraycheck/smartarraycheck.sock'
+_CLIENT_TIMEOUT = 5
+_MAX_REQUEST = 4096
+_FORMATS = ('json', 'report', 'text', 'detail', 'nagios')
+_FILTERS = ('slot', 'array', 'ld', 'serial')
+LISTS = ('controllers', 'arrays', 'logical_drives', 'physical_drives')
+_SORT_DIRS = ('asc', 'desc')
+_STATUS_FIELDS = ('status', 'status_str')
+_SORT_FIELDS = {
+    'controllers': _STATUS_FIELDS + (
+        'slot', 'model', 'serial', 'host_serial', 'power_source', 'arrays',
+        'logical_drives', 'physical_drives'),
+    'arrays': _STATUS_FIELDS + (
+        'slot', 'name', 'interface', 'unused_space', 'state',
+        'logical_drives', 'physical_drives'),
+    'logical_drives': _STATUS_FIELDS + (
+        'slot', 'array', 'number', 'disk_name', 'size', 'raid', 'state',
+        'operation', 'progress', 'throughput', 'eta'),
+    'physical_drives': _STATUS_FIELDS + (
+        'slot', 'array', 'location', 'serial', 'model', 'port', 'box', 'bay',
+        'drive_type', 'size', 'state', 'temperature', 'max_temperature',
+        'temperature_rise', 'temperature_status'),
+}
+_MAX_VIEWS = 32
+
+_HEADERS = {
+    'Controller': lambda details: (
+        f"{details.get('Smart Array Type', _DEF_VAL)} in "
+        f"Slot {details.get('Slot', _DEF_VAL)}"),
+    'Array': lambda details: f"Array: {details.get('Array', _DEF_VAL)}",
+    'LogicalDrive': lambda details: (
+        f"Logical Drive: {details.get('Logical Drive', _DEF_VAL)}"),
+    'PhysicalDrive': lambda details: (
+        f"physicaldrive {details.get('Physical Drive', _DEF_VAL)}"),
+}
+_HEADER_KEYS = {
+    'Controller': 'Smart Array Type',
+    'Array': 'Array',
+    'LogicalDrive': 'Logical Drive',
+    'PhysicalDrive': 'Physical Drive',
+}
+
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotError(SSAException):
+    message = "Snapshot query failed: %(error)s"
+
+
+def format_updated(updated):
+    return time.strftime(
+        'Updated At: %H:%M:%S %d-%m-%Y', time.localtime(updated))
+
+
+def _details_lines(details, depth, skip=None):
+    indent = _INDENT * depth
+    for key, value in details.items():
+        if key == skip:
+            continue
+        if isinstance(value, dict):
+            yield f'{indent}{key}'
+            yield from _details_lines(value, depth+1)
+        elif value is None:
+            yield f'{indent}{key}'
+        else:
+            yield f'{indent}{key}: {value}'
+
+
+def detail_lines(node, depth=0):
+    node_type = node['type']
+    yield f"{_INDENT * depth}{_HEADERS[node_type](node['details'])}"
+    yield from _details_lines(
+        node['details'], depth+1, skip=_HEADER_KEYS[node_type])
+    if node.get('unassigned'):
+        yield f'{_INDENT * (depth+1)}Unassigned'
+        for child in node['unassigned']:
+            yield from detail_lines(child, depth+2)
+    for key in ('arrays', 'logical_drives', 'physical_drives'):
+        for child in node.get(key, ()):
+            yield from detail_lines(child, depth+1)
+
+
+def render_nodes(nodes, fmt):
+    if fmt == 'json':
+        return [node.to_dict() for node in nodes]
+    if fmt == 'report':
+        return [node.report() for node in nodes]
+    if fmt == 'text':
+        return '\n\n'.join(node.is_ok()[1] for node in nodes)
+    return '\n\n'.join(
+        '\n'.join(detail_lines(node.to_dict())) for node in nodes)
+
+
+def _row(node, **extra):
+    return dict(
+        node['fields'], status=node['status'],
+        status_str=node['status_str'], reasons=node['reasons'], **extra)
+
+
+def parse_statuses(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, (str, int)):
+        value = str(value).split(',')
+    statuses = set()
+    for item in value:
+        item = str(item).strip()
+        if item.isdigit() and int(item) < len(_STATUSES):
+            statuses.add(int(item))
+        elif item.capitalize() in _STATUSES:
+            statuses.add(_STATUSES.index(item.capitalize()))
+        else:
+            raise SnapshotError(error=f'unknown status: {item}')
+    return tuple(sorted(statuses))
+
+
+def _sort_key(field):
+    # The status is ranked by severity, not by its name.
+    if field in _STATUS_FIELDS:
+        field = 'status'
+
+    def key(row):
+        value = row.get(field)
+        return value is None, value if value is not None else 0
+    return key
+
+
+class SnapshotIndex():
+    def __init__(self, controllers):
+        self._rows = {kind: [] for kind in LISTS}
+        # The latest filtered and sorted views, kept for the life of the
+        # snapshot so paging through a list only costs the page.
+        self._views = OrderedDict()
+        self._lock = Lock()
+        for controller in controllers.report()['controllers']:
+            slot = controller['fields']['slot']
+            drives = [
+                _row(drive, slot=slot, array=None)
+                for drive in controller['unassigned']]
+            logical_drives = 0
+            for array in controller['arrays']:
+                name = array['fields']['name']
+                self._rows['arrays'].append(_row(
+                    array, slot=slot,
+                    logical_drives=len(array['logical_drives']),
+                    physical_drives=len(array['physical_drives'])))
+                self._rows['logical_drives'].extend(
+                    _row(drive, slot=slot, array=name)
+                    for drive in array['logical_drives'])
+                drives.extend(
+                    _row(drive, slot=slot, array=name)
+                    for drive in array['physical_drives'])
+                logical_drives += len(array['logical_drives'])
+            self._rows['controllers'].append(_row(
+                controller, arrays=len(controller['arrays']),
+                logical_drives=logical_drives, physical_drives=len(drives)))
+            self._rows['physical_drives'].extend(drives)
+
+    def _view(self, kind, slot, array, statuses, sortfield, sortdir):
+        key = (kind, slot, array, statuses, sortfield, sortdir)
+        with self._lock:
+            view = self._views.get(key)
+            if view is not None:
+                self._views.move_to_end(key)
+                return view
+        view = self._rows[kind]
+        if slot is not None:
+            view = [row for row in view if row['slot'] == slot]
+        if array is not None:
+            view = [row for row in view if row.get('array') == array]
+        if statuses is not None:
+            view = [row for row in view if row['status'] in statuses]
+        if sortfield is not None:
+            view = sorted(
+                view, key=_sort_key(sortfield), reverse=sortdir == 'desc')
+        with self._lock:
+            self._views[key] = view
+            while len(self._views) > _MAX_VIEWS:
+                self._views.popitem(last=False)
+        return view
+
+    def query(self, request):
+        kind = request.get('list')
+        if kind not in LISTS:
+            raise SnapshotError(error=f'unknown list: {kind}')
+        sortfield = request.get('sortfield') or None
+        if sortfield is not None and sortfield not in _SORT_FIELDS[kind]:
+            raise SnapshotError(error=f'unknown sort field: {sortfield}')
+        sortdir = str(request.get('sortdir') or 'asc').lower()
+        if sortdir not in _SORT_DIRS:
+            raise SnapshotError(error=f'unknown sort direction: {sortdir}')
+        slot = request.get('slot')
+        array = request.get('array')
+        view = self._view(
+            kind, None if slot is None else str(slot),
+            None if array is None else str(array),
+            parse_statuses(request.get('status')), sortfield, sortdir)
+        start = max(0, int(request.get('start') or 0))
+        limit = request.get('limit')
+        end = None if limit is None or int(limit) < 0 else start + int(limit)
+        return {'total': len(view), 'data': view[start:end]}
+
+
+def build_response(controllers, request, confirmed=None, index=None):
+    updated = controllers.updated
+    if 'list' in request:
+        if index is None:
+            index = SnapshotIndex(controllers)
+        return dict(
+            index.query(request), updated=updated,
+            confirmed=confirmed or updated, status=controllers.health(),
+            format='list')
+    fmt = request.get('format', 'json')
+    if fmt not in _FORMATS:
+        raise SnapshotError(error=f'unknown format: {fmt}')
+    if fmt == 'nagios':
+        # The plugin line always covers every controller.
+        status, data = render_plugin(controllers)
+    else:
+        nodes = controllers.select(
+            slot=request.get('slot'), array=request.get('array'),
+            logical_drive=request.get('ld'), serial=request.get('serial'))
+        status, data = controllers.health(), render_nodes(nodes, fmt)
+    return {
+        'updated': updated,
+        'confirmed': confirmed or updated,
+        'status': status,
+        'format': fmt,
+        'data': data}
+
+
+class _SnapshotHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline(_MAX_REQUEST)
+        try:
+            request = json.loads(line or b'{}')
+            if not isinstance(request, dict):
+                raise ValueError('request must be a JSON object')
+            response = self.server.snapshot.query(request)
+        except (ValueError, SnapshotError) as exc:
+            response = json.dumps({'error': str(exc)}).encode('utf-8')
+        self.wfile.write(response + b'\n')
+
+
+class _SnapshotUnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class SnapshotServer():
+    def __init__(self, path=SOCKET_PATH):
+        self._path = path
+        self._lock = Lock()
+        self._controllers = None
+        self._confirmed = None
+        self._cache = {}
+        self._index = None
+        self._server = None
+
+    def update(self, controllers):
+        # The poller refreshes its tree in place, queries get a private copy
+        # that is fully evaluated here so handler threads only read it.
+        controllers = copy.deepcopy(controllers)
+        index = SnapshotIndex(controllers)
+        with self._lock:
+            self._controllers = controllers
+            self._confirmed = time.time()
+            self._cache = {}
+            self._index = index
+
+    def touch(self):
+        # Nothing changed, the published copy and its index are still valid.
+        with self._lock:
+            if self._controllers is not None:
+                self._confirmed = time.time()
+                self._cache = {}
+
+    def query(self, request):
+        if request.get('timings'):
+            return json.dumps(
+                {'timings': timings.stats()}).encode('utf-8')
+        with self._lock:
+            controllers = self._controllers
+            confirmed = self._confirmed
+            cache = self._cache
+            index = self._index
+        if controllers is None:
+            raise SnapshotError(error='no snapshot collected yet')
+        if 'list' in request:
+            return json.dumps(build_response(
+                controllers, request, confirmed, index)).encode('utf-8')
+        # Unfiltered requests are rendered once per snapshot.
+        cacheable = not any(request.get(key) for key in _FILTERS)
+        key = request.get('format', 'json')
+        if cacheable and key in cache:
+            return cache[key]
+        response = json.dumps(
+            build_response(controllers, request, confirmed)).encode('utf-8')
+        if cacheable:
+            cache[key] = response
+        return response
+
+    def start(self):
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+        self._server = _SnapshotUnixServer(self._path, _SnapshotHandler)
+        self._server.snapshot = self
+        os.chmod(self._path, 0o660)
+        Thread(
+            target=self._server.serve_forever, name='snapshot',
+            daemon=True).start()
+        logger.info(f'Serving snapshots on: {self._path}')
+
+    def close(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+
+
+def query_snapshot(path=SOCKET_PATH, timeout=_CLIENT_TIMEOUT, **request):
+    chunks = []
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(path)
+            sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        response = json.loads(b''.join(chunks))
+    except (OSError, ValueError) as exc:
+        raise SnapshotError(error=exc)
+    if 'error' in response:
+        raise SnapshotError(error=response['error'])
+    return response
@@ -1,14 +1,71 @@
+import hashlib
+import io
 import logging
 import os
+import re
+import signal
 import subprocess
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Thread, Timer
 
-import yaml
+from ssalib.timing import timed, timed_lines
 
 _DEF_VAL = 'n/a'
 _HP_SSA_CMD = '/usr/sbin/ssacli'
 _INDENT = '   '
+_ERR_TAIL_LINES = 20
+_SSA_CMD_TIMEOUT = 300
 _STATUSES = ['OK', 'Warning', 'Critical', 'Unknown']
+_OK, _WARNING, _CRITICAL, _UNKNOWN = range(len(_STATUSES))
+_SIZE_UNITS = {
+    unit: 1024 ** power
+    for power, unit in enumerate(('BYTES', 'KB', 'MB', 'GB', 'TB', 'PB'))}
+
+_CONTROLLER_STATUSES = (('ok', _OK), ('failed', _CRITICAL))
+_CACHE_STATUSES = (
+    ('ok', _OK), ('failed', _CRITICAL), ('temporarily disabled', _WARNING))
+_BATTERY_CAPACITOR_STATUSES = (
+    ('ok', _OK), ('failed', _CRITICAL), ('recharging', _WARNING))
+_ARRAY_STATUSES = (('ok', _OK), ('failed', _CRITICAL))
+_LOGICAL_DRIVE_STATUSES = (
+    ('ok', _OK), ('failed', _CRITICAL), ('recovering', _WARNING),
+    ('transforming', _WARNING), ('waiting', _WARNING))
+_PHYSICAL_DRIVE_STATUSES = (
+    ('ok', _OK), ('failed', _CRITICAL), ('rebuilding', _WARNING),
+    ('predictive failure', _WARNING))
+_STATUS_PROBE_CMDS = (
+    ('ctrl', 'all', 'show', 'status'),
+    ('ctrl', 'all', 'show', 'config'))
+
+# Counters read from the 'ssacli diag' report, True when a higher value is
+# worse, False for ratios where a lower value is worse.
+_DRIVE_COUNTERS = {
+    'Media Errors': True,
+    'Hard Read Errors': True,
+    'Recovered Read Errors': True,
+    'Hard Write Errors': True,
+    'Recovered Write Errors': True,
+    'Reallocated Sectors': True}
+_CONTROLLER_COUNTERS = {
+    'Cache Hit Ratio (%)': False}
+_COUNTERS = dict(_DRIVE_COUNTERS, **_CONTROLLER_COUNTERS)
+_DEF_COUNTER_LIMITS = {
+    'Media Errors': {_WARNING: 1},
+    'Hard Read Errors': {_WARNING: 1},
+    'Hard Write Errors': {_WARNING: 1}}
+
+_SLOT_RE = re.compile(r' in Slot (\S+)')
+_CMD_ID_RE = re.compile(r'=.*')
+_CMD_ID_ARGS = ('ld', 'pd', 'array')
+_PROGRESS_RE = re.compile(r'\d+(\.\d+)?%')
+_OPERATION_RE = re.compile(
+    r'^(?P<operation>[^,]+),\s*(?P<progress>\d+(?:\.\d+)?)%\s+complete',
+    re.IGNORECASE)
+_SERIAL_RE = re.compile(r'\(sn: ([^)\s]+)\)')
+
+_executor = None
 
 
 logger = logging.getLogger(__name__)
@@ -23,14 +80,38 @@ class SSACmdError(SSAException):
     message = "Error exacuting ssacli command: %(error)s"
 
 
-def _ssa_cmd(*args):
-    cmd = [_HP_SSA_CMD] + list(args)
+class SSANodeError(SSAException):
+    message = "Smart Array node not found: %(node)s"
 
-    _PIPE = subprocess.PIPE
-    _DEVNULL = subprocess.DEVNULL
 
+def _ssa_env():
     new_environ = os.environ.copy()
     new_environ['LC_ALL'] = "C"
+    return new_environ
+
+
+class SSACmdOutput():
+    def __init__(self, lines=()):
+        self.lines = lines
+        self.stderr = ''
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def read(self):
+        return '\n'.join(self).strip()
+
+
+def _kill_process_group(obj):
+    try:
+        os.killpg(obj.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _ssa_cmd_lines(cmd, timeout, output):
+    _PIPE = subprocess.PIPE
+    _DEVNULL = subprocess.DEVNULL
 
     try:
         logger.debug(f'SSACmd: {cmd}')
@@ -39,217 +120,786 @@ def _ssa_cmd(*args):
             stdin=_DEVNULL,
             stdout=_PIPE,
             stderr=_PIPE,
-            env=new_environ)
+            env=_ssa_env(),
+            start_new_session=True)
     except Exception as exc:
         raise SSACmdError(error=exc)
 
+    # Drain stderr in the background so a chatty ssacli can never block on
+    # a full pipe while stdout is being consumed.
+    err_chunks = []
+    err_reader = Thread(
+        target=lambda: err_chunks.append(obj.stderr.read()),
+        name='ssacmd-stderr', daemon=True)
+    err_reader.start()
+    timed_out = Event()
+
+    def _kill():
+        timed_out.set()
+        _kill_process_group(obj)
+
+    timer = Timer(timeout, _kill) if timeout else None
+    if timer:
+        timer.start()
+
+    out_tail = deque(maxlen=_ERR_TAIL_LINES)
     try:
+        for raw_line in obj.stdout:
+            line = raw_line.decode('utf-8', 'replace').rstrip()
+            out_tail.append(line)
+            yield line
         obj.wait()
-    except Exception as exc:
+    finally:
+        if timer:
+            timer.cancel()
+        if obj.returncode is None:
+            _kill_process_group(obj)
+            obj.wait()
         obj.stdout.close()
-        raise SSACmdError(error=exc)
-
-    out, err = obj.communicate()
-    out = out.decode('utf-8').rstrip().lstrip()
-    err = err.decode('utf-8').rstrip().lstrip()
+        err_reader.join()
+        obj.stderr.close()
 
+    err = b''.join(err_chunks).decode('utf-8', 'replace').strip()
+    output.stderr = err
+    if timed_out.is_set():
+        raise SSACmdError(error=f'{cmd} timed out after {timeout}s')
     if obj.returncode != 0:
+        out = '\n'.join(out_tail).strip()
         error = f'stdout: {out}' if out else ''
         error += f'stderr: {err}' if err else ''
         raise SSACmdError(error=error)
 
-    return out, err
+
+def set_executor(executor):
+    global _executor
+    previous, _executor = _executor, executor
+    return previous
+
+
+def _ssa_cmd_stage(args):
+    # 'ctrl slot=1 ld 2 show detail' is timed as 'ctrl slot=* ld * show
+    # detail' so every controller and drive shares the same percentiles.
+    words = []
+    for arg in args:
+        if words and words[-1] in _CMD_ID_ARGS and arg != 'all':
+            arg = '*'
+        words.append(_CMD_ID_RE.sub('=*', arg))
+    return 'ssacli ' + ' '.join(words)
+
+
+def _ssa_cmd(*args, timeout=_SSA_CMD_TIMEOUT, session=True):
+    # Slow commands pass session=False so they never hold up a console.
+    if session and _executor is not None:
+        output = _executor.run(args, timeout)
+    else:
+        cmd = [_HP_SSA_CMD] + list(args)
+        output = SSACmdOutput()
+        output.lines = _ssa_cmd_lines(cmd, timeout, output)
+    output.lines = timed_lines(_ssa_cmd_stage(args), output.lines)
+    return output
+
+
+def get_status_fingerprint(timeout=_SSA_CMD_TIMEOUT):
+    digest = hashlib.blake2b(digest_size=16)
+    for args in _STATUS_PROBE_CMDS:
+        for line in _ssa_cmd(*args, timeout=timeout):
+            # Rebuild/transform progress is followed up separately, only
+            # a change of state should trigger a full check.
+            line = _PROGRESS_RE.sub('%', line.strip())
+            if line:
+                digest.update(line.encode('utf-8')+b'\n')
+    return digest.hexdigest()
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_bytes(value):
+    # ssacli reports sizes in binary units, e.g. '1.82 TB' for a 2TB drive.
+    number, _, unit = value.partition(' ')
+    try:
+        return int(float(number) * _SIZE_UNITS[unit.strip().upper()])
+    except (KeyError, ValueError):
+        return None
+
+
+def _format_bytes(value):
+    for unit in ('PB', 'TB', 'GB', 'MB', 'KB'):
+        if value >= _SIZE_UNITS[unit]:
+            return f'{value / _SIZE_UNITS[unit]:.1f} {unit}'
+    return f'{value:.0f} B'
+
+
+def _format_duration(seconds):
+    minutes, _ = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    if days:
+        return f'{days}d {hours}h'
+    if hours:
+        return f'{hours}h {minutes}m'
+    return f'{minutes}m'
+
+
+def _decode_status(value, prefixes):
+    value = value.lower()
+    for prefix, status in prefixes:
+        if value.startswith(prefix):
+            return status
+    return _UNKNOWN
+
+
+def _check_temperature(name, current, maximum, rise=None):
+    if current is None or maximum is None:
+        logger.warning(
+            f'{name} temperature ({current}) or maximum ({maximum}) '
+            'not available')
+        return _UNKNOWN
+    if current >= maximum:
+        return _CRITICAL
+    if current == (maximum - 1):
+        return _WARNING
+    if rise is not None:
+        logger.warning(
+            f'{name} temperature ({current}) rising {rise:.1f} C/h '
+            f'towards maximum ({maximum})')
+        return _WARNING
+    return _OK
+
+
+def _temperature_reason(name, status, current, maximum, rise=None):
+    if status == _OK:
+        return None
+    if current is None:
+        return f'{name} temperature not available'
+    if maximum is None:
+        return f'{name} maximum temperature not configured'
+    if current >= maximum:
+        return f'{name} temperature {current}C reached maximum {maximum}C'
+    if rise is not None and current < maximum - 1:
+        return (f'{name} temperature {current}C rising {rise:.1f}C/h '
+                f'towards maximum {maximum}C')
+    return f'{name} temperature {current}C close to maximum {maximum}C'
+
+
+def _status_reason(name, status, value):
+    if status == _OK:
+        return None
+    return f'{name} status: {value}'
+
+
+def _temperature_fields(status, current, maximum, rise=None):
+    return {
+        'temperature': current,
+        'max_temperature': maximum,
+        'temperature_rise': rise,
+        'temperature_status': _STATUSES[status]}
+
+
+def _component(name, status, description, reasons, fields):
+    return {
+        'type': name,
+        'status': status,
+        'status_str': _STATUSES[status],
+        'check': status,
+        'reasons': [reason for reason in reasons if reason],
+        'description': description,
+        'fields': fields}
+
+
+def _report_line(node, indent, statuses):
+    if statuses and node['type'] != 'Controller':
+        return f"{indent}{_STATUSES[node['check']]} - {node['description']}"
+    return f"{indent}{node['description']}"
+
+
+def _report_lines(node, depth, statuses):
+    yield _report_line(node, _INDENT * depth, statuses)
+    for component in node.get('components', ()):
+        yield _report_line(component, _INDENT * (depth+1), statuses)
+    for drive in node.get('unassigned', ()):
+        yield 'Unassinged:'
+        yield from _report_lines(drive, depth+1, statuses)
+    for key in ('arrays', 'logical_drives', 'physical_drives'):
+        for child in node.get(key, ()):
+            yield from _report_lines(child, depth+1, statuses)
+
+
+def render_report(report, indent=0, statuses=True):
+    if 'controllers' in report:
+        return '\n\n'.join([
+            render_report(controller, indent, statuses)
+            for controller in report['controllers']] + [
+            time.strftime(
+                'Updated At: %H:%M:%S %d-%m-%Y',
+                time.localtime(report['updated']))])
+    return '\n'.join(_report_lines(report, indent, statuses))
+
+
+def _check_counters(name, counters, limits):
+    if not counters:
+        return _OK, []
+    status, reasons = _OK, []
+    for counter, value in counters.items():
+        levels = limits.get(counter)
+        if not levels:
+            continue
+        higher = _COUNTERS[counter]
+        for level in (_CRITICAL, _WARNING):
+            limit = levels.get(level)
+            if limit is None:
+                continue
+            if (value >= limit) if higher else (value <= limit):
+                status = max(status, level)
+                compare = 'at or above' if higher else 'at or below'
+                reasons.append(
+                    f'{name} {counter} {value:g} {compare} '
+                    f'{_STATUSES[level].lower()} level {limit:g}')
+                break
+    return status, reasons
+
+
+def _counters_description(counters):
+    return ', '.join(
+        f'{counter}: {value:g}' for counter, value in counters.items())
+
+
+def _power_source_name(source):
+    # 'Capacitors' -> 'Capacitor', 'Batteries' -> 'Battery'
+    if source.endswith('ies'):
+        return source[:-3] + 'y'
+    if source.endswith('s'):
+        return source[:-1]
+    return source
+
+
+def _drive_type(drive_type):
+    if drive_type.lower().startswith('solid state '):
+        return f'{drive_type[12:]} SSD'
+    if drive_type.lower().startswith('ssd'):
+        return f'{drive_type[:-3]} SSD'
+    if drive_type != _DEF_VAL:
+        return drive_type + ' HDD'
+    return drive_type
 
 
 def _indent(indents):
-    depth = ""
-    for _ in range(indents):
-        depth += _INDENT
-    return depth
+    return _INDENT * indents
 
 
 def get_status_str(status):
     return _STATUSES[status]
 
 
+def _model_key(model):
+    return ' '.join(str(model).split()).lower()
+
+
+class ControllerThresholds():
+    __slots__ = (
+        'controller', 'cache', 'power_sources', 'drives', 'diagnostics')
+
+    def __init__(
+            self, controller=None, cache=None, power_sources=None,
+            drives=None, diagnostics=None):
+        self.controller = controller
+        self.cache = cache
+        self.power_sources = power_sources or {}
+        self.drives = drives or {}
+        self.diagnostics = (
+            _DEF_COUNTER_LIMITS if diagnostics is None else diagnostics)
+
+    def power_source(self, name):
+        return self.power_sources.get(name)
+
+    def drive(self, model):
+        return self.drives.get(_model_key(model))
+
+
 class Controllers():
     PART_INFO_STR = 'Disk Partition Information'
     SEP_STR = 'SEP'
 
-    def __init__(self, configFile=None):
+    def __init__(
+            self, timeout=_SSA_CMD_TIMEOUT, workers=0, raw_configs=None,
+            thresholds=None):
         self._config_time = None
         self._controllers = []
-        self.status = _STATUSES.index('OK')
-        self._configFile = configFile
+        self.status = _OK
+        # The compiled external config, see ssalib.thresholds.
+        self._thresholds = thresholds
+        self._timeout = timeout
+        self._workers = workers
 
-        self.update_controllers()
+        self.update_controllers(raw_configs)
+
+    def _section(self, configs_dict, master_key):
+        if master_key in ('Logical Drives', 'Physical Drives'):
+            return configs_dict['Arrays'][-1][master_key][-1]
+        if master_key in ('Ports', 'Arrays', 'Unassigned'):
+            return configs_dict[master_key][-1]
+        if master_key == self.SEP_STR:
+            return configs_dict[master_key]
+        return configs_dict
 
     def _update_configs_dict(self, configs_dict, master_key, line):
         key, value = self._get_key_and_value(line)
-        if key in ('Port Name', 'Array', 'Unassigned'):
-            master_key = (
-                key.split(' ')[0]+'s'
-                if key in ('Port Name', 'Array') else key)
-            if master_key not in configs_dict:
-                configs_dict[master_key] = []
+        if key in ('Port Name', 'Array'):
+            master_key = key.split(' ')[0]+'s'
+            configs_dict.setdefault(master_key, []).append({})
+        elif key == 'Unassigned':
+            configs_dict.setdefault(key, [])
+            return key
+        elif key == 'Physical Drive' and master_key == 'Unassigned':
             configs_dict[master_key].append({})
         elif key in ('Physical Drive', 'Logical Drive'):
             master_key = key+'s'
-            if master_key not in configs_dict['Arrays'][-1]:
-                configs_dict['Arrays'][-1][master_key] = []
-            configs_dict['Arrays'][-1][master_key].append({})
+            configs_dict['Arrays'][-1].setdefault(master_key, []).append({})
         elif key == self.SEP_STR:
             configs_dict[key] = {}
             return key
 
-        if master_key in ('Ports', 'Arrays', 'Unassigned'):
-            configs_dict[master_key][-1][key] = value
-        elif master_key in ('Logical Drives', 'Physical Drives'):
-            if key == self.PART_INFO_STR:
-                configs_dict['Arrays'][-1][master_key][-1][key] = {}
-            elif key.startswith('Partition'):
-                configs_dict['Arrays'][-1][master_key][-1][
-                    self.PART_INFO_STR][key] = value
-            else:
-                configs_dict['Arrays'][-1][master_key][-1][key] = value
-        elif master_key == self.SEP_STR:
-            configs_dict[master_key][key] = value
-        elif master_key == self.__class__.__name__:
-            configs_dict[key] = value
+        section = self._section(configs_dict, master_key)
+        if key == self.PART_INFO_STR:
+            section[key] = {}
+        elif key.startswith('Partition') and self.PART_INFO_STR in section:
+            section[self.PART_INFO_STR][key] = value
+        else:
+            section[key] = value
         return master_key
 
     def _get_key_and_value(self, raw_config_line):
-        line = raw_config_line.lstrip().rstrip()
+        line = raw_config_line.strip()
         if line.startswith('physicaldrive'):
             line = line.replace('physicaldrive', 'Physical Drive:')
         elif line.startswith(self.SEP_STR):
             return self.SEP_STR, None
         elif line == self.PART_INFO_STR:
             return line, None
-        data = line.split(':', 1)
-        return data[0].rstrip(), data[1].lstrip()
+        key, sep, value = line.partition(':')
+        return key.rstrip(), (value.lstrip() if sep else None)
 
+    @timed('parse')
     def _raw_configs_to_dict(self, raw_configs):
-        lines = list(filter(None, raw_configs.split('\n')))
-        master_key = self.__class__.__name__
-        configs_dict = {master_key: []}
-
-        for line in lines:
+        if isinstance(raw_configs, str):
+            raw_configs = io.StringIO(raw_configs)
+        root_key = self.__class__.__name__
+        configs_dict = {root_key: []}
+        master_key = root_key
+
+        for line in raw_configs:
+            line = line.rstrip()
+            if not line.strip():
+                continue
             # New controller found.
             if not line.startswith(' '):
-                configs_dict[master_key].append(
+                configs_dict[root_key].append(
                     {'Smart Array Type': line.split(' in')[0]})
+                master_key = root_key
+                continue
+            # Lines before the first controller header carry no context.
+            if not configs_dict[root_key]:
                 continue
             # New or updating section.
             master_key = self._update_configs_dict(
-              configs_dict[self.__class__.__name__][-1],
+              configs_dict[root_key][-1],
               master_key,
               line)
         return configs_dict
 
+    def _list_slots(self):
+        slots = []
+        for line in _ssa_cmd('ctrl', 'all', 'show', timeout=self._timeout):
+            match = _SLOT_RE.search(line)
+            if match:
+                serial = _SERIAL_RE.search(line)
+                slots.append((
+                    line.split(' in')[0].strip(), match.group(1),
+                    serial.group(1) if serial else _DEF_VAL))
+        return slots
+
+    def _get_slot_configs(self, slot):
+        raw = _ssa_cmd(
+            'ctrl', f'slot={slot}', 'show', 'config', 'detail',
+            timeout=self._timeout)
+        configs_dict = self._raw_configs_to_dict(raw)
+        return configs_dict[self.__class__.__name__], raw.stderr
+
+    def _get_slots_configs(self):
+        slots = self._list_slots()
+        controllers = []
+        with ThreadPoolExecutor(
+                max_workers=max(1, min(self._workers, len(slots))),
+                thread_name_prefix='ssa-slot') as executor:
+            futures = [
+                (sa_type, slot, serial,
+                 executor.submit(self._get_slot_configs, slot))
+                for sa_type, slot, serial in slots]
+            for sa_type, slot, serial, future in futures:
+                try:
+                    configs, stderr = future.result()
+                except SSACmdError as exc:
+                    # Only this controller is unknown, the rest still report.
+                    logger.warning(f'Slot {slot} collection failed: {exc}')
+                    controllers.append({
+                        'Smart Array Type': sa_type,
+                        'Slot': slot,
+                        'Serial Number': serial,
+                        'Controller Status': 'Unknown (collection failed)'})
+                    continue
+                if stderr:
+                    logger.warning(f'_ssc_cmd slot={slot} stderr: {stderr}')
+                    self.status = _WARNING
+                controllers.extend(configs)
+        return {self.__class__.__name__: controllers}
+
     def _get_controllers_configs(self):
-        raw, stderr = _ssa_cmd('ctrl', 'all', 'show', 'config', 'detail')
+        if self._workers:
+            return self._get_slots_configs()
+        raw = _ssa_cmd(
+            'ctrl', 'all', 'show', 'config', 'detail', timeout=self._timeout)
         configs_dict = self._raw_configs_to_dict(raw)
-        if stderr:
-            logger.warning(f'_ssc_cmd stderr: {stderr}')
-            self.status = _STATUSES.index('Warning')
+        if raw.stderr:
+            logger.warning(f'_ssc_cmd stderr: {raw.stderr}')
+            self.status = _WARNING
         return configs_dict
 
-    def _load_ext_details(self, filename=None):
-        try:
-            with open(filename, 'r') as stream:
-                return yaml.safe_load(stream)
-        except (yaml.YAMLError, FileNotFoundError) as exc:
-            logger.warning(exc)
-        except TypeError:
-            logger.warning('No Smart Array external config defined')
-        return {}
-
-    def update_controllers(self):
-        ext_values = None
+    def _controller_thresholds(self, config_dict):
+        if self._thresholds is None:
+            return None
+        return self._thresholds.controller(
+            config_dict.get('Smart Array Type', _DEF_VAL))
+
+    def update_controllers(self, raw_configs=None):
         self._config_time = time.time()
-        configs_dict = self._get_controllers_configs()
-        if self._configFile:
-            ext_values = self._load_ext_details(self._configFile)
+        if raw_configs is None:
+            configs_dict = self._get_controllers_configs()
+        else:
+            configs_dict = self._raw_configs_to_dict(raw_configs)
         for config_dict in configs_dict.pop(self.__class__.__name__, []):
-            values = {}
-            if ext_values:
-                try:
-                    type = config_dict.get('Smart Array Type', _DEF_VAL)
-                    values = ext_values[type]
-                except KeyError as exc:
-                    logger.warning(
-                        'Controller eternal config not '
-                        f'found or invalid key: {exc}')
-            self._controllers.append(Controller(config_dict, values))
+            self._controllers.append(Controller(
+                config_dict, self._controller_thresholds(config_dict)))
+
+    @timed('parse')
+    def _parse_details(self, raw):
+        # 'show detail' output of single arrays, logical or physical drives,
+        # the 'Array A' and 'Unassigned' container lines carry no values.
+        entries = []
+        section = None
+        for line in raw:
+            if not line.strip() or not line.startswith(' '):
+                continue
+            key, value = self._get_key_and_value(line)
+            if key in ('Array', 'Logical Drive', 'Physical Drive') and (
+                    value is not None):
+                section = {key: value}
+                entries.append(section)
+            elif section is None:
+                continue
+            elif key == self.PART_INFO_STR:
+                section[key] = {}
+            elif key.startswith('Partition') and self.PART_INFO_STR in section:
+                section[self.PART_INFO_STR][key] = value
+            elif value is not None:
+                section[key] = value
+        return entries
+
+    def _get_details(self, slot, kind, *args):
+        raw = _ssa_cmd(
+            'ctrl', f'slot={slot}', *args, 'show', 'detail',
+            timeout=self._timeout)
+        entries = [
+            entry for entry in self._parse_details(raw) if kind in entry]
+        if raw.stderr:
+            logger.warning(f'_ssc_cmd slot={slot} stderr: {raw.stderr}')
+        if not entries:
+            raise SSANodeError(node=f"slot={slot} {' '.join(args)}")
+        return entries
+
+    def _find_controller(self, slot):
+        for controller in self._controllers:
+            if controller.slot == str(slot):
+                return controller
+        raise SSANodeError(node=f'slot={slot}')
+
+    def refresh_controller(self, slot):
+        old = self._find_controller(slot)
+        configs, stderr = self._get_slot_configs(slot)
+        if not configs:
+            raise SSANodeError(node=f'slot={slot}')
+        if stderr:
+            logger.warning(f'_ssc_cmd slot={slot} stderr: {stderr}')
+        config_dict = configs[0]
+        new = Controller(
+            config_dict, self._controller_thresholds(config_dict))
+        self._controllers[self._controllers.index(old)] = new
+        return new
+
+    def refresh_array(self, slot, name):
+        controller = self._find_controller(slot)
+        old = controller.find_array(name)
+        if old is None:
+            raise SSANodeError(node=f'slot={slot} array {name}')
+        array = self._get_details(slot, 'Array', 'array', name)[0]
+        array['Logical Drives'] = self._get_details(
+            slot, 'Logical Drive', 'array', name, 'ld', 'all')
+        array['Physical Drives'] = self._get_details(
+            slot, 'Physical Drive', 'array', name, 'pd', 'all')
+        new = Array(array, controller._thresholds)
+        controller.replace_child(old, new)
+        return new
+
+    def refresh_logical_drive(self, slot, number):
+        controller = self._find_controller(slot)
+        parent, old = controller.find_logical_drive(number)
+        if old is None:
+            raise SSANodeError(node=f'slot={slot} ld {number}')
+        new = LogicalDrive(
+            self._get_details(slot, 'Logical Drive', 'ld', str(number))[0])
+        parent.replace_child(old, new)
+        controller.invalidate()
+        return new
+
+    def refresh_physical_drive(self, slot, location):
+        controller = self._find_controller(slot)
+        parent, old = controller.find_physical_drive(location)
+        if old is None:
+            raise SSANodeError(node=f'slot={slot} pd {location}')
+        new = PhysicalDrive(
+            self._get_details(slot, 'Physical Drive', 'pd', location)[0],
+            controller._thresholds)
+        parent.replace_child(old, new)
+        controller.invalidate()
+        return new
+
+    @property
+    def updated(self):
+        return self._config_time
+
+    @property
+    def controllers(self):
+        return self._controllers
 
     def _format_config_time(self):
         return (time.strftime('Updated At: %H:%M:%S %d-%m-%Y',
                 time.localtime(self._config_time)))
 
-    def is_ok(self, indent=0):
-        description = ''
+    def health(self):
         status = self.status
         for controller in self._controllers:
-            cont_status, cont_details = controller.is_ok()
-            status = max(cont_status, status)
-            description += f'{cont_details}\n\n'
-        description += self._format_config_time()
-        return status, description
+            status = max(status, controller.health())
+        return status
 
-    def simple_description(self, indent=0):
-        description = ''
-        for controller in self._controllers:
-            description += f'{controller.simple_description(indent)}\n\n'
-        description += self._format_config_time()
-        return description
+    @timed('evaluate')
+    def is_ok(self, indent=0):
+        return self.health(), render_report(self.report())
 
+    def select(self, slot=None, array=None, logical_drive=None, serial=None):
+        nodes = []
+        for controller in self._controllers:
+            if slot is None or controller.slot == str(slot):
+                nodes.extend(
+                    controller.select(array, logical_drive, serial))
+        return nodes
+
+    def _serialize(self, node_dict):
+        status = self.health()
+        return {
+            'status': status,
+            'status_str': _STATUSES[status],
+            'updated': self._config_time,
+            'controllers': [
+                controller.serialize(node_dict)
+                for controller in self._controllers]}
+
+    def to_dict(self):
+        return self._serialize('details_dict')
+
+    def report(self):
+        return self._serialize('report_dict')
 
-class Controller():
-    def __init__(self, controller, values):
-        self._arrays = [Array(array) for array in controller.pop('Arrays', [])]
+    def simple_description(self, indent=0):
+        return render_report(self.report(), indent, statuses=False)
+
+
+class _Node():
+    # Only controllers and physical drives get diagnostic counters.
+    __slots__ = ('_details', '_health', 'counters', '_counters_status')
+
+    def __init__(self, details):
+        self._details = details
+        self._health = None
+        self.counters = None
+        self._counters_status = None
+
+    def _get(self, key):
+        return self._details.get(key, _DEF_VAL)
+
+    def detail(self, key):
+        # A single value as reported by ssacli, e.g. 'Cache Status'.
+        return self._get(key)
+
+    def check(self):
+        raise NotImplementedError
+
+    def summary(self):
+        raise NotImplementedError
+
+    def _children(self):
+        return ()
+
+    def _evaluate(self):
+        status = self.check()
+        for _, children in self._children():
+            for child in children:
+                status = max(status, child.health())
+        return status
+
+    def health(self):
+        if self._health is None:
+            self._health = self._evaluate()
+        return self._health
+
+    def invalidate(self):
+        self._health = None
+
+    def set_counters(self, counters):
+        # Diagnostic counters arrive on their own cadence, re-evaluate.
+        self.counters = counters or None
+        self._counters_status = None
+        self.invalidate()
+
+    def _counters_check(self, name, limits):
+        if self._counters_status is None:
+            self._counters_status = _check_counters(
+                name, self.counters, limits)
+        return self._counters_status
+
+    def replace_child(self, old, new):
+        # Splice a refreshed node in, the memoized health is stale now.
+        for _, children in self._children():
+            for index, child in enumerate(children):
+                if child is old:
+                    children[index] = new
+        self.invalidate()
+
+    def _reasons(self):
+        raise NotImplementedError
+
+    def _fields(self):
+        raise NotImplementedError
+
+    def _node_dict(self):
+        status = self.health()
+        return {
+            'type': self.__class__.__name__,
+            'status': status,
+            'status_str': _STATUSES[status]}
+
+    def details_dict(self):
+        node = self._node_dict()
+        node['details'] = dict(self._details)
+        return node
+
+    def report_dict(self, reasons=None):
+        node = self._node_dict()
+        reasons = self._reasons() if reasons is None else reasons
+        node.update(
+            check=self.check(),
+            reasons=[reason for reason in reasons if reason],
+            description=self.summary(),
+            fields=self._fields())
+        return node
+
+    def serialize(self, node_dict):
+        # One walk for every format, node_dict names the method that
+        # renders a single node.
+        node = getattr(self, node_dict)()
+        for key, children in self._children():
+            node[key] = [child.serialize(node_dict) for child in children]
+        return node
+
+    def to_dict(self):
+        return self.serialize('details_dict')
+
+    def report(self):
+        return self.serialize('report_dict')
+
+
+class Controller(_Node):
+    __slots__ = (
+        '_arrays', '_unassinged_physical_drives', '_thresholds',
+        'slot', 'model', 'serial', 'cache_present', 'power_source',
+        'controller_status', 'cache_status',
+        'battery_capacitor_status', 'temperature', 'max_temperature',
+        'cache_temperature', 'max_cache_temperature',
+        'battery_capacitor_temperature', 'max_battery_capacitor_temperature',
+        'temperature_rise', 'cache_temperature_rise',
+        'battery_capacitor_temperature_rise',
+        '_temperature_status', '_cache_temperature_status',
+        '_battery_capacitor_temperature_status')
+
+    def __init__(self, controller, thresholds=None):
+        if thresholds is None:
+            thresholds = ControllerThresholds()
+        self._arrays = [
+            Array(array, thresholds) for array in controller.pop('Arrays', [])]
         self._unassinged_physical_drives = [
-            PhysicalDrive(drive) for drive in controller.pop('Unassigned', [])]
-        self._details = controller
-        self._ext_values = values
+            PhysicalDrive(drive, thresholds)
+            for drive in controller.pop('Unassigned', [])]
+        super().__init__(controller)
+        self._thresholds = thresholds
+        self.slot = self._get('Slot')
+        self.model = self._get('Smart Array Type')
+        self.serial = self._get('Serial Number')
+        self.cache_present = self._get(
+            'Cache Board Present').lower() not in ('false', _DEF_VAL)
+        self.power_source = _power_source_name(
+            self._get('Cache Backup Power Source'))
+        self.controller_status = _decode_status(
+            self._get('Controller Status'), _CONTROLLER_STATUSES)
+        self.cache_status = _decode_status(
+            self._get('Cache Status'), _CACHE_STATUSES)
+        self.battery_capacitor_status = _decode_status(
+            self._get('Battery/Capacitor Status'),
+            _BATTERY_CAPACITOR_STATUSES)
+        self.temperature = _to_int(self._get('Controller Temperature (C)'))
+        self.max_temperature = thresholds.controller
+        self.cache_temperature = _to_int(
+            self._get('Cache Module Temperature (C)'))
+        self.max_cache_temperature = thresholds.cache
+        self.battery_capacitor_temperature = _to_int(
+            self._get(f'{self.power_source} Temperature  (C)'))
+        self.max_battery_capacitor_temperature = thresholds.power_source(
+            self.power_source)
+        self.temperature_rise = None
+        self.cache_temperature_rise = None
+        self.battery_capacitor_temperature_rise = None
+        self._temperature_status = None
+        self._cache_temperature_status = None
+        self._battery_capacitor_temperature_status = None
 
     def check_cache(self):
-        if self._details.get(
-                'Cache Board Present', 'false').lower() == 'false':
-            return _STATUSES.index('OK')
-        status = self._details.get('Cache Status', _DEF_VAL).lower()
-        if status.startswith('ok'):
-            return _STATUSES.index('OK')
-        if status.startswith('failed'):
-            return _STATUSES.index('Critical')
-        if status.startswith('temporarily disabled'):
-            return _STATUSES.index('Warning')
-        return _STATUSES.index('Unknown')
+        if not self.cache_present:
+            return _OK
+        return self.cache_status
 
     def check_cache_temperature(self):
-        if self._details.get(
-                'Cache Board Present', 'false').lower() == 'false':
-            return _STATUSES.index('OK')
-        try:
-            current_temp = int(self._details.get(
-                'Cache Module Temperature (C)',
-                _DEF_VAL))
-            max_temp = int(self._ext_values.get(
-                'Cache Module Maximum Temperature (C)',
-                _DEF_VAL))
-        except ValueError as exc:
-            logger.warning(exc)
-            return _STATUSES.index('Unknown')
-        if current_temp >= max_temp:
-            return _STATUSES.index('Critical')
-        if current_temp == (max_temp - 1):
-            return _STATUSES.index('Warning')
-        return _STATUSES.index('OK')
+        if not self.cache_present:
+            return _OK
+        if self._cache_temperature_status is None:
+            self._cache_temperature_status = _check_temperature(
+                'Cache Module', self.cache_temperature,
+                self.max_cache_temperature, self.cache_temperature_rise)
+        return self._cache_temperature_status
 
     def is_cache_ok(self, indent=0):
-        if self._details.get(
-                'Cache Board Present', 'false').lower() == 'false':
-            return _STATUSES.index('OK'), ''
+        if not self.cache_present:
+            return _OK, ''
         temp = self.check_cache_temperature()
         status = max(self.check_cache(), temp)
         return status, (
@@ -258,42 +908,26 @@ class Controller():
             f'{self.simple_cache_description(temperature=temp)}')
 
     def simple_cache_description(self, indent=0, temperature=None):
-        if self._details.get(
-                'Cache Board Present', 'false').lower() == 'false':
+        if not self.cache_present:
             return ''
         temp = (temperature if temperature is not None
                 else self.check_cache_temperature())
         return (
             f'{_indent(indent)}Cache Status: '
-            f"(SN: {self._details.get('Cache Serial Number', _DEF_VAL)}, "
+            f"(SN: {self._get('Cache Serial Number')}, "
             f'Temp: {_STATUSES[temp]}, '
-            f"{self._details.get('Total Cache Size', _DEF_VAL)} GB, "
-            f"{self._details.get('Cache Status', _DEF_VAL)})")
+            f"{self._get('Total Cache Size')} GB, "
+            f"{self._get('Cache Status')})")
 
     def check_controller(self):
-        status = self._details.get('Controller Status', _DEF_VAL).lower()
-        if status.startswith('ok'):
-            return _STATUSES.index('OK')
-        if status.startswith('failed'):
-            return _STATUSES.index('Critical')
-        return _STATUSES.index('Unknown')
+        return self.controller_status
 
     def check_controller_temperature(self):
-        try:
-            current_temp = int(self._details.get(
-                'Controller Temperature (C)',
-                _DEF_VAL))
-            max_temp = int(self._ext_values.get(
-                'Controller Maximum Temperature (C)',
-                _DEF_VAL))
-        except ValueError as exc:
-            logger.warning(exc)
-            return _STATUSES.index('Unknown')
-        if current_temp >= max_temp:
-            return _STATUSES.index('Critical')
-        if current_temp == (max_temp - 1):
-            return _STATUSES.index('Warning')
-        return _STATUSES.index('OK')
+        if self._temperature_status is None:
+            self._temperature_status = _check_temperature(
+                'Controller', self.temperature, self.max_temperature,
+                self.temperature_rise)
+        return self._temperature_status
 
     def is_controller_ok(self, indent=0):
         temp = self.check_controller_temperature()
@@ -308,51 +942,26 @@ class Controller():
                 else self.check_controller_temperature())
         return (
             f'{_indent(indent)}Controller Status: '
-            f"(SN: {self._details.get('Serial Number', _DEF_VAL)}, "
+            f"(SN: {self._get('Serial Number')}, "
             f'Temp: {_STATUSES[temp]}, '
-            f"{self._details.get('Controller Status', _DEF_VAL)})")
+            f"{self._get('Controller Status')})")
 
     def check_battery_capacitor(self):
-        status = self._details.get(
-            'Battery/Capacitor Status', _DEF_VAL).lower()
-        if status.startswith('ok'):
-            return _STATUSES.index('OK')
-        if status.startswith('failed'):
-            return _STATUSES.index('Critical')
-        if status.startswith('recharging'):
-            return _STATUSES.index('Warning')
-        return _STATUSES.index('Unknown')
+        return self.battery_capacitor_status
 
     def check_battery_capacitor_temperature(self):
-        if self._details.get(
-                'Cache Board Present', 'false').lower() == 'false':
-            return _STATUSES.index('OK')
-        power_source = self._details.get(
-            'Cache Backup Power Source',
-            _DEF_VAL+' ')[:-1]
-        try:
-            power_source = self._details.get(
-                'Cache Backup Power Source',
-                _DEF_VAL+' ')[:-1]
-            current_temp = int(self._details.get(
-                power_source+' Temperature  (C)',
-                _DEF_VAL))
-            max_temp = int(self._ext_values.get(
-                power_source+' Maximum Temperature (C)',
-                _DEF_VAL))
-        except ValueError as exc:
-            logger.warning(exc)
-            return _STATUSES.index('Unknown')
-        if current_temp >= max_temp:
-            return _STATUSES.index('Critical')
-        if current_temp == (max_temp - 1):
-            return _STATUSES.index('Warning')
-        return _STATUSES.index('OK')
+        if not self.cache_present:
+            return _OK
+        if self._battery_capacitor_temperature_status is None:
+            self._battery_capacitor_temperature_status = _check_temperature(
+                self.power_source, self.battery_capacitor_temperature,
+                self.max_battery_capacitor_temperature,
+                self.battery_capacitor_temperature_rise)
+        return self._battery_capacitor_temperature_status
 
     def is_battery_capacitor_ok(self, indent=0):
-        if self._details.get(
-                'Cache Board Present', 'false').lower() == 'false':
-            return ''
+        if not self.cache_present:
+            return _OK, ''
         temp = self.check_battery_capacitor_temperature()
         status = max(self.check_battery_capacitor(), temp)
         return status, (
@@ -361,207 +970,438 @@ class Controller():
             f'{self.simple_battery_capacitor_description(temperature=temp)}')
 
     def simple_battery_capacitor_description(self, indent=0, temperature=None):
-        if self._details.get(
-                'Cache Board Present', 'false').lower() == 'false':
+        if not self.cache_present:
             return ''
         temp = (temperature if temperature is not None
                 else self.check_battery_capacitor_temperature())
-        source = self._details.get(
-            'Cache Backup Power Source',
-            _DEF_VAL+" ")[:-1]
         return (
             f'{_indent(indent)}Battery/Capacitor Status: '
             f'(Temp: {_STATUSES[temp]}, '
-            f'Source: {source}, '
-            f"{self._details.get('Battery/Capacitor Status', _DEF_VAL)})")
+            f'Source: {self.power_source}, '
+            f"{self._get('Battery/Capacitor Status')})")
+
+    def check_diagnostics(self):
+        return self._counters_check(
+            'Controller', self._thresholds.diagnostics)[0]
+
+    def check(self):
+        status = max(
+            self.check_controller(), self.check_controller_temperature(),
+            self.check_diagnostics())
+        if self.cache_present:
+            status = max(
+                status, self.check_cache(), self.check_cache_temperature(),
+                self.check_battery_capacitor(),
+                self.check_battery_capacitor_temperature())
+        return status
+
+    def summary(self):
+        return self._simple_description()
+
+    def _components(self):
+        temp = self.check_controller_temperature()
+        components = [_component(
+            'Controller Status', max(self.check_controller(), temp),
+            self.simple_controller_description(temperature=temp),
+            (_status_reason(
+                'Controller', self.check_controller(),
+                self._get('Controller Status')),
+             _temperature_reason(
+                'Controller', temp, self.temperature, self.max_temperature,
+                self.temperature_rise)),
+            {'serial': self.serial,
+             'state': self._get('Controller Status'),
+             **_temperature_fields(
+                temp, self.temperature, self.max_temperature,
+                self.temperature_rise)})]
+        if self.counters:
+            status, reasons = self._counters_check(
+                'Controller', self._thresholds.diagnostics)
+            components.append(_component(
+                'Diagnostics', status,
+                f'Diagnostics: ({_counters_description(self.counters)})',
+                reasons, dict(self.counters)))
+        if not self.cache_present:
+            return components
+        temp = self.check_cache_temperature()
+        components.append(_component(
+            'Cache Status', max(self.check_cache(), temp),
+            self.simple_cache_description(temperature=temp),
+            (_status_reason(
+                'Cache', self.check_cache(), self._get('Cache Status')),
+             _temperature_reason(
+                'Cache Module', temp, self.cache_temperature,
+                self.max_cache_temperature, self.cache_temperature_rise)),
+            {'serial': self._get('Cache Serial Number'),
+             'size': self._get('Total Cache Size'),
+             'state': self._get('Cache Status'),
+             **_temperature_fields(
+                temp, self.cache_temperature, self.max_cache_temperature,
+                self.cache_temperature_rise)}))
+        temp = self.check_battery_capacitor_temperature()
+        components.append(_component(
+            'Battery/Capacitor Status',
+            max(self.check_battery_capacitor(), temp),
+            self.simple_battery_capacitor_description(temperature=temp),
+            (_status_reason(
+                self.power_source, self.check_battery_capacitor(),
+                self._get('Battery/Capacitor Status')),
+             _temperature_reason(
+                self.power_source, temp, self.battery_capacitor_temperature,
+                self.max_battery_capacitor_temperature,
+                self.battery_capacitor_temperature_rise)),
+            {'source': self.power_source,
+             'state': self._get('Battery/Capacitor Status'),
+             **_temperature_fields(
+                temp, self.battery_capacitor_temperature,
+                self.max_battery_capacitor_temperature,
+                self.battery_capacitor_temperature_rise)}))
+        return components
+
+    def _reasons(self):
+        return [
+            reason for component in self._components()
+            for reason in component['reasons']]
+
+    def _fields(self):
+        return {
+            'slot': self.slot,
+            'model': self.model,
+            'serial': self.serial,
+            'host_serial': self._get('Host Serial Number'),
+            'cache_present': self.cache_present,
+            'power_source': self.power_source}
+
+    def report_dict(self, reasons=None):
+        components = self._components()
+        node = super().report_dict([
+            reason for component in components
+            for reason in component['reasons']])
+        node['components'] = components
+        return node
+
+    @property
+    def arrays(self):
+        return self._arrays
+
+    @property
+    def unassigned_physical_drives(self):
+        return self._unassinged_physical_drives
+
+    def _children(self):
+        return (
+            ('unassigned', self._unassinged_physical_drives),
+            ('arrays', self._arrays))
 
-    def is_ok(self, indent=0):
-        description = self._simple_description(indent)
-        status, con_details = self.is_controller_ok(indent+1)
-        description += f'\n{con_details}'
-        cache_status, cache_details = self.is_cache_ok(indent+1)
-        if cache_details:
-            status = max(cache_status, status)
-            description += f'\n{cache_details}'
-        bc_status, bc_details = self.is_battery_capacitor_ok(indent+1)
-        if bc_details:
-            status = max(bc_status, status)
-            description += f'\n{bc_details}'
-        for unassinged_drive in self._unassinged_physical_drives:
-            upd_status, upd_details = unassinged_drive.is_ok(indent+1)
-            status = max(upd_status, status)
-            description += f'\nUnassinged:\n{upd_details}'
+    def find_array(self, name):
         for array in self._arrays:
-            a_status, a_details = array.is_ok(indent+1)
-            status = max(a_status, status)
-            description += f'\n{a_details}'
-        return status, description
+            if array.name == name:
+                return array
+        return None
+
+    def find_logical_drive(self, number):
+        for array in self._arrays:
+            for drive in array.logical_drives:
+                if drive.number == str(number):
+                    return array, drive
+        return None, None
+
+    def find_physical_drive(self, location):
+        for drive in self._unassinged_physical_drives:
+            if drive.location == location:
+                return self, drive
+        for array in self._arrays:
+            for drive in array.physical_drives:
+                if drive.location == location:
+                    return array, drive
+        return None, None
+
+    def select(self, array=None, logical_drive=None, serial=None):
+        if array is None and logical_drive is None and serial is None:
+            return [self]
+        arrays = [
+            node for node in self._arrays
+            if array is None or node.name == array]
+        if logical_drive is None and serial is None:
+            return arrays
+        nodes = []
+        if array is None and serial is not None:
+            nodes.extend(
+                drive for drive in self._unassinged_physical_drives
+                if drive.serial == serial)
+        for node in arrays:
+            nodes.extend(node.select(logical_drive, serial))
+        return nodes
+
+    def is_ok(self, indent=0):
+        return self.health(), render_report(self.report(), indent)
 
     def _simple_description(self, indent=0):
         return (
             f'{_indent(indent)}'
-            f"{self._details.get('Smart Array Type', _DEF_VAL)} in "
-            f"Slot {self._details.get('Slot', _DEF_VAL)}: "
-            f"(Host SN: {self._details.get('Host Serial Number', _DEF_VAL)})")
+            f"{self._get('Smart Array Type')} in "
+            f"Slot {self._get('Slot')}: "
+            f"(Host SN: {self._get('Host Serial Number')})")
 
     def simple_description(self, indent=0):
-        description = (
-            f'{self._simple_description(indent)}'
-            f'\n{self.simple_controller_description(indent+1)}')
-        c_details = self.simple_cache_description(indent+1)
-        if c_details:
-            description += f'\n{c_details}'
-        bc_details = self.simple_battery_capacitor_description(indent+1)
-        if bc_details:
-            description += f'\n{bc_details}'
-        for unassinged_drive in self._unassinged_physical_drives:
-            description += (
-                f'\nUnassinged:'
-                f'\n{unassinged_drive.simple_description(indent+1)}')
-        for array in self._arrays:
-            description += f'\n{array.simple_description(indent+1)}'
-        return description
+        return render_report(self.report(), indent, statuses=False)
+
 
+class Array(_Node):
+    __slots__ = ('_physical_drives', '_logical_drives', 'name', 'status')
 
-class Array():
-    def __init__(self, array):
+    def __init__(self, array, thresholds=None):
         self._physical_drives = [
-            PhysicalDrive(pd) for pd in array.pop('Physical Drives', [])]
+            PhysicalDrive(pd, thresholds)
+            for pd in array.pop('Physical Drives', [])]
         self._logical_drives = [
             LogicalDrive(ld) for ld in array.pop('Logical Drives', [])]
-        self._details = array
+        super().__init__(array)
+        self.name = self._get('Array')
+        self.status = _decode_status(self._get('Status'), _ARRAY_STATUSES)
 
     def check_status(self):
-        status = self._details.get('Status', _DEF_VAL).lower()
-        if status.startswith('ok'):
-            return _STATUSES.index('OK')
-        if status.startswith('failed'):
-            return _STATUSES.index('Critical')
-        return _STATUSES.index('Unknown')
+        return self.status
+
+    def check(self):
+        return self.check_status()
+
+    def summary(self):
+        return self._simple_description()
+
+    def _reasons(self):
+        return [_status_reason(
+            f'Array {self.name}', self.check_status(), self._get('Status'))]
+
+    def _fields(self):
+        return {
+            'name': self.name,
+            'interface': self._get('Interface Type'),
+            'unused_space': self._get('Unused Space').split(' (')[0],
+            'state': self._get('Status')}
+
+    @property
+    def logical_drives(self):
+        return self._logical_drives
+
+    @property
+    def physical_drives(self):
+        return self._physical_drives
+
+    def _children(self):
+        return (
+            ('logical_drives', self._logical_drives),
+            ('physical_drives', self._physical_drives))
+
+    def select(self, logical_drive=None, serial=None):
+        nodes = []
+        if logical_drive is not None:
+            nodes.extend(
+                drive for drive in self._logical_drives
+                if drive.number == str(logical_drive))
+        if serial is not None:
+            nodes.extend(
+                drive for drive in self._physical_drives
+                if drive.serial == serial)
+        return nodes
 
     def is_ok(self, indent=0):
-        status = self.check_status()
-        description = (
-            f'{_indent(indent)}'
-            f'{_STATUSES[status]} - {self._simple_description()}')
-        for logical_drive in self._logical_drives:
-            ld_status, ld_details = logical_drive.is_ok(indent+1)
-            status = max(ld_status, status)
-            description += f'\n{ld_details}'
-        for physical_drive in self._physical_drives:
-            pd_status, pd_details = physical_drive.is_ok(indent+1)
-            status = max(pd_status, status)
-            description += f'\n{pd_details}'
-        return status, description
+        return self.health(), render_report(self.report(), indent)
 
     def _simple_description(self, indent=0):
         return (
             f"{_indent(indent)}"
-            f"Array {self._details.get('Array', _DEF_VAL)} "
-            f"({self._details.get('Interface Type', _DEF_VAL)}, "
+            f"Array {self._get('Array')} "
+            f"({self._get('Interface Type')}, "
             'Unused Space: '
-            f"{self._details.get('Unused Space', _DEF_VAL).split(' (')[0]}, "
-            f"{self._details.get('Status', _DEF_VAL)})")
+            f"{self._get('Unused Space').split(' (')[0]}, "
+            f"{self._get('Status')})")
 
     def simple_description(self, indent=0):
-        description = self._simple_description(indent)
-        for logical_drive in self._logical_drives:
-            description += f'\n{logical_drive.simple_description(indent+1)}'
-        for physical_drive in self._physical_drives:
-            description += f'\n{physical_drive.simple_description(indent+1)}'
-        return description
+        return render_report(self.report(), indent, statuses=False)
 
 
-class LogicalDrive():
+class LogicalDrive(_Node):
+    __slots__ = (
+        'number', 'status', 'size', 'operation', 'progress', 'throughput',
+        'eta')
+
     def __init__(self, ld):
-        self._details = ld
+        super().__init__(ld)
+        self.number = self._get('Logical Drive')
+        self.status = _decode_status(
+            self._get('Status'), _LOGICAL_DRIVE_STATUSES)
+        self.size = _to_bytes(self._get('Size'))
+        # e.g. 'Recovering, 37% complete' or 'Transforming, 12.50% complete'
+        match = _OPERATION_RE.match(self._get('Status'))
+        self.operation = match.group('operation') if match else None
+        self.progress = float(match.group('progress')) if match else None
+        self.throughput = None
+        self.eta = None
 
     def check_status(self):
-        status = self._details.get('Status', _DEF_VAL).lower()
-        if status.startswith('ok'):
-            return _STATUSES.index('OK')
-        if status.startswith('failed'):
-            return _STATUSES.index('Critical')
-        if (status.startswith('recovering') or
-            status.startswith('transforming') or
-                status.startswith('waiting')):
-            return _STATUSES.index('Warning')
-        return _STATUSES.index('Unknown')
+        return self.status
+
+    def check(self):
+        return self.check_status()
+
+    def summary(self):
+        return self.simple_description()
+
+    def _reasons(self):
+        return [_status_reason(
+            f'Logical drive {self.number}', self.check_status(),
+            self._get('Status'))]
+
+    def _fields(self):
+        return {
+            'number': self.number,
+            'disk_name': self._get('Disk Name'),
+            'size': self.size,
+            'raid': self._get('Fault Tolerance'),
+            'state': self._get('Status'),
+            'operation': self.operation,
+            'progress': self.progress,
+            'throughput': self.throughput,
+            'eta': self.eta}
 
     def is_ok(self, indent=0):
-        status = self.check_status()
+        status = self.health()
         return status, (
             f'{_indent(indent)}'
             f'{_STATUSES[status]} - {self.simple_description()}')
 
+    def progress_description(self):
+        if self.throughput is None:
+            return ''
+        description = f', {_format_bytes(self.throughput)}/s'
+        if self.eta is not None:
+            description += f', ETA {_format_duration(self.eta)}'
+        return description
+
+    def details_dict(self):
+        node = super().details_dict()
+        if self.progress is not None:
+            node['progress'] = {
+                'operation': self.operation,
+                'percent': self.progress,
+                'throughput': self.throughput,
+                'eta': self.eta}
+        return node
+
     def simple_description(self, indent=0):
         return (
             f'{_indent(indent)}Logical Drive: '
-            f"{self._details.get('Logical Drive', _DEF_VAL)} "
-            f"({self._details.get('Disk Name', _DEF_VAL)}, "
-            f"{self._details.get('Size', _DEF_VAL)}, "
-            f"RAID {self._details.get('Fault Tolerance', _DEF_VAL)}, "
-            f"{self._details.get('Status', _DEF_VAL)})")
-
-
-class PhysicalDrive():
-    def __init__(self, pd):
-        self._details = pd
+            f"{self._get('Logical Drive')} "
+            f"({self._get('Disk Name')}, "
+            f"{self._get('Size')}, "
+            f"RAID {self._get('Fault Tolerance')}, "
+            f"{self._get('Status')}"
+            f'{self.progress_description()})')
+
+
+class PhysicalDrive(_Node):
+    __slots__ = (
+        'location', 'serial', 'status', 'size', 'port', 'box', 'bay',
+        'drive_type', 'temperature', 'max_temperature', 'temperature_rise',
+        '_diagnostics', '_temperature_status')
+
+    def __init__(self, pd, thresholds=None):
+        super().__init__(pd)
+        self.location = self._get('Physical Drive')
+        self.serial = self._get('Serial Number')
+        self.status = _decode_status(
+            self._get('Status'), _PHYSICAL_DRIVE_STATUSES)
+        self.size = _to_bytes(self._get('Size'))
+        self.port = self._get('Port')
+        self.box = _to_int(self._get('Box'))
+        self.bay = _to_int(self._get('Bay'))
+        self.drive_type = _drive_type(self._get('Interface Type'))
+        self.temperature = _to_int(self._get('Current Temperature (C)'))
+        self.max_temperature = _to_int(self._get('Maximum Temperature (C)'))
+        self._diagnostics = _DEF_COUNTER_LIMITS
+        if thresholds is not None:
+            override = thresholds.drive(self._get('Model'))
+            if override is not None:
+                self.max_temperature = override
+            self._diagnostics = thresholds.diagnostics
+        self.temperature_rise = None
+        self._temperature_status = None
 
     def check_status(self):
-        status = self._details.get('Status', _DEF_VAL).lower()
-        if status.startswith('ok'):
-            return _STATUSES.index('OK')
-        if status.startswith('failed'):
-            return _STATUSES.index('Critical')
-        if (status.startswith('rebuilding') or
-                status.startwit('predictive failure')):
-            return _STATUSES.index('Warning')
-        return _STATUSES.index('Unknown')
+        return self.status
 
     def check_temperature(self):
-        try:
-            current_temp = int(self._details.get(
-                'Current Temperature (C)',
-                _DEF_VAL))
-            max_temp = int(self._details.get(
-                'Maximum Temperature (C)',
-                _DEF_VAL))
-        except ValueError as exc:
-            logger.warning(exc)
-            return _STATUSES.index('Unknown')
-        if current_temp >= max_temp:
-            return _STATUSES.index('Critical')
-        if current_temp == (max_temp - 1):
-            return _STATUSES.index('Warning')
-        return _STATUSES.index('OK')
+        if self._temperature_status is None:
+            self._temperature_status = _check_temperature(
+                'Physical Drive', self.temperature, self.max_temperature,
+                self.temperature_rise)
+        return self._temperature_status
 
-    def is_ok(self, indent=0):
+    def check_diagnostics(self):
+        return self._counters_check(
+            f'Physical drive {self.location}', self._diagnostics)[0]
+
+    def check(self):
+        return max(
+            self.check_status(), self.check_temperature(),
+            self.check_diagnostics())
+
+    def summary(self):
+        return self.simple_description()
+
+    def _reasons(self):
         temp = self.check_temperature()
-        status = max(self.check_status(), temp)
+        return [
+            _status_reason(
+                f'Physical drive {self.location}', self.check_status(),
+                self._get('Status')),
+            _temperature_reason(
+                f'Physical drive {self.location}', temp, self.temperature,
+                self.max_temperature, self.temperature_rise),
+            *self._counters_check(
+                f'Physical drive {self.location}', self._diagnostics)[1]]
+
+    def _fields(self):
+        return {
+            'location': self.location,
+            'serial': self.serial,
+            'model': self._get('Model'),
+            'port': self.port,
+            'box': self.box,
+            'bay': self.bay,
+            'drive_type': self.drive_type,
+            'size': self.size,
+            'state': self._get('Status'),
+            **_temperature_fields(
+                self.check_temperature(), self.temperature,
+                self.max_temperature, self.temperature_rise),
+            'counters': self.counters}
+
+    def is_ok(self, indent=0):
+        status = self.health()
         return status, (
             f'{_indent(indent)}'
             f'{_STATUSES[status]} - '
-            f'{self.simple_description(temperature=temp)}')
+            f'{self.simple_description()}')
+
+    def _diagnostics_description(self):
+        if not self.counters:
+            return ''
+        return f'Diag: {_STATUSES[self.check_diagnostics()]}, '
 
     def simple_description(self, indent=0, temperature=None):
         temp = (temperature if temperature is not None
                 else self.check_temperature())
-        drive_type = self._details.get('Interface Type', _DEF_VAL)
-        if drive_type.lower().startswith('solid state '):
-            drive_type = f'{drive_type[12:]} SSD'
-        elif drive_type.lower().startswith('ssd'):
-            drive_type = f'{drive_type[:-3]} SSD'
-        elif drive_type != _DEF_VAL:
-            drive_type += ' HDD'
         return (
             f'{_indent(indent)}Physical Drive: '
-            f"{self._details.get('Physical Drive', _DEF_VAL)} "
-            f"(SN: {self._details.get('Serial Number', _DEF_VAL)}, "
+            f"{self._get('Physical Drive')} "
+            f"(SN: {self._get('Serial Number')}, "
             f'Temp: {_STATUSES[temp]}, '
-            f"port {self._details.get('Port', _DEF_VAL)}:"
-            f"box {self._details.get('Box', _DEF_VAL)}:"
-            f"bay {self._details.get('Bay', _DEF_VAL)}, "
-            f'{drive_type}, '
-            f"{self._details.get('Size', _DEF_VAL)}, "
-            f"{self._details.get('Status', _DEF_VAL)})")
+            f'{self._diagnostics_description()}'
+            f"port {self._get('Port')}:"
+            f"box {self._get('Box')}:"
+            f"bay {self._get('Bay')}, "
+            f'{self.drive_type}, '
+            f"{self._get('Size')}, "
+            f"{self._get('Status')})")
@@ -0,0 +1,218 @@
+import logging
+import os
+from threading import Event, Thread
+
+import yaml
+
+from ssalib.ssa import (
+    _COUNTERS, _CRITICAL, _DEF_COUNTER_LIMITS, _WARNING, ControllerThresholds,
+    SSAException, _model_key)
+from ssalib.timing import timed
+
+
+_CHECK_INTERVAL = 5
+_THRESHOLD_KEYS = {
+    'Controller Maximum Temperature (C)': 'controller',
+    'Cache Module Maximum Temperature (C)': 'cache',
+    'Battery Maximum Temperature (C)': 'Battery',
+    'Capacitor Maximum Temperature (C)': 'Capacitor'}
+_DRIVES_KEY = 'Physical Drives'
+_DRIVE_THRESHOLD_KEY = 'Maximum Temperature (C)'
+_MAX_THRESHOLD = 200
+_DIAGNOSTICS_KEY = 'Diagnostics'
+_COUNTER_LEVELS = {'Warning': _WARNING, 'Critical': _CRITICAL}
+
+
+logger = logging.getLogger(__name__)
+
+
+class ThresholdError(SSAException):
+    message = "Invalid Smart Array external config: %(error)s"
+
+
+def _threshold(name, value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ThresholdError(error=f"'{name}' must be a number: {value!r}")
+    if not 0 < value < _MAX_THRESHOLD:
+        raise ThresholdError(error=f"'{name}' out of range: {value}")
+    return int(value)
+
+
+def _compile_drives(name, drives):
+    if not isinstance(drives, dict):
+        raise ThresholdError(error=f"'{name}' must be a mapping of models")
+    compiled = {}
+    for model, values in drives.items():
+        if isinstance(values, dict):
+            unknown = set(values) - {_DRIVE_THRESHOLD_KEY}
+            if unknown:
+                raise ThresholdError(
+                    error=f"unknown key(s) for drive '{model}': "
+                          f"{', '.join(map(str, unknown))}")
+            values = values.get(_DRIVE_THRESHOLD_KEY)
+        compiled[_model_key(model)] = _threshold(model, values)
+    return compiled
+
+
+def _compile_diagnostics(name, diagnostics, base=None):
+    if not isinstance(diagnostics, dict):
+        raise ThresholdError(error=f"'{name}' must be a mapping of counters")
+    compiled = dict(_DEF_COUNTER_LIMITS if base is None else base)
+    for counter, levels in diagnostics.items():
+        if counter not in _COUNTERS:
+            raise ThresholdError(
+                error=f"unknown counter for '{name}': {counter}")
+        # An empty entry disables the check of that counter.
+        levels = levels or {}
+        if not isinstance(levels, dict):
+            raise ThresholdError(
+                error=f"'{name}: {counter}' must be a mapping of levels")
+        unknown = set(levels) - set(_COUNTER_LEVELS)
+        if unknown:
+            raise ThresholdError(
+                error=f"unknown level(s) for '{name}: {counter}': "
+                      f"{', '.join(map(str, unknown))}")
+        limits = {}
+        for level, value in levels.items():
+            if (isinstance(value, bool) or
+                    not isinstance(value, (int, float)) or value < 0):
+                raise ThresholdError(
+                    error=f"'{name}: {counter}: {level}' must be a "
+                          f'positive number: {value!r}')
+            limits[_COUNTER_LEVELS[level]] = value
+        compiled[counter] = limits
+    return compiled
+
+
+class Thresholds():
+    def __init__(self, controllers=None, drives=None, diagnostics=None):
+        self._controllers = controllers or {}
+        self._default = ControllerThresholds(
+            drives=drives, diagnostics=diagnostics)
+
+    def __len__(self):
+        return len(self._controllers)
+
+    def controller(self, sa_type):
+        thresholds = self._controllers.get(sa_type)
+        if thresholds is None:
+            if self._controllers:
+                logger.warning(
+                    f'Controller external config not found: {sa_type}')
+            return self._default
+        return thresholds
+
+
+def compile_thresholds(config):
+    if config is None:
+        return Thresholds()
+    if not isinstance(config, dict):
+        raise ThresholdError(error='top level must be a mapping')
+    config = dict(config)
+    drives = _compile_drives(_DRIVES_KEY, config.pop(_DRIVES_KEY, {}))
+    diagnostics = _compile_diagnostics(
+        _DIAGNOSTICS_KEY, config.pop(_DIAGNOSTICS_KEY, {}))
+    controllers = {}
+    for sa_type, values in config.items():
+        if not isinstance(values, dict):
+            raise ThresholdError(error=f"'{sa_type}' must be a mapping")
+        values = dict(values)
+        compiled = ControllerThresholds(
+            drives=dict(
+                drives,
+                **_compile_drives(
+                    f'{sa_type}: {_DRIVES_KEY}',
+                    values.pop(_DRIVES_KEY, {}))),
+            diagnostics=_compile_diagnostics(
+                f'{sa_type}: {_DIAGNOSTICS_KEY}',
+                values.pop(_DIAGNOSTICS_KEY, {}), diagnostics))
+        for key, value in values.items():
+            attr = _THRESHOLD_KEYS.get(key)
+            if attr is None:
+                raise ThresholdError(
+                    error=f"unknown key for '{sa_type}': {key}")
+            value = _threshold(f'{sa_type}: {key}', value)
+            if attr in ('controller', 'cache'):
+                setattr(compiled, attr, value)
+            else:
+                compiled.power_sources[attr] = value
+        controllers[sa_type] = compiled
+    return Thresholds(controllers, drives, diagnostics)
+
+
+@timed('thresholds')
+def load_thresholds(filename):
+    try:
+        with open(filename, 'r') as stream:
+            return compile_thresholds(yaml.safe_load(stream))
+    except yaml.YAMLError as exc:
+        raise ThresholdError(error=exc)
+    except OSError as exc:
+        raise ThresholdError(error=exc)
+
+
+class ThresholdConfig():
+    def __init__(self, filename=None, interval=_CHECK_INTERVAL):
+        self._filename = filename
+        self._interval = interval
+        self._reload = Event()
+        self._stop = Event()
+        self._stamp = None
+        self._thread = None
+        self.thresholds = Thresholds()
+        if filename:
+            self.reload()
+        else:
+            logger.warning('No Smart Array external config defined')
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self._filename)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def reload(self):
+        stamp = self._file_stamp()
+        try:
+            thresholds = load_thresholds(self._filename)
+        except ThresholdError as exc:
+            self._stamp = stamp
+            logger.warning(f'{exc}, keeping the current thresholds')
+            return False
+        # Readers pick up the new tables on their next poll, a single
+        # attribute assignment is atomic so no lock is needed.
+        self.thresholds = thresholds
+        self._stamp = stamp
+        logger.info(
+            f'Loaded thresholds for {len(thresholds)} controller type(s) '
+            f'from: {self._filename}')
+        return True
+
+    def request_reload(self, *args):
+        # Safe to call from a signal handler.
+        self._reload.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            requested = self._reload.wait(self._interval)
+            self._reload.clear()
+            if self._stop.is_set():
+                break
+            if requested or self._file_stamp() != self._stamp:
+                self.reload()
+
+    def start(self):
+        if not self._filename:
+            return
+        self._thread = Thread(
+            target=self._run, name='thresholds', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._reload.set()
+        self._thread.join()
+        self._thread = None
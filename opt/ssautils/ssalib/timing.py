@@ -0,0 +1,128 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from threading import Lock, local
+
+
+_WINDOW = 256
+_QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _quantile(ordered, quantile):
+    # Nearest rank, the windows are small enough to sort on demand.
+    return ordered[min(len(ordered)-1, int(quantile * len(ordered)))]
+
+
+class _Stage():
+    __slots__ = ('samples', 'count', 'cycle_count', 'cycle_total')
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.cycle_count = 0
+        self.cycle_total = 0.0
+
+
+class StageTimings():
+    def __init__(self, window=_WINDOW):
+        self._window = window
+        self._lock = Lock()
+        self._stages = {}
+        self._local = local()
+
+    def _add(self, stage, seconds):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = _Stage(self._window)
+            entry.samples.append(seconds)
+            entry.count += 1
+            entry.cycle_count += 1
+            entry.cycle_total += seconds
+
+    def _nested(self, seconds):
+        stack = getattr(self._local, 'stack', None)
+        if stack:
+            stack[-1] += seconds
+
+    def record(self, stage, seconds):
+        self._add(stage, seconds)
+        self._nested(seconds)
+
+    @contextmanager
+    def measure(self, stage):
+        # Stages measured inside this one on the same thread are excluded,
+        # e.g. parsing streamed ssacli output doesn't count the wait for it.
+        stack = self._local.__dict__.setdefault('stack', [])
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._add(stage, elapsed - stack.pop())
+            self._nested(elapsed)
+
+    def stats(self):
+        with self._lock:
+            stages = {
+                stage: (sorted(entry.samples), entry.count)
+                for stage, entry in self._stages.items()}
+        stats = {}
+        for stage, (ordered, count) in sorted(stages.items()):
+            if not ordered:
+                continue
+            stats[stage] = dict(
+                count=count, window=len(ordered),
+                **{f'p{int(quantile * 100)}': _quantile(ordered, quantile)
+                   for quantile in _QUANTILES},
+                max=ordered[-1])
+        return stats
+
+    def summary(self):
+        # The stages run since the previous summary, with their percentiles.
+        stats = self.stats()
+        with self._lock:
+            cycle = {
+                stage: (entry.cycle_count, entry.cycle_total)
+                for stage, entry in self._stages.items() if entry.cycle_count}
+            for entry in self._stages.values():
+                entry.cycle_count = 0
+                entry.cycle_total = 0.0
+        return ', '.join(
+            f"{stage} {count}x {total:.3f}s (p50 {stats[stage]['p50']:.3f}s "
+            f"p95 {stats[stage]['p95']:.3f}s)"
+            for stage, (count, total) in sorted(cycle.items()))
+
+
+timings = StageTimings()
+
+
+def timed(stage):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timings.measure(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_lines(stage, lines):
+    # Only the time blocked waiting for the next line is counted, not the
+    # time the caller spends on each one.
+    waited = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                line = next(lines)
+            except StopIteration:
+                return
+            finally:
+                waited += time.perf_counter() - start
+            yield line
+    finally:
+        timings.record(stage, waited)
+        lines.close()
@@ -0,0 +1,34 @@
+import os
+import sys
+from importlib.machinery import SourceFileLoader
+from importlib.util import module_from_spec, spec_from_loader
+
+import pytest
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_ROOT, 'opt', 'ssautils'))
+sys.path.insert(0, os.path.join(_ROOT, 'bench'))
+
+from ssalib import ssa  # noqa: E402
+
+FAKE_SSACLI = os.path.join(_ROOT, 'bench', 'fake-ssacli')
+FAKE_SMTPD = os.path.join(_ROOT, 'bench', 'fake-smtpd')
+
+
+@pytest.fixture
+def fake_ssacli(monkeypatch):
+    for name in list(os.environ):
+        if name.startswith('FAKE_SSACLI_'):
+            monkeypatch.delenv(name)
+    monkeypatch.setattr(ssa, '_HP_SSA_CMD', FAKE_SSACLI)
+    return FAKE_SSACLI
+
+
+@pytest.fixture(scope='session')
+def daemon():
+    # The smart-array-check script, loaded as a module.
+    path = os.path.join(_ROOT, 'opt', 'ssautils', 'smart-array-check')
+    loader = SourceFileLoader('smart_array_check', path)
+    module = module_from_spec(spec_from_loader(loader.name, loader))
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,30 @@
+from ssalib.alerts import AlertTracker
+from ssalib.ssa import Controllers
+
+
+def _controllers(monkeypatch, **env):
+    for name, value in env.items():
+        monkeypatch.setenv(f'FAKE_SSACLI_{name}', str(value))
+    return Controllers(thresholds=None)
+
+
+def test_only_transitions_alert(fake_ssacli, monkeypatch):
+    tracker = AlertTracker()
+    tracker.update(_controllers(monkeypatch))
+    assert tracker.update(_controllers(monkeypatch)) is None
+    alert = tracker.update(_controllers(monkeypatch, FAILED=1))
+    assert alert is not None
+    assert 'Problem Detected' in alert.subject
+    assert tracker.update(_controllers(monkeypatch, FAILED=1)) is None
+
+
+def test_body_only_renders_changed_subtrees(fake_ssacli, monkeypatch):
+    tracker = AlertTracker()
+    tracker.update(_controllers(monkeypatch, UNASSIGNED=2))
+    body = tracker.update(
+        _controllers(monkeypatch, UNASSIGNED=2, FAILED=1)).body
+    description = body.split('Smart Array(s) Description:')[1]
+    assert 'Controller Status' in description
+    assert 'Array A' in description
+    # The unassigned drives didn't change.
+    assert 'Unassinged' not in description
@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from ssalib import ssa
+from ssalib.console import SSAConsolePool
+from ssalib.ssa import Controllers
+from ssalib.thresholds import Thresholds
+
+
+def _collect(timeout=10, workers=3):
+    return Controllers(
+        thresholds=Thresholds(), timeout=timeout, workers=workers)
+
+
+def _statuses(controllers):
+    return {
+        controller.slot: controller.detail('Controller Status')
+        for controller in controllers.controllers}
+
+
+@pytest.fixture
+def pool(fake_ssacli):
+    pool = SSAConsolePool(size=3, cmd=fake_ssacli, start_timeout=10)
+    previous = ssa.set_executor(pool)
+    yield pool
+    ssa.set_executor(previous)
+    pool.close()
+
+
+@pytest.fixture
+def three_slots(fake_ssacli, monkeypatch):
+    monkeypatch.setenv('FAKE_SSACLI_CONTROLLERS', '3')
+    monkeypatch.setenv('FAKE_SSACLI_DRIVES', '6')
+
+
+@pytest.mark.parametrize('with_pool', [False, True])
+def test_failed_slot_is_unknown(three_slots, monkeypatch, request, with_pool):
+    monkeypatch.setenv('FAKE_SSACLI_FAIL_SLOT', '2')
+    if with_pool:
+        request.getfixturevalue('pool')
+    controllers = _collect()
+    assert _statuses(controllers) == {
+        '1': 'OK', '2': 'Unknown (collection failed)', '3': 'OK'}
+    failed = controllers.controllers[1]
+    assert failed.health() == ssa._UNKNOWN
+    assert not failed.arrays
+    assert [len(c.arrays) for c in controllers.controllers] == [1, 0, 1]
+
+
+@pytest.mark.parametrize('with_pool', [False, True])
+def test_hung_slot_does_not_stall_the_rest(
+        three_slots, monkeypatch, request, with_pool):
+    monkeypatch.setenv('FAKE_SSACLI_HANG_SLOT', '1,2')
+    monkeypatch.setenv('FAKE_SSACLI_HANG', '30')
+    if with_pool:
+        request.getfixturevalue('pool')
+    start = time.monotonic()
+    controllers = _collect(timeout=2)
+    # The slots time out together, not one after another.
+    assert time.monotonic() - start < 3.5
+    assert _statuses(controllers) == {
+        '1': 'Unknown (collection failed)',
+        '2': 'Unknown (collection failed)', '3': 'OK'}
@@ -0,0 +1,104 @@
+import time
+
+import pytest
+
+from ssalib.console import SSAConsole, SSAConsolePool
+from ssalib import ssa
+from ssalib.ssa import Controllers, SSACmdError
+from ssalib.thresholds import Thresholds
+
+
+def _run(console, *args, timeout=10):
+    return list(console.run(args, timeout))
+
+
+@pytest.fixture
+def console(fake_ssacli):
+    console = SSAConsole(cmd=fake_ssacli, start_timeout=10)
+    yield console
+    console.close()
+
+
+def test_command_output(console):
+    lines = _run(console, 'ctrl', 'all', 'show')
+    assert any('in Slot 1' in line for line in lines)
+    assert console.is_alive()
+
+
+def test_session_is_reused(console):
+    _run(console, 'ctrl', 'all', 'show')
+    pid = console._obj.pid
+    _run(console, 'ctrl', 'all', 'show', 'status')
+    assert console._obj.pid == pid
+
+
+def test_error_line(console):
+    with pytest.raises(SSACmdError, match='not a valid command'):
+        _run(console, 'bogus', 'command')
+    # The prompt came back, the session is still usable.
+    assert console.is_alive()
+    assert _run(console, 'ctrl', 'all', 'show')
+
+
+def test_timeout_kills_session(console, monkeypatch):
+    # The fake reads its latency at start up, restart the session with it.
+    console.close()
+    monkeypatch.setenv('FAKE_SSACLI_LATENCY', '5')
+    start = time.monotonic()
+    with pytest.raises(SSACmdError, match='timed out'):
+        _run(console, 'ctrl', 'all', 'show', timeout=0.5)
+    assert time.monotonic() - start < 5
+    assert not console.is_alive()
+    monkeypatch.delenv('FAKE_SSACLI_LATENCY')
+    assert _run(console, 'ctrl', 'all', 'show')
+
+
+def test_pool_reuses_sessions(fake_ssacli):
+    pool = SSAConsolePool(size=2, cmd=fake_ssacli, start_timeout=10)
+    try:
+        for _ in range(3):
+            assert list(pool.run(('ctrl', 'all', 'show'), 10))
+        pids = [session._obj.pid for session in pool._all_sessions]
+        for _ in range(4):
+            assert list(pool.run(('ctrl', 'all', 'show'), 10))
+        assert [session._obj.pid for session in pool._all_sessions] == pids
+        assert pool._sessions.qsize() == 2
+    finally:
+        pool.close()
+    assert not any(session.is_alive() for session in pool._all_sessions)
+
+
+def test_pool_returns_session_on_error(fake_ssacli):
+    pool = SSAConsolePool(size=1, cmd=fake_ssacli, start_timeout=10)
+    try:
+        with pytest.raises(SSACmdError):
+            list(pool.run(('bogus',), 10))
+        assert pool._sessions.qsize() == 1
+        assert list(pool.run(('ctrl', 'all', 'show'), 10))
+    finally:
+        pool.close()
+
+
+def test_stderr_is_kept_apart(console, monkeypatch):
+    console.close()
+    monkeypatch.setenv('FAKE_SSACLI_STDERR', 'Warning: cache disabled')
+    output = console.run(('ctrl', 'all', 'show'), 10)
+    lines = list(output)
+    assert output.stderr == 'Warning: cache disabled'
+    assert not any('cache disabled' in line for line in lines)
+    output = console.run(('ctrl', 'all', 'show', 'status'), 10)
+    list(output)
+    assert output.stderr == 'Warning: cache disabled'
+
+
+def test_pool_stderr_sets_warning(fake_ssacli, monkeypatch):
+    monkeypatch.setenv('FAKE_SSACLI_STDERR', 'Warning: cache disabled')
+    pool = SSAConsolePool(size=1, cmd=fake_ssacli, start_timeout=10)
+    previous = ssa.set_executor(pool)
+    try:
+        controllers = Controllers(thresholds=Thresholds())
+    finally:
+        ssa.set_executor(previous)
+        pool.close()
+    assert controllers.status == ssa._WARNING
+    assert len(controllers.controllers) == 1
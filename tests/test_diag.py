@@ -0,0 +1,126 @@
+import io
+import os
+import time
+import zipfile
+
+import pytest
+
+from conftest import _ROOT
+from ssalib import ssa
+from ssalib.alerts import walk
+from ssalib.diag import DiagCollector, DiagError, parse_devices, parse_report
+
+_FIXTURE = os.path.join(_ROOT, 'tests', 'fixtures', 'diag-slot-1.zip')
+_DRIVE = {
+    'Media Errors': 2, 'Hard Read Errors': 1, 'Recovered Read Errors': 12,
+    'Hard Write Errors': 0, 'Reallocated Sectors': 10}
+
+
+class _Reader(io.BytesIO):
+    # Remembers how far iterparse had to read.
+    def read(self, size=-1):
+        data = super().read(size)
+        self.peak = self.tell()
+        return data
+
+
+def test_report_counters():
+    result = parse_report(_FIXTURE)
+    assert result['controller'] == {'Cache Hit Ratio (%)': 90.0}
+    # Keyed by both serial and location, the same counters.
+    assert result['drives']['SN0001'] == _DRIVE
+    assert result['drives']['1I:1:1'] is result['drives']['SN0001']
+    # No serial, an unparsable value is skipped.
+    assert result['drives']['1I:1:2'] == {'Media Errors': 0}
+    # No counters at all.
+    assert 'SN0003' not in result['drives']
+    assert '1I:1:3' not in result['drives']
+
+
+def test_devices_are_streamed():
+    with zipfile.ZipFile(_FIXTURE) as archive:
+        xml = archive.read('ADUReport.xml')
+    head, _, tail = xml.partition(b'  </Device>\n</ADUReport>')
+    drive = head[head.index(b'    <Device deviceType="PhysicalDrive"'):]
+    # Grow the report far beyond the iterparse read size.
+    stream = _Reader(head + drive * 2000 + b'  </Device>\n</ADUReport>\n')
+    devices = parse_devices(stream)
+    first = next(devices)
+    assert first['kind'] == 'drive'
+    assert first['location'] == '1I:1:1'
+    assert stream.peak < len(stream.getvalue()) // 10
+    rest = list(devices)
+    # The other drives and the controller, which ends last.
+    assert len(rest) == 3 * 2001
+    assert rest[-1]['kind'] == 'controller'
+
+
+@pytest.mark.parametrize('content', [
+    b'not a zip',
+    None,
+])
+def test_bad_report(tmp_path, content):
+    path = tmp_path / 'diag.zip'
+    if content is None:
+        with zipfile.ZipFile(path, 'w') as archive:
+            archive.writestr('ADUReport.xml', '<ADUReport><Device')
+    else:
+        path.write_bytes(content)
+    with pytest.raises(DiagError, match='Diagnostic report error'):
+        parse_report(str(path))
+
+
+def test_missing_report(tmp_path):
+    with pytest.raises(DiagError):
+        parse_report(str(tmp_path / 'missing.zip'))
+
+
+def test_collect(fake_ssacli, monkeypatch, tmp_path):
+    monkeypatch.setenv('FAKE_SSACLI_CONTROLLERS', '2')
+    monkeypatch.setenv('FAKE_SSACLI_MEDIA_ERRORS', '1')
+    results = DiagCollector(timeout=10, directory=str(tmp_path)).collect()
+    assert sorted(results) == ['1', '2']
+    drives = results['1']['drives']
+    assert drives['SN0000000']['Media Errors'] == 3
+    assert drives['SN0000001']['Media Errors'] == 0
+    assert 0 < results['1']['controller']['Cache Hit Ratio (%)'] < 100
+    # The temporary report is removed.
+    assert not os.listdir(tmp_path)
+
+
+def test_diag_timeout(fake_ssacli, monkeypatch, tmp_path):
+    # Only writing the report is bounded by the diagnostic timeout, listing
+    # the controllers still uses the query timeout.
+    monkeypatch.setenv('FAKE_SSACLI_CONTROLLERS', '2')
+    monkeypatch.setenv('FAKE_SSACLI_HANG_SLOT', '2')
+    collector = DiagCollector(
+        timeout=10, diag_timeout=1, directory=str(tmp_path))
+    start = time.monotonic()
+    results = collector.collect()
+    assert time.monotonic() - start < 5
+    assert sorted(results) == ['1']
+
+
+def test_collect_slot_failure(fake_ssacli, monkeypatch, tmp_path):
+    monkeypatch.setenv('FAKE_SSACLI_FAIL_SLOT', '1')
+    with pytest.raises(ssa.SSAException):
+        DiagCollector(directory=str(tmp_path)).collect_slot('1')
+
+
+def test_update(fake_ssacli, monkeypatch, tmp_path):
+    monkeypatch.setenv('FAKE_SSACLI_MEDIA_ERRORS', '1')
+    collector = DiagCollector(timeout=10, directory=str(tmp_path))
+    collector.collect()
+    controllers = ssa.Controllers()
+    collector.update(controllers)
+    controller = controllers.controllers[0]
+    assert 'Cache Hit Ratio (%)' in controller.counters
+    drive = controller.arrays[0].physical_drives[0]
+    assert drive.counters['Media Errors'] == 3
+    assert drive.check() == ssa._WARNING
+    assert controller.health() >= ssa._WARNING
+    # Every node takes counters, the arrays and logical drives keep none.
+    for _, node in walk(controller):
+        if not isinstance(node, (ssa.Controller, ssa.PhysicalDrive)):
+            assert node.counters is None
+            node.set_counters({'Media Errors': 1})
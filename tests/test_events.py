@@ -0,0 +1,90 @@
+import socket
+import time
+from threading import Event
+
+from ssalib import events
+from ssalib.events import (
+    EventWatcher, KmsgSource, UnixSource, create_sources)
+
+
+def _wait(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return predicate()
+
+
+def test_kmsg_source_follows_new_records(tmp_path, monkeypatch):
+    monkeypatch.setattr(events, '_FOLLOW_INTERVAL', 0.05)
+    path = tmp_path / 'kmsg'
+    path.write_text('6,1,100,-;hpsa 0000:03:00.0: booted\n')
+    source = KmsgSource(str(path))
+    with open(path, 'a') as kmsg:
+        kmsg.write('4,2,200,-;hpsa 0000:03:00.0: scsi 0:1:0:0 removed\n')
+        kmsg.write(' SUBSYSTEM=pci\n')
+        kmsg.write('6,3,300,-;e1000e: link up\n')
+    lines = source.lines()
+    assert next(lines) == 'hpsa 0000:03:00.0: scsi 0:1:0:0 removed'
+    assert next(lines) == 'e1000e: link up'
+    source.close()
+    assert source.matches('smartpqi 0000:5c:00.0: resetting')
+    assert not source.matches('e1000e: link up')
+
+
+def test_unix_source_receives_datagrams(tmp_path):
+    path = str(tmp_path / 'events.sock')
+    source = UnixSource(path)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as client:
+        client.sendto(b'4,1,100,-;hpsa 0000:03:00.0: offline\n', path)
+    assert next(source.lines()) == 'hpsa 0000:03:00.0: offline'
+    source.close()
+    assert not (tmp_path / 'events.sock').exists()
+
+
+def test_create_sources_skips_unusable_ones(tmp_path):
+    kmsg = tmp_path / 'kmsg'
+    kmsg.touch()
+    sources = create_sources(
+        f'kmsg:{kmsg}, kmsg:{tmp_path}/missing, bogus, unix:')
+    assert [source.name for source in sources] == ['kmsg']
+    for source in sources:
+        source.close()
+
+
+def test_watcher_coalesces_a_burst(tmp_path):
+    path = str(tmp_path / 'events.sock')
+    calls = []
+    called = Event()
+
+    def callback():
+        calls.append(time.monotonic())
+        called.set()
+
+    watcher = EventWatcher([UnixSource(path)], callback, debounce=0.3)
+    watcher.start()
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as client:
+            client.sendto(b'e1000e: link up', path)
+            for number in range(5):
+                client.sendto(
+                    f'hpsa 0000:03:00.0: scsi 0:1:{number}:0 removed'
+                    .encode(), path)
+        assert called.wait(5)
+        assert not _wait(lambda: len(calls) > 1, timeout=0.6)
+    finally:
+        watcher.close()
+    assert len(calls) == 1
+
+
+def test_watcher_ignores_unrelated_events(tmp_path):
+    path = str(tmp_path / 'events.sock')
+    calls = []
+    watcher = EventWatcher(
+        [UnixSource(path)], lambda: calls.append(1), debounce=0)
+    watcher.start()
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as client:
+            client.sendto(b'e1000e: link up', path)
+        assert not _wait(lambda: calls, timeout=0.5)
+    finally:
+        watcher.close()
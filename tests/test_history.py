@@ -0,0 +1,72 @@
+import time
+
+from ssalib.alerts import AlertTracker
+from ssalib.history import TemperatureHistory
+from ssalib.ssa import Controllers
+from ssalib.thresholds import compile_thresholds
+
+_CONFIG = {'Smart Array P410': {
+    'Controller Maximum Temperature (C)': 100,
+    'Cache Module Maximum Temperature (C)': 100,
+    'Capacitor Maximum Temperature (C)': 100}}
+
+
+def test_long_key_keeps_its_slot_after_reopen(tmp_path):
+    path = str(tmp_path / 'history.bin')
+    key = 'controller-' + 'x' * 80 + '/drive 1I:1:1'
+    history = TemperatureHistory(path=path, capacity=8)
+    history.record(key, 1000, 30, 0)
+    history.close()
+
+    history = TemperatureHistory(path=path, capacity=8)
+    history.record(key, 1060, 31, 0)
+    assert len(history.keys()) == 1
+    assert [sample[1] for sample in history.samples(key)] == [30, 31]
+    history.close()
+
+
+def test_truncated_key_does_not_split_a_character(tmp_path):
+    path = str(tmp_path / 'history.bin')
+    key = 'a' * 63 + 'é'
+    history = TemperatureHistory(path=path, capacity=8)
+    history.record(key, 1000, 30, 0)
+    history.close()
+
+    history = TemperatureHistory(path=path, readonly=True)
+    assert history.keys() == ['a' * 63]
+    assert len(history.samples(key)) == 1
+    history.close()
+
+
+def _counts(history):
+    return {key: len(history.samples(key)) for key in history.keys()}
+
+
+def test_follow_up_records_refreshed_drives(
+        daemon, fake_ssacli, monkeypatch, tmp_path):
+    monkeypatch.setenv('FAKE_SSACLI_REBUILDING', '1')
+    history = TemperatureHistory(path=str(tmp_path / 'history.bin'))
+    controllers = Controllers(thresholds=compile_thresholds(_CONFIG))
+    history.update(controllers)
+    assert set(_counts(history).values()) == {1}
+    # The rebuilding logical and physical drive are followed up.
+    follow_up = daemon.FollowUp(2, history=history)
+    follow_up.track(controllers, AlertTracker().update(controllers))
+    start = time.time()
+    assert follow_up.run() is controllers
+    counts = _counts(history)
+    assert counts.pop('pd:SN0000001') == 2
+    assert set(counts.values()) == {1}
+    sample = history.samples('pd:SN0000001')[-1]
+    assert sample[0] >= int(start)
+    history.close()
+
+
+def test_refreshed_controller_records_its_sensors(fake_ssacli, tmp_path):
+    history = TemperatureHistory(path=str(tmp_path / 'history.bin'))
+    controllers = Controllers(thresholds=compile_thresholds(_CONFIG))
+    history.update(controllers)
+    controller = controllers.refresh_controller('1')
+    history.update(controllers, refreshed=controller, now=time.time())
+    assert set(_counts(history).values()) == {2}
+    history.close()
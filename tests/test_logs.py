@@ -0,0 +1,131 @@
+import atexit
+import gzip
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import textwrap
+from datetime import datetime
+
+import pytest
+
+from conftest import _ROOT
+from ssalib.logs import JsonFormatter, json_file_handler, setup_queue_logging
+
+# The LogFileSpec regex of the workbench log, one JSON object per line.
+_LINE_RE = re.compile(r'^(\{.*\})$')
+_COLUMNS = {'date', 'threadName', 'filename', 'lineNo', 'levelName', 'message'}
+
+
+def _record(msg, *args, exc_info=None):
+    return logging.LogRecord(
+        'test', logging.WARNING, '/opt/ssautils/ssalib/ssa.py', 42, msg,
+        args, exc_info)
+
+
+def _parse(line):
+    assert _LINE_RE.match(line), line
+    record = json.loads(line)
+    assert set(record) == _COLUMNS
+    return record
+
+
+@pytest.fixture
+def root_logger():
+    # setup_queue_logging configures the root logger, put it back.
+    r_logger = logging.getLogger()
+    handlers, level = r_logger.handlers[:], r_logger.level
+    listeners = []
+    yield listeners
+    for listener in listeners:
+        if listener._thread is not None:
+            listener.stop()
+        atexit.unregister(listener.stop)
+    r_logger.handlers[:] = handlers
+    r_logger.setLevel(level)
+    r_logger.propagate = True
+
+
+def test_json_line():
+    record = _parse(JsonFormatter().format(
+        _record('Slot %s "status": %s\n', 1, 'Failed')))
+    assert record['message'] == 'Slot 1 "status": Failed\n'
+    assert record['levelName'] == 'WARNING'
+    assert record['filename'] == 'ssa.py'
+    assert record['lineNo'] == 42
+    assert record['threadName'] == 'MainThread'
+    date = datetime.fromisoformat(record['date'])
+    assert date.tzinfo is not None
+    assert abs(date.timestamp() - datetime.now().timestamp()) < 60
+
+
+def test_json_line_exception():
+    try:
+        raise ValueError('bad value')
+    except ValueError:
+        line = JsonFormatter().format(
+            _record('Check failed', exc_info=sys.exc_info()))
+    assert '\n' not in line
+    message = _parse(line)['message']
+    assert message.startswith('Check failed\nTraceback')
+    assert message.endswith('ValueError: bad value')
+
+
+def test_queue_logging(root_logger, tmp_path):
+    path = tmp_path / 'check.log'
+    root_logger.append(setup_queue_logging(
+        [json_file_handler(str(path))], level=logging.INFO))
+    logger = logging.getLogger('ssalib.test')
+    counters = {'Media Errors': 1}
+    logger.info('Counters %s', counters)
+    # The arguments were merged on the calling thread.
+    counters['Media Errors'] = 2
+    logger.debug('filtered')
+    try:
+        {}['missing']
+    except KeyError:
+        logger.exception('Lookup failed')
+    root_logger[0].stop()
+    first, second = map(_parse, path.read_text().splitlines())
+    assert first['message'] == "Counters {'Media Errors': 1}"
+    assert first['filename'] == 'test_logs.py'
+    assert first['levelName'] == 'INFO'
+    assert second['levelName'] == 'ERROR'
+    assert second['message'].startswith('Lookup failed\nTraceback')
+    assert "KeyError: 'missing'" in second['message']
+
+
+def test_rotation_is_compressed(tmp_path):
+    path = tmp_path / 'check.log'
+    handler = json_file_handler(str(path), max_bytes=500, backup_count=2)
+    for number in range(20):
+        handler.emit(_record('Message %d', number))
+    handler.close()
+    assert sorted(os.listdir(tmp_path)) == [
+        'check.log', 'check.log.1.gz', 'check.log.2.gz']
+    with gzip.open(tmp_path / 'check.log.1.gz', 'rt') as stream:
+        lines = stream.read().splitlines()
+    assert lines
+    for line in lines:
+        _parse(line)
+
+
+def test_listener_flushes_on_exit(tmp_path):
+    # The daemon never stops the listener itself, the queued records are
+    # written at interpreter exit.
+    path = tmp_path / 'check.log'
+    script = textwrap.dedent(f'''
+        import logging
+        from ssalib.logs import json_file_handler, setup_queue_logging
+        setup_queue_logging([json_file_handler({str(path)!r})])
+        for number in range(5000):
+            logging.getLogger('exit').warning('Message %d', number)
+    ''')
+    subprocess.run(
+        [sys.executable, '-c', script], check=True, timeout=60,
+        cwd=os.path.join(_ROOT, 'opt', 'ssautils'))
+    lines = path.read_text().splitlines()
+    assert len(lines) == 5000
+    assert _parse(lines[-1])['message'] == 'Message 4999'
@@ -0,0 +1,19 @@
+import os
+
+from ssalib.metrics import MetricsExporter
+
+
+def test_textfile_written(tmp_path):
+    textfile = tmp_path / 'smartarray.prom'
+    MetricsExporter(textfile=str(textfile)).failure()
+    assert 'smartarray_collection_failures_total 1' in textfile.read_text()
+    assert os.listdir(tmp_path) == ['smartarray.prom']
+
+
+def test_failed_write_leaves_no_temporary_file(tmp_path):
+    # Replacing a directory fails after the temporary file was written.
+    textfile = tmp_path / 'smartarray.prom'
+    textfile.mkdir()
+    (textfile / 'keep').write_text('')
+    MetricsExporter(textfile=str(textfile)).failure()
+    assert sorted(os.listdir(tmp_path)) == ['smartarray.prom']
@@ -0,0 +1,120 @@
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+from conftest import _ROOT, FAKE_SSACLI
+from ssalib.nagios import render_plugin, render_unknown
+from ssalib.ssa import _CRITICAL, _OK, _UNKNOWN, _WARNING, Controllers
+from ssalib.thresholds import compile_thresholds
+
+
+_CONFIG = {'Smart Array P410': {
+    'Controller Maximum Temperature (C)': 100,
+    'Cache Module Maximum Temperature (C)': 100,
+    'Capacitor Maximum Temperature (C)': 100}}
+_PERF_RE = re.compile(r"^'[A-Za-z0-9_:]+'=\d+(?:\.\d+)?%?(?:;\d+;\d+)?$")
+_DAEMON = os.path.join(_ROOT, 'opt', 'ssautils', 'smart-array-check')
+
+
+def _plugin(monkeypatch, limit=100, **env):
+    for name, value in env.items():
+        monkeypatch.setenv(f'FAKE_SSACLI_{name}', str(value))
+    config = {'Smart Array P410': {
+        key: limit for key in _CONFIG['Smart Array P410']}}
+    return render_plugin(
+        Controllers(thresholds=compile_thresholds(config)))
+
+
+def _split(line):
+    summary, _, perfdata = line.partition(' | ')
+    return summary, perfdata.split(' ')
+
+
+def test_ok(fake_ssacli, monkeypatch):
+    status, line = _plugin(monkeypatch)
+    summary, perfdata = _split(line)
+    assert status == _OK
+    assert summary == (
+        'SMART ARRAY OK - 1 controller(s), 1 array(s), 1 logical drive(s), '
+        '8 physical drive(s)')
+    assert all(_PERF_RE.match(item) for item in perfdata), perfdata
+    assert "'slot1_temp'=58;99;100" in perfdata
+    assert "'slot1_capacitor_temp'=25;99;100" in perfdata
+    assert "'pd_ok'=8" in perfdata
+    assert "'pd_critical'=0" in perfdata
+    assert any(item.startswith("'slot1_pd_1I:1:1_temp'=") for item in perfdata)
+
+
+def test_warning(fake_ssacli, monkeypatch):
+    status, line = _plugin(monkeypatch, REBUILDING=1)
+    summary, perfdata = _split(line)
+    assert status == _WARNING
+    assert summary.startswith('SMART ARRAY WARNING - ')
+    assert 'Slot 1 LD 1 Recovering, 37% complete' in summary
+    assert re.search(r'Slot 1 PD \S+ Rebuilding', summary)
+    assert "'slot1_ld1_progress'=37%" in perfdata
+    assert "'pd_warning'=1" in perfdata
+
+
+def test_critical(fake_ssacli, monkeypatch):
+    status, line = _plugin(monkeypatch, limit=50)
+    summary, perfdata = _split(line)
+    assert status == _CRITICAL
+    assert summary == (
+        'SMART ARRAY CRITICAL - Slot 1 controller temperature 58C')
+    assert "'slot1_temp'=58;49;50" in perfdata
+
+
+def test_unknown_temperature(fake_ssacli):
+    # No thresholds configured, the controller temperatures are unknown.
+    status, line = render_plugin(Controllers())
+    assert status == _UNKNOWN
+    assert line.startswith(
+        'SMART ARRAY UNKNOWN - Slot 1 controller temperature 58C')
+    assert "'slot1_temp'=58 " in line
+
+
+def test_render_unknown():
+    assert render_unknown('ssacli not found') == (
+        _UNKNOWN, 'SMART ARRAY UNKNOWN - ssacli not found')
+
+
+def _once(tmp_path, cmd=FAKE_SSACLI, limit=100, **env):
+    config = tmp_path / 'config.yml'
+    config.write_text('Smart Array P410:\n' + ''.join(
+        f'  {key}: {limit}\n' for key in _CONFIG['Smart Array P410']))
+    code = (
+        'import runpy, sys\n'
+        'from ssalib import ssa\n'
+        f'ssa._HP_SSA_CMD = {cmd!r}\n'
+        f"sys.argv = ['smart-array-check', '--once', '-m', '0', "
+        f"'-c', {str(config)!r}, '-l', {str(tmp_path)!r}]\n"
+        f'runpy.run_path({_DAEMON!r}, run_name="__main__")\n')
+    environ = {
+        name: value for name, value in os.environ.items()
+        if not name.startswith('FAKE_SSACLI_')}
+    environ.update({f'FAKE_SSACLI_{k}': str(v) for k, v in env.items()})
+    return subprocess.run(
+        [sys.executable, '-c', code], capture_output=True, text=True,
+        env=environ, cwd=os.path.dirname(_DAEMON), timeout=60)
+
+
+@pytest.mark.parametrize('limit, env, code, state', [
+    (100, {}, 0, 'OK'),
+    (100, {'REBUILDING': 1}, 1, 'WARNING'),
+    (50, {}, 2, 'CRITICAL'),
+])
+def test_once_exit_code(tmp_path, limit, env, code, state):
+    result = _once(tmp_path, limit=limit, **env)
+    assert result.returncode == code
+    assert result.stdout.startswith(f'SMART ARRAY {state} - ')
+    assert len(result.stdout.splitlines()) == 1
+
+
+def test_once_unknown_exit_code(tmp_path):
+    result = _once(tmp_path, cmd=str(tmp_path / 'missing-ssacli'))
+    assert result.returncode == 3
+    assert result.stdout.startswith('SMART ARRAY UNKNOWN - ')
@@ -0,0 +1,115 @@
+import socket
+import subprocess
+import sys
+import time
+from threading import Thread
+
+import pytest
+
+from conftest import FAKE_SMTPD
+from ssalib.notify import Notifier
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class _FakeSMTPD():
+    def __init__(self, port, *args):
+        self.lines = []
+        self._proc = subprocess.Popen(
+            [sys.executable, FAKE_SMTPD, '--port', str(port), *args],
+            stdout=subprocess.PIPE, text=True)
+        Thread(target=self._read, daemon=True).start()
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(('127.0.0.1', port), 1).close()
+                return
+            except OSError:
+                time.sleep(0.05)
+        raise RuntimeError('fake-smtpd did not start')
+
+    def _read(self):
+        for line in self._proc.stdout:
+            self.lines.append(line.rstrip('\n'))
+
+    def subjects(self, count, timeout=10):
+        deadline = time.monotonic() + timeout
+        while True:
+            subjects = [
+                line.split('Subject: ', 1)[1] for line in self.lines
+                if line.startswith('message ')]
+            if len(subjects) >= count or time.monotonic() >= deadline:
+                return subjects
+            time.sleep(0.05)
+
+    def close(self):
+        self._proc.terminate()
+        self._proc.wait()
+
+
+@pytest.fixture
+def port():
+    return _free_port()
+
+
+def _notifier(port, **kwargs):
+    notifier = Notifier(
+        'a@example.com', 'b@example.com', host='127.0.0.1', port=port,
+        **kwargs)
+    notifier.start()
+    return notifier
+
+
+def test_notifications_in_window_are_coalesced(port):
+    smtpd = _FakeSMTPD(port)
+    notifier = _notifier(port, window=1)
+    try:
+        notifier.notify('first', 'body')
+        assert smtpd.subjects(1) == ['first']
+        for index in range(3):
+            notifier.notify(f'next {index}', 'body')
+        assert smtpd.subjects(2) == ['first', 'next 2 (+2 earlier)']
+        time.sleep(1.5)
+        assert len(smtpd.subjects(3, timeout=0)) == 2
+    finally:
+        notifier.close()
+        smtpd.close()
+
+
+def test_outage_backs_off_and_caps_backlog(port):
+    # Nothing listens yet, every attempt fails until the server starts.
+    notifier = _notifier(
+        port, window=0, min_backoff=0.1, max_backoff=0.2, max_pending=3)
+    smtpd = None
+    try:
+        for index in range(8):
+            notifier.notify(f'event {index}', 'body')
+            time.sleep(0.05)
+        time.sleep(0.5)
+        smtpd = _FakeSMTPD(port, '--verbose')
+        assert smtpd.subjects(1) == ['event 7 (+7 earlier)']
+        text = '\n'.join(smtpd.lines)
+        assert '5 older notification(s) were dropped' in text
+        assert 'event 5' in text and 'event 4' not in text
+    finally:
+        notifier.close()
+        if smtpd:
+            smtpd.close()
+
+
+def test_failed_delivery_is_retried(port):
+    smtpd = _FakeSMTPD(port, '--fail', '2')
+    notifier = _notifier(port, window=0, min_backoff=0.1)
+    try:
+        notifier.notify('one', 'body')
+        assert smtpd.subjects(1) == ['one']
+        notifier.notify('two', 'body')
+        # The second message is rejected once, then sent again.
+        assert smtpd.subjects(3) == ['one', 'two', 'two']
+    finally:
+        notifier.close()
+        smtpd.close()
@@ -0,0 +1,80 @@
+import pytest
+
+from ssalib import ssa
+from ssalib.ssa import Controllers, SSANodeError
+from ssalib.thresholds import compile_thresholds
+
+
+_THRESHOLDS = compile_thresholds({'Smart Array P410': {
+    'Controller Maximum Temperature (C)': 100,
+    'Cache Module Maximum Temperature (C)': 100,
+    'Capacitor Maximum Temperature (C)': 100}})
+
+
+@pytest.fixture
+def controllers(fake_ssacli):
+    return Controllers(thresholds=_THRESHOLDS)
+
+
+def _health(controllers):
+    controller = controllers.controllers[0]
+    return (
+        controllers.health(), controller.health(),
+        controller.arrays[0].health())
+
+
+def _rebuilding(controllers, monkeypatch):
+    # The fake picks the rebuilding drive from its seed, find it after.
+    monkeypatch.setenv('FAKE_SSACLI_REBUILDING', '1')
+    rebuilt = Controllers()
+    for drive in rebuilt.controllers[0].arrays[0].physical_drives:
+        if drive.status != ssa._OK:
+            return drive.location
+
+
+def test_refresh_physical_drive(controllers, monkeypatch):
+    controller = controllers.controllers[0]
+    array = controller.arrays[0]
+    before = list(array.physical_drives)
+    logical_drives = list(array.logical_drives)
+    # Memoize the health of the whole tree before the refresh.
+    assert _health(controllers) == (ssa._OK,) * 3
+    location = _rebuilding(controllers, monkeypatch)
+
+    new = controllers.refresh_physical_drive('1', location)
+
+    assert new.location == location
+    assert new.health() == ssa._WARNING
+    for old, drive in zip(before, array.physical_drives):
+        assert (drive is new) if old.location == location else (drive is old)
+    assert array.logical_drives == logical_drives
+    assert controllers.controllers[0] is controller
+    assert controller.arrays[0] is array
+    assert _health(controllers) == (ssa._WARNING,) * 3
+
+
+def test_refresh_logical_drive(controllers, monkeypatch):
+    controller = controllers.controllers[0]
+    array = controller.arrays[0]
+    physical_drives = list(array.physical_drives)
+    old = array.logical_drives[0]
+    assert _health(controllers) == (ssa._OK,) * 3
+    _rebuilding(controllers, monkeypatch)
+
+    new = controllers.refresh_logical_drive('1', old.number)
+
+    assert new is not old
+    assert array.logical_drives == [new]
+    assert new.progress == 37
+    assert array.physical_drives == physical_drives
+    assert all(drive.health() == ssa._OK for drive in physical_drives)
+    assert _health(controllers) == (ssa._WARNING,) * 3
+
+
+def test_refresh_unknown_node(controllers):
+    with pytest.raises(SSANodeError):
+        controllers.refresh_physical_drive('1', '9I:9:9')
+    with pytest.raises(SSANodeError):
+        controllers.refresh_logical_drive('1', 9)
+    with pytest.raises(SSANodeError):
+        controllers.refresh_array('9', 'A')
@@ -0,0 +1,103 @@
+import gzip
+import json
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+import ssacli_gen
+from conftest import _ROOT
+
+_REPLAY = os.path.join(_ROOT, 'opt', 'ssautils', 'smart-array-replay')
+_CONFIG = ''.join(
+    f'{model}:\n'
+    '  Controller Maximum Temperature (C): 100\n'
+    '  Cache Module Maximum Temperature (C): 100\n'
+    '  Capacitor Maximum Temperature (C): 100\n'
+    for model in ('Smart Array P410', 'Smart Array P420'))
+
+
+def _capture(**kwargs):
+    return ssacli_gen.render(ssacli_gen.config_detail_lines(
+        ssacli_gen.build_config(**kwargs)))
+
+
+@pytest.fixture
+def captures(tmp_path):
+    root = tmp_path / 'captures'
+    (root / 'b').mkdir(parents=True)
+    (root / 'a-healthy.txt').write_text(_capture(controllers=2))
+    (root / 'b' / 'rebuilding.gz').write_bytes(
+        gzip.compress(_capture(rebuilding=1).encode()))
+    (root / '.hidden').write_text('skipped')
+    config = tmp_path / 'config.yml'
+    config.write_text(_CONFIG)
+    return root, config
+
+
+def _replay(*args):
+    return subprocess.run(
+        [sys.executable, _REPLAY, *args], capture_output=True, text=True,
+        timeout=60)
+
+
+def test_replay_ordered(captures, tmp_path):
+    root, config = captures
+    missing = str(tmp_path / 'missing.txt')
+    proc = _replay(
+        '-c', str(config), '-j', '2', '--ordered', str(root), missing)
+    assert proc.returncode == 1
+    healthy, rebuilding, error = map(json.loads, proc.stdout.splitlines())
+
+    assert healthy['file'] == str(root / 'a-healthy.txt')
+    assert healthy['status_str'] == 'OK'
+    assert (healthy['controllers'], healthy['arrays'],
+            healthy['logical_drives'], healthy['physical_drives']) == (
+        2, 2, 2, 8)
+    assert healthy['problems'] == []
+
+    assert rebuilding['file'] == str(root / 'b' / 'rebuilding.gz')
+    assert rebuilding['status_str'] == 'Warning'
+    assert rebuilding['physical_drives'] == 8
+    assert [problem['node'] for problem in rebuilding['problems']] == [
+        'Slot 1 LD 1', 'Slot 1 PD 1I:1:2']
+    assert rebuilding['problems'][0]['reasons'] == [
+        'Logical drive 1 status: Recovering, 37% complete']
+
+    assert error['file'] == missing
+    assert error['status_str'] == 'Unknown'
+    assert 'No such file' in error['error']
+    assert re.search(
+        r'Replayed 3 capture\(s\) .*: 1 OK, 1 Warning, 0 Critical, '
+        r'1 Unknown, 1 error\(s\)', proc.stderr)
+
+
+def test_replay_unordered_report(captures, tmp_path):
+    root, config = captures
+    output = tmp_path / 'results.jsonl'
+    proc = _replay(
+        '-c', str(config), '-j', '2', '--report', '-o', str(output),
+        str(root))
+    assert proc.returncode == 0
+    assert proc.stdout == ''
+    results = sorted(
+        map(json.loads, output.read_text().splitlines()),
+        key=lambda result: result['file'])
+    assert [result['status_str'] for result in results] == ['OK', 'Warning']
+    # The full reports agree with the summaries.
+    assert [len(result['report']['controllers']) for result in results] == [
+        2, 1]
+    assert [result['report']['status'] for result in results] == [
+        result['status'] for result in results]
+
+
+def test_replay_bad_config(captures, tmp_path):
+    root, _ = captures
+    config = tmp_path / 'bad.yml'
+    config.write_text('Smart Array P410:\n  Unknown Key: 1\n')
+    proc = _replay('-c', str(config), str(root))
+    assert proc.returncode == 2
+    assert proc.stdout == ''
+    assert 'Unknown Key' in proc.stderr
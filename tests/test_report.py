@@ -0,0 +1,123 @@
+import json
+import time
+
+from ssalib.ssa import _STATUSES, _WARNING, Controllers
+from ssalib.thresholds import compile_thresholds
+
+_NODE_KEYS = {
+    'type', 'status', 'status_str', 'check', 'reasons', 'description',
+    'fields'}
+_TEMPERATURE_FIELDS = {
+    'temperature', 'max_temperature', 'temperature_rise',
+    'temperature_status'}
+_FIELDS = {
+    'Controller': {
+        'slot', 'model', 'serial', 'host_serial', 'cache_present',
+        'power_source'},
+    'Controller Status': {'serial', 'state'} | _TEMPERATURE_FIELDS,
+    'Cache Status': {'serial', 'size', 'state'} | _TEMPERATURE_FIELDS,
+    'Battery/Capacitor Status': {'source', 'state'} | _TEMPERATURE_FIELDS,
+    'Array': {'name', 'interface', 'state', 'unused_space'},
+    'LogicalDrive': {
+        'number', 'disk_name', 'raid', 'size', 'state', 'operation',
+        'progress', 'eta', 'throughput'},
+    'PhysicalDrive': {
+        'location', 'serial', 'model', 'port', 'box', 'bay', 'drive_type',
+        'size', 'state', 'counters'} | _TEMPERATURE_FIELDS}
+_CHILDREN = {
+    'Controller': {'components', 'unassigned', 'arrays'},
+    'Array': {'logical_drives', 'physical_drives'}}
+
+
+def _report(monkeypatch, **env):
+    for name, value in env.items():
+        monkeypatch.setenv(f'FAKE_SSACLI_{name}', str(value))
+    config = {model: {
+        'Controller Maximum Temperature (C)': 100,
+        'Cache Module Maximum Temperature (C)': 100,
+        'Capacitor Maximum Temperature (C)': 100}
+        for model in ('Smart Array P410', 'Smart Array P420')}
+    return Controllers(thresholds=compile_thresholds(config)).report()
+
+
+def _check_node(node):
+    assert set(node) == _NODE_KEYS | _CHILDREN.get(node['type'], set())
+    assert set(node['fields']) == _FIELDS[node['type']]
+    assert node['status_str'] == _STATUSES[node['status']]
+    # The status includes the children, the check only the node itself.
+    assert node['check'] <= node['status']
+    assert all(isinstance(reason, str) and reason
+               for reason in node['reasons'])
+    assert isinstance(node['description'], str)
+    for key in _CHILDREN.get(node['type'], ()):
+        for child in node[key]:
+            _check_node(child)
+            assert child['status'] <= node['status']
+
+
+def test_report_shape(fake_ssacli, monkeypatch):
+    start = time.time()
+    report = _report(
+        monkeypatch, CONTROLLERS=2, DRIVES=12, REBUILDING=1, UNASSIGNED=1)
+    assert set(report) == {'status', 'status_str', 'updated', 'controllers'}
+    assert start - 1 <= report['updated'] <= time.time() + 1
+    assert report['status'] == _WARNING
+    assert report['status'] == max(
+        controller['status'] for controller in report['controllers'])
+    # Plain data, the snapshot and the RPC pass it on as JSON.
+    assert json.loads(json.dumps(report)) == report
+
+    slots = []
+    for controller in report['controllers']:
+        _check_node(controller)
+        slots.append(controller['fields']['slot'])
+        assert [component['type'] for component in (
+            controller['components'])] == [
+            'Controller Status', 'Cache Status', 'Battery/Capacitor Status']
+        # The controller reasons are the ones of its components.
+        assert controller['reasons'] == [
+            reason for component in controller['components']
+            for reason in component['reasons']]
+        assert [drive['type'] for drive in controller['unassigned']] == [
+            'PhysicalDrive']
+        for array in controller['arrays']:
+            assert [drive['type'] for drive in array['logical_drives']] == [
+                'LogicalDrive']
+            assert {drive['type'] for drive in array['physical_drives']} == {
+                'PhysicalDrive'}
+    assert slots == ['1', '2']
+    drives = [
+        drive for controller in report['controllers']
+        for array in controller['arrays']
+        for drive in array['physical_drives'] + controller['unassigned']]
+    assert len({drive['fields']['serial'] for drive in drives}) == 12
+    assert all(isinstance(drive['fields']['temperature'], int)
+               for drive in drives)
+
+
+def test_report_reasons(fake_ssacli, monkeypatch):
+    report = _report(monkeypatch, REBUILDING=1)
+    array = report['controllers'][0]['arrays'][0]
+    drive = array['logical_drives'][0]
+    assert drive['check'] == _WARNING
+    assert drive['reasons'] == [
+        'Logical drive 1 status: Recovering, 37% complete']
+    assert drive['fields']['progress'] == 37
+    rebuilding = [
+        pd for pd in array['physical_drives'] if pd['check'] == _WARNING]
+    assert [pd['fields']['state'] for pd in rebuilding] == ['Rebuilding']
+
+
+def test_details_shape(fake_ssacli):
+    controllers = Controllers()
+    report = controllers.to_dict()
+    assert set(report) == {'status', 'status_str', 'updated', 'controllers'}
+    controller = report['controllers'][0]
+    assert set(controller) == {
+        'type', 'status', 'status_str', 'details', 'unassigned', 'arrays'}
+    assert controller['details']['Slot'] == '1'
+    array = controller['arrays'][0]
+    assert set(array) == {
+        'type', 'status', 'status_str', 'details', 'logical_drives',
+        'physical_drives'}
+    assert len(array['physical_drives']) == 8
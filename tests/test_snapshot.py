@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from ssalib import snapshot
+from ssalib.snapshot import SnapshotError, SnapshotIndex, SnapshotServer
+from ssalib.ssa import Controllers
+
+
+def _query(server, **request):
+    return json.loads(server.query(request))
+
+
+def test_snapshot_is_isolated_from_refreshes(fake_ssacli):
+    controllers = Controllers(thresholds=None)
+    server = SnapshotServer(path=None)
+    server.update(controllers)
+    before = _query(server, format='report', slot='1')
+    listed = _query(server, list='physical_drives')
+    # The poller changes its own tree in place after publishing it.
+    drive = controllers.controllers[0].arrays[0].physical_drives[0]
+    drive.set_counters({'Media Errors': 5})
+    drive.invalidate()
+    controllers.controllers.clear()
+    assert _query(server, format='report', slot='1') == before
+    assert _query(server, list='physical_drives') == listed
+    server.touch()
+    assert _query(server, list='physical_drives')['data'] == listed['data']
+
+
+def test_update_replaces_index(fake_ssacli, monkeypatch):
+    server = SnapshotServer(path=None)
+    server.update(Controllers(thresholds=None))
+    assert _query(server, list='physical_drives')['total'] == 8
+    monkeypatch.setenv('FAKE_SSACLI_DRIVES', '4')
+    server.update(Controllers(thresholds=None))
+    assert _query(server, list='physical_drives')['total'] == 4
+
+
+def test_unknown_sort_field_is_rejected(fake_ssacli):
+    server = SnapshotServer(path=None)
+    server.update(Controllers(thresholds=None))
+    for sortfield in ('counters', 'reasons', 'bogus'):
+        with pytest.raises(SnapshotError, match='unknown sort field'):
+            server.query({'list': 'physical_drives', 'sortfield': sortfield})
+    with pytest.raises(SnapshotError, match='unknown sort field'):
+        server.query({'list': 'arrays', 'sortfield': 'location'})
+
+
+def test_status_sorts_by_severity(fake_ssacli, monkeypatch):
+    monkeypatch.setenv('FAKE_SSACLI_FAILED', '1')
+    monkeypatch.setenv('FAKE_SSACLI_REBUILDING', '1')
+    server = SnapshotServer(path=None)
+    server.update(Controllers(thresholds=None))
+    for sortfield in ('status', 'status_str'):
+        rows = _query(
+            server, list='physical_drives', sortfield=sortfield,
+            sortdir='desc')['data']
+        assert [row['status_str'] for row in rows[:2]] == [
+            'Critical', 'Warning']
+        assert {row['status_str'] for row in rows[2:]} == {'OK'}
+
+
+def test_view_cache_is_bounded(fake_ssacli):
+    index = SnapshotIndex(Controllers(thresholds=None))
+    for slot in range(snapshot._MAX_VIEWS * 2):
+        index.query({'list': 'physical_drives', 'slot': slot})
+    assert len(index._views) == snapshot._MAX_VIEWS
@@ -0,0 +1,116 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from ssalib import ssa
+from ssalib.ssa import SSACmdError, SSACmdOutput, _ssa_cmd_lines
+
+
+def _python(code):
+    return [sys.executable, '-c', code]
+
+
+@pytest.fixture
+def popens(monkeypatch):
+    started = []
+    popen = subprocess.Popen
+
+    def recording_popen(*args, **kwargs):
+        started.append(popen(*args, **kwargs))
+        return started[-1]
+
+    monkeypatch.setattr(ssa.subprocess, 'Popen', recording_popen)
+    return started
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def test_lines_are_streamed(popens):
+    output = SSACmdOutput()
+    lines = _ssa_cmd_lines(_python(
+        'import time\n'
+        'print("first", flush=True)\n'
+        'time.sleep(2)\n'
+        'print("second")\n'), 10, output)
+    start = time.monotonic()
+    assert next(lines) == 'first'
+    assert time.monotonic() - start < 1.5
+    assert list(lines) == ['second']
+    assert popens[0].returncode == 0
+
+
+def test_stderr_is_collected(popens):
+    # More than a pipe buffer, stdout must not block behind it.
+    output = SSACmdOutput()
+    lines = list(_ssa_cmd_lines(_python(
+        'import sys\n'
+        'sys.stderr.write("w" * 200000 + "\\nWarning: cache\\n")\n'
+        'print("config")\n'), 10, output))
+    assert lines == ['config']
+    assert output.stderr.endswith('Warning: cache')
+    assert len(output.stderr) > 200000
+
+
+def test_failure_reports_the_output(popens):
+    output = SSACmdOutput()
+    with pytest.raises(SSACmdError, match='stdout: oops.*stderr: bad'):
+        list(_ssa_cmd_lines(_python(
+            'import sys\n'
+            'print("oops")\n'
+            'sys.stderr.write("bad")\n'
+            'sys.exit(1)\n'), 10, output))
+    assert popens[0].returncode == 1
+
+
+def test_timeout_kills_the_process_group(popens):
+    output = SSACmdOutput()
+    lines = _ssa_cmd_lines(_python(
+        'import subprocess, time\n'
+        'child = subprocess.Popen(["sleep", "30"])\n'
+        'print(child.pid, flush=True)\n'
+        'time.sleep(30)\n'), 0.5, output)
+    start = time.monotonic()
+    with pytest.raises(SSACmdError, match='timed out'):
+        grandchild = int(next(lines))
+        list(lines)
+    assert time.monotonic() - start < 5
+    # The child is reaped and its own children went with the group.
+    assert popens[0].returncode is not None
+    deadline = time.monotonic() + 2
+    while _alive(grandchild) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not _alive(grandchild)
+
+
+def test_abandoned_command_is_reaped(popens):
+    output = SSACmdOutput()
+    lines = _ssa_cmd_lines(_python(
+        'import time\n'
+        'print("first", flush=True)\n'
+        'time.sleep(30)\n'), 10, output)
+    assert next(lines) == 'first'
+    lines.close()
+    assert popens[0].returncode is not None
+
+
+def test_fake_ssacli(fake_ssacli, monkeypatch):
+    monkeypatch.setenv('FAKE_SSACLI_STDERR', 'Warning: cache disabled')
+    output = ssa._ssa_cmd('ctrl', 'all', 'show', 'config', timeout=10)
+    lines = list(output)
+    assert any('Slot 1' in line for line in lines)
+    assert output.stderr == 'Warning: cache disabled'
+    monkeypatch.setenv('FAKE_SSACLI_HANG_SLOT', '1')
+    start = time.monotonic()
+    with pytest.raises(SSACmdError, match='timed out'):
+        list(ssa._ssa_cmd(
+            'ctrl', 'slot=1', 'show', 'config', 'detail', timeout=0.5))
+    assert time.monotonic() - start < 5
@@ -0,0 +1,136 @@
+import os
+import signal
+import time
+
+import pytest
+
+from ssalib.ssa import _CRITICAL
+from ssalib.thresholds import (
+    ThresholdConfig, ThresholdError, compile_thresholds, load_thresholds)
+
+
+_CONFIG = '''\
+Smart Array P410:
+  Controller Maximum Temperature (C): 80
+  Cache Module Maximum Temperature (C): 70
+  Capacitor Maximum Temperature (C): 60
+  Physical Drives:
+    HP EG0600FBVFP: 55
+Physical Drives:
+  ATA MK000480GWCEV:
+    Maximum Temperature (C): 65
+Diagnostics:
+  Media Errors:
+    Warning: 2
+    Critical: 10
+'''
+
+
+def _wait(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return predicate()
+
+
+def test_compiled_tables():
+    thresholds = compile_thresholds({
+        'Smart Array P410': {
+            'Controller Maximum Temperature (C)': 80,
+            'Capacitor Maximum Temperature (C)': 60,
+            'Physical Drives': {'HP  EG0600FBVFP': 55}},
+        'Physical Drives': {'ATA MK000480GWCEV': 65},
+        'Diagnostics': {'Media Errors': {'Critical': 10}}})
+    p410 = thresholds.controller('Smart Array P410')
+    assert p410.controller == 80
+    assert p410.cache is None
+    assert p410.power_source('Capacitor') == 60
+    assert p410.drive('hp eg0600fbvfp') == 55
+    assert p410.drive('ATA  MK000480GWCEV') == 65
+    assert p410.diagnostics['Media Errors'] == {_CRITICAL: 10}
+    other = thresholds.controller('Smart Array P420')
+    assert other.controller is None
+    assert other.drive('ATA MK000480GWCEV') == 65
+    assert len(thresholds) == 1
+
+
+@pytest.mark.parametrize('config, error', [
+    ([], 'top level must be a mapping'),
+    ({'Smart Array P410': 80}, "'Smart Array P410' must be a mapping"),
+    ({'Smart Array P410': {'Fan Speed': 1}}, 'unknown key'),
+    ({'Smart Array P410': {'Controller Maximum Temperature (C)': 'hot'}},
+     'must be a number'),
+    ({'Smart Array P410': {'Controller Maximum Temperature (C)': True}},
+     'must be a number'),
+    ({'Smart Array P410': {'Controller Maximum Temperature (C)': 500}},
+     'out of range'),
+    ({'Physical Drives': ['HP EG0600FBVFP']}, 'must be a mapping of models'),
+    ({'Physical Drives': {'HP EG0600FBVFP': {'Minimum': 5}}},
+     'unknown key'),
+    ({'Diagnostics': {'Fan Errors': {'Warning': 1}}}, 'unknown counter'),
+    ({'Diagnostics': {'Media Errors': {'Fatal': 1}}}, 'unknown level'),
+    ({'Diagnostics': {'Media Errors': {'Warning': -1}}},
+     'must be a positive number'),
+    ({'Diagnostics': {'Media Errors': 3}}, 'must be a mapping of levels'),
+])
+def test_invalid_config(config, error):
+    with pytest.raises(ThresholdError, match=error):
+        compile_thresholds(config)
+
+
+def test_load_errors(tmp_path):
+    with pytest.raises(ThresholdError):
+        load_thresholds(str(tmp_path / 'missing.yml'))
+    path = tmp_path / 'config.yml'
+    path.write_text('Smart Array P410: [unclosed\n')
+    with pytest.raises(ThresholdError):
+        load_thresholds(str(path))
+
+
+def test_invalid_reload_keeps_thresholds(tmp_path):
+    path = tmp_path / 'config.yml'
+    path.write_text(_CONFIG)
+    config = ThresholdConfig(str(path))
+    thresholds = config.thresholds
+    path.write_text('Smart Array P410:\n  Fan Speed: 1\n')
+    assert not config.reload()
+    assert config.thresholds is thresholds
+
+
+@pytest.fixture
+def config(tmp_path):
+    path = tmp_path / 'config.yml'
+    path.write_text(_CONFIG)
+    config = ThresholdConfig(str(path), interval=0.1)
+    config.start()
+    yield path, config
+    config.close()
+
+
+def _controller_max(config):
+    return config.thresholds.controller('Smart Array P410').controller
+
+
+def test_reload_on_change(config):
+    path, config = config
+    assert _controller_max(config) == 80
+    path.write_text(_CONFIG.replace(': 80', ': 85'))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert _wait(lambda: _controller_max(config) == 85)
+
+
+def test_reload_on_sighup(config):
+    path, config = config
+    previous = signal.signal(signal.SIGHUP, config.request_reload)
+    try:
+        # Same size and mtime, only the signal tells the config to reload.
+        stat = path.stat()
+        path.write_text(_CONFIG.replace(': 80', ': 75'))
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        time.sleep(0.3)
+        assert _controller_max(config) == 80
+        os.kill(os.getpid(), signal.SIGHUP)
+        assert _wait(lambda: _controller_max(config) == 75)
+    finally:
+        signal.signal(signal.SIGHUP, previous)
@@ -0,0 +1,57 @@
+from functools import partial
+
+import pytest
+
+
+class _Progress():
+    active = False
+
+
+def _tiered(daemon, progress, calls, unchanged):
+    def check():
+        calls.append(1)
+        return 'details'
+
+    return daemon.TieredCheck(
+        check, partial(daemon.adaptive_period, progress, 3600, 0),
+        probe=lambda: 'same', on_unchanged=lambda: unchanged.append(1))
+
+
+def test_unchanged_status_skips_details(daemon):
+    calls, unchanged = [], []
+    check = _tiered(daemon, _Progress(), calls, unchanged)
+    assert check() == 'details'
+    assert check() is None
+    assert check() is None
+    assert len(calls) == 1
+    assert len(unchanged) == 2
+
+
+def test_progress_keeps_details_due(daemon):
+    # The fingerprint hides percentages, without follow ups the progress
+    # period is the only thing refreshing a rebuild.
+    progress = _Progress()
+    calls, unchanged = [], []
+    check = _tiered(daemon, progress, calls, unchanged)
+    check()
+    progress.active = True
+    assert check() == 'details'
+    assert check() == 'details'
+    progress.active = False
+    assert check() is None
+    assert len(calls) == 3
+
+
+def test_failed_probe_runs_the_full_check(daemon):
+    calls = []
+
+    def probe():
+        raise daemon.SSACmdError(error='ctrl all show status failed')
+
+    check = daemon.TieredCheck(
+        lambda: calls.append(1), 3600, probe=probe,
+        on_unchanged=lambda: pytest.fail('not unchanged'))
+    check()
+    check()
+    check()
+    assert len(calls) == 3
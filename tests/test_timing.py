@@ -0,0 +1,126 @@
+import pytest
+
+from ssalib import timing
+from ssalib.timing import StageTimings, timed, timed_lines
+
+
+class _Clock():
+    def __init__(self):
+        self.now = 100.0
+
+    def perf_counter(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(timing, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def timings(monkeypatch):
+    timings = StageTimings()
+    monkeypatch.setattr(timing, 'timings', timings)
+    return timings
+
+
+def test_percentiles():
+    timings = StageTimings()
+    for seconds in range(100, 0, -1):
+        timings.record('parse', float(seconds))
+    assert timings.stats() == {'parse': dict(
+        count=100, window=100, p50=51.0, p95=96.0, p99=100.0, max=100.0)}
+
+
+def test_rolling_window():
+    timings = StageTimings(window=10)
+    for seconds in range(1, 21):
+        timings.record('parse', float(seconds))
+    stats = timings.stats()['parse']
+    # Only the latest samples are kept, the count is the total.
+    assert stats['count'] == 20
+    assert stats['window'] == 10
+    assert (stats['p50'], stats['max']) == (16.0, 20.0)
+
+
+def test_nested_stages(clock):
+    timings = StageTimings()
+    with timings.measure('check'):
+        clock.advance(1)
+        with timings.measure('parse'):
+            clock.advance(2)
+            timings.record('ssacli', 0.5)
+        clock.advance(3)
+    stats = timings.stats()
+    # Each stage excludes the ones measured or recorded inside it.
+    assert stats['check']['max'] == 4
+    assert stats['parse']['max'] == 1.5
+    assert stats['ssacli']['max'] == 0.5
+
+
+def test_timed(clock, timings):
+    @timed('notify')
+    def notify(fail):
+        clock.advance(2)
+        if fail:
+            raise ValueError(fail)
+        return 'sent'
+
+    assert notify(None) == 'sent'
+    with pytest.raises(ValueError):
+        notify('refused')
+    assert timings.stats()['notify']['count'] == 2
+
+
+def _lines(clock, count, wait):
+    for number in range(count):
+        clock.advance(wait)
+        yield f'line {number}'
+    clock.advance(wait)
+
+
+def test_timed_lines(clock, timings):
+    with timings.measure('parse'):
+        for _ in timed_lines('ssacli', _lines(clock, 3, 1)):
+            clock.advance(10)
+    stats = timings.stats()
+    # The wait for each line and for the end of the output.
+    assert stats['ssacli']['max'] == 4
+    assert stats['parse']['max'] == 30
+
+
+def test_timed_lines_closed_early(clock, timings):
+    closed = []
+
+    def lines():
+        try:
+            yield from _lines(clock, 3, 1)
+        finally:
+            closed.append(True)
+
+    stream = timed_lines('ssacli', lines())
+    assert next(stream) == 'line 0'
+    clock.advance(10)
+    stream.close()
+    assert closed == [True]
+    assert timings.stats()['ssacli']['max'] == 1
+
+
+def test_summary_resets_cycle():
+    timings = StageTimings()
+    timings.record('parse', 1.0)
+    timings.record('parse', 3.0)
+    timings.record('ssacli', 0.25)
+    assert timings.summary() == (
+        'parse 2x 4.000s (p50 3.000s p95 3.000s), '
+        'ssacli 1x 0.250s (p50 0.250s p95 0.250s)')
+    assert timings.summary() == ''
+    timings.record('parse', 2.0)
+    # The cycle totals restart, the percentiles keep the whole window.
+    assert timings.summary() == 'parse 1x 2.000s (p50 2.000s p95 3.000s)'
+    assert timings.stats()['parse']['count'] == 3
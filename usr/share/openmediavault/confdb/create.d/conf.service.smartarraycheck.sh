@@ -30,6 +30,7 @@ if ! omv_config_exists "${SERVICE_XPATH}"; then
     omv_config_add_node "/config/services" "${SERVICE_XPATH_NAME}"
     omv_config_add_key "${SERVICE_XPATH}" "enable" "0"
     omv_config_add_key "${SERVICE_XPATH}" "period" "900"
+    omv_config_add_key "${SERVICE_XPATH}" "statusperiod" "30"
     omv_config_add_key "${SERVICE_XPATH}" "controllers" "<Controller type>:
   Cache Module Maximum Temperature (C): <int>
   Capacitor Maximum Temperature (C): <int>